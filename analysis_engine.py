@@ -4,19 +4,94 @@ Server-side Audio Analysis Engine
 Ported from analyze_vowels.py for the Pronounce Web Application.
 """
 
+import hashlib
+import json
+import logging
 import math
 from pathlib import Path
-from typing import Any, List, Optional, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
 import librosa  # type: ignore
 import numpy as np
 import parselmouth  # type: ignore
-from parselmouth.praat import call  # type: ignore
+
+from scripts import metrics
+from scripts.audio_processing import analysis_sidecar_path
+
+# Nucleus search diagnostics are logged at DEBUG; raise this logger's level to silence them.
+logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
 DIPHTHONGS = {"aɪ", "əʊ", "ɔɪ", "eɪ", "eə", "aʊ", "ɪə", "ʊə"}
 BACK_VOWELS = {"uː", "ʊ", "ɔː", "ɒ", "ɑː", "əʊ", "ɔɪ", "aʊ"}
 
+TARGET_SR = 16000
+PITCH_FLOOR = 75.0
+PITCH_CEILING = 1200.0
+MIN_NUCLEUS_DURATION = 0.03  # seconds
+FORMANT_TIME_STEP = 0.01
+MAX_FORMANTS = 5
+FORMANT_MARGIN = 0.05  # seconds of context kept around the nucleus for Burg
+STANDARD_CEILING = 5500.0
+DEEP_VOICE_CEILING = 4000.0
+# F2 retry thresholds: Student > 1500, Reference > 1600 (from original thesis logic)
+STUDENT_F2_THRESHOLD = 1500.0
+REFERENCE_F2_THRESHOLD = 1600.0
+# A result further than this from the reference is flagged as an outlier
+OUTLIER_THRESHOLD_BARK = 5.0
+
+# Bump when measurement code changes in a way the parameters below don't capture
+ENGINE_VERSION = "2026.10"
+
+# Everything that influences a formant measurement. Cached measurements are
+# keyed by a hash of this dict, so changing any value invalidates them.
+ENGINE_PARAMS: Dict[str, Any] = {
+    "engine_version": ENGINE_VERSION,
+    "target_sr": TARGET_SR,
+    "pitch_floor": PITCH_FLOOR,
+    "pitch_ceiling": PITCH_CEILING,
+    "min_nucleus_duration": MIN_NUCLEUS_DURATION,
+    "formant_time_step": FORMANT_TIME_STEP,
+    "max_formants": MAX_FORMANTS,
+    "formant_margin": FORMANT_MARGIN,
+    "ceilings": [STANDARD_CEILING, DEEP_VOICE_CEILING],
+    "back_vowels": sorted(BACK_VOWELS),
+    "f2_thresholds": [STUDENT_F2_THRESHOLD, REFERENCE_F2_THRESHOLD],
+}
+
+
+def engine_params_hash() -> str:
+    """Short, stable fingerprint of ENGINE_PARAMS."""
+    payload = json.dumps(ENGINE_PARAMS, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def result_params_hash() -> str:
+    """
+    Fingerprint stamped on every AnalysisResult: the measurement parameters
+    plus the scoring rules applied on top of them.
+    """
+    payload = json.dumps(
+        {
+            "engine": engine_params_hash(),
+            "outlier_threshold_bark": OUTLIER_THRESHOLD_BARK,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def file_content_hash(path: Path | str) -> Optional[str]:
+    """SHA-256 of a file's bytes, or None if the file cannot be read."""
+    try:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
 
 def hz_to_bark(f: float) -> float:
     """Converts frequency (Hz) to Bark scale."""
@@ -33,59 +108,136 @@ def get_vowel_type(vowel_symbol: str) -> str:
     return "monophthong"
 
 
-def load_audio_mono(path: Path | str, target_sr: int = 16000) -> Tuple[np.ndarray[Any, Any], int]:  # type: ignore
+def analysis_input_path(path: Path | str, target_sr: int = TARGET_SR) -> Path:
+    """
+    The file load_audio_mono reads for `path`: its analysis sidecar when one
+    exists, otherwise the audio file itself.
+    """
+    sidecar = analysis_sidecar_path(path, target_sr)
+    return sidecar if sidecar.exists() else Path(path)
+
+
+def analysis_input_hash(path: Path | str) -> Optional[str]:
+    """Content hash of the file the analysis of `path` is computed from."""
+    return file_content_hash(analysis_input_path(path))
+
+
+def load_audio_mono(path: Path | str, target_sr: int = TARGET_SR) -> Tuple[np.ndarray[Any, Any], int]:  # type: ignore
     """
     Loads audio, converts to mono, resamples to target_sr, and normalizes volume.
+    Uploads processed by the web tier come with a lossless sidecar that is
+    memory-mapped instead of decoding the MP3.
     """
     path_str = str(path)
+
+    sidecar = analysis_input_path(path_str, target_sr)
+    if sidecar != Path(path_str):
+        try:
+            y_map = np.load(sidecar, mmap_mode="r")
+            return _peak_normalize(np.asarray(y_map, dtype=np.float32)), target_sr
+        except Exception as e:
+            logger.warning(
+                "Error loading sidecar %s: %s. Decoding MP3 instead.", sidecar, e
+            )
+
     try:
         y: Any
         sr: Any
         y, sr = librosa.load(path_str, sr=None, mono=True)  # type: ignore
-    except Exception as e:
-        print(f"Error loading {path_str}: {e}")
+    except Exception:
+        logger.exception("Error loading %s", path_str)
         return np.array([]), target_sr
 
     if sr != target_sr:
         y = librosa.resample(y, orig_sr=sr, target_sr=target_sr)  # type: ignore
         sr = target_sr
 
+    return _peak_normalize(cast(np.ndarray[Any, Any], y)), int(sr)
+
+
+def _peak_normalize(y: np.ndarray[Any, Any]) -> np.ndarray[Any, Any]:
+    """Scales to a 0.95 peak and returns a new float32 array."""
     if y.size > 0:
         max_val = float(np.max(np.abs(y)))
         if max_val > 0:
             y = 0.95 * y / max_val
-    return cast(np.ndarray[Any, Any], y).astype(np.float32), int(sr)
+    return y.astype(np.float32)
+
+
+def _voiced_runs(
+    f0: np.ndarray[Any, Any], times: np.ndarray[Any, Any]
+) -> List[Tuple[float, float]]:
+    """
+    Turns a per-frame F0 contour into (start, end) voiced intervals.
+    A run ends at the time of the first unvoiced frame after it, or at the
+    last frame if the recording ends voiced.
+    """
+    n = len(f0)
+    if n == 0:
+        return []
+    voiced = np.nan_to_num(f0) > 0
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.minimum(np.flatnonzero(edges == -1), n - 1)
+    return [(float(times[a]), float(times[b])) for a, b in zip(starts, ends)]
+
+
+def _intensity_peak(
+    values: np.ndarray[Any, Any], times: np.ndarray[Any, Any], t0: float, t1: float
+) -> float:
+    """
+    Array equivalent of Praat's Intensity "Get maximum" with parabolic
+    interpolation (Vector_getMaximumAndX): the larger of the first and last
+    frames in the window and every interior local maximum refined through
+    its neighbours. Only a window without frames falls back to the linearly
+    interpolated values at its edges.
+    """
+    imin = int(np.searchsorted(times, t0, side="left"))
+    imax = int(np.searchsorted(times, t1, side="right")) - 1
+    if imin > imax:
+        return float(np.max(np.interp([t0, t1], times, values)))
+
+    peak = max(float(values[imin]), float(values[imax]))
+
+    lo = max(imin, 1)
+    hi = min(imax, len(values) - 2)
+    if lo > hi:
+        return peak
+
+    y = values[lo - 1 : hi + 2]
+    left, mid, right = y[:-2], y[1:-1], y[2:]
+    is_max = (mid > left) & (mid >= right)
+    if np.any(is_max):
+        left, mid, right = left[is_max], mid[is_max], right[is_max]
+        dy = 0.5 * (right - left)
+        d2y = 2.0 * mid - left - right
+        with np.errstate(divide="ignore", invalid="ignore"):
+            refined = np.where(d2y != 0, mid + 0.5 * dy * dy / d2y, mid)
+        peak = max(peak, float(np.max(refined)))
+    return peak
 
 
 def find_syllable_nucleus(
-    sound: Any, pitch_floor: float = 75, pitch_ceiling: float = 1200
+    sound: Any, pitch_floor: float = PITCH_FLOOR, pitch_ceiling: float = PITCH_CEILING
 ) -> Optional[Tuple[float, float]]:
     """Finds the loudest voiced segment in the audio."""
-    pitch = sound.to_pitch(pitch_floor=pitch_floor, pitch_ceiling=pitch_ceiling)
-    intensity = sound.to_intensity()
-
-    n_frames = cast(int, pitch.get_number_of_frames())
-    voiced_intervals: List[Tuple[float, float]] = []
-
-    current_start: Optional[float] = None
-
-    for i in range(1, n_frames + 1):
-        if pitch.get_value_in_frame(i) > 0:
-            if current_start is None:
-                current_start = cast(float, pitch.get_time_from_frame_number(i))
-        else:
-            if current_start is not None:
-                voiced_intervals.append(
-                    (current_start, cast(float, pitch.get_time_from_frame_number(i)))
-                )
-                current_start = None
-    if current_start:
-        voiced_intervals.append(
-            (current_start, cast(float, pitch.get_time_from_frame_number(n_frames)))
-        )
+    with metrics.stage("pitch"):
+        pitch = sound.to_pitch(pitch_floor=pitch_floor, pitch_ceiling=pitch_ceiling)
+    with metrics.stage("intensity"):
+        intensity = sound.to_intensity()
+
+    # Pull whole contours once instead of querying Praat frame by frame
+    f0 = np.asarray(pitch.selected_array["frequency"], dtype=np.float64)
+    voiced_intervals = _voiced_runs(f0, np.asarray(pitch.xs(), dtype=np.float64))
 
     if not voiced_intervals:
-        print("Debug: No voiced intervals found.")
+        logger.debug("No voiced intervals found.")
+        return None
+
+    int_values = np.asarray(intensity.values, dtype=np.float64)[0]
+    int_times = np.asarray(intensity.xs(), dtype=np.float64)
+    if len(int_values) == 0:
+        logger.debug("Empty intensity contour.")
         return None
 
     best_segment = None
@@ -93,98 +245,334 @@ def find_syllable_nucleus(
 
     for t0, t1 in voiced_intervals:
         duration = t1 - t0
-        print(f"Debug: Checking interval {t0:.3f}-{t1:.3f} (dur={duration:.3f})")
+        logger.debug("Checking interval %.3f-%.3f (dur=%.3f)", t0, t1, duration)
 
-        if duration < 0.03:
-            print(f"Debug: Rejected (too short)")
+        if duration < MIN_NUCLEUS_DURATION:
+            logger.debug("Rejected (too short)")
             continue
-        try:
-            peak: float = float(
-                cast(
-                    float,
-                    call(intensity, "Get maximum", float(t0), float(t1), "Parabolic"),
-                )
-            )
-            print(f"Debug: Peak Intensity = {peak:.2f}")
-            if peak > max_peak:
-                max_peak = peak
-                best_segment = (t0, t1)
-        except Exception as e:
-            print(f"Debug: Intensity Error: {e}")
-            pass
+
+        peak = _intensity_peak(int_values, int_times, t0, t1)
+        logger.debug("Peak Intensity = %.2f", peak)
+        if peak > max_peak:
+            max_peak = peak
+            best_segment = (t0, t1)
 
     return best_segment
 
 
+class FormantAnalyzer:
+    """
+    Formant measurement pipeline shared by the Celery worker, the CLI and the
+    startup warmup.
+
+    Burg analysis only runs over the detected nucleus plus a small margin
+    (recordings carry ~300 ms of trailing padding), and all candidate
+    ceilings are measured from that same extracted segment in one pass.
+    """
+
+    def __init__(
+        self,
+        ceilings: Tuple[float, ...] = (STANDARD_CEILING, DEEP_VOICE_CEILING),
+        margin: float = FORMANT_MARGIN,
+    ) -> None:
+        self.ceilings = ceilings
+        self.margin = margin
+
+    @staticmethod
+    def points_for(target_vowel: str) -> Tuple[float, ...]:
+        """Relative measurement points within the nucleus."""
+        if get_vowel_type(target_vowel) == "diphthong":
+            return (0.2, 0.8)
+        return (0.5,)
+
+    def _nucleus_part(self, sound: Any, segment: Tuple[float, float]) -> Any:
+        t0, t1 = segment
+        from_time = max(float(sound.xmin), t0 - self.margin)
+        to_time = min(float(sound.xmax), t1 + self.margin)
+        # preserve_times keeps the original time axis for get_value_at_time
+        return sound.extract_part(
+            from_time=from_time, to_time=to_time, preserve_times=True
+        )
+
+    def measure_ceilings(
+        self,
+        sound: Any,
+        segment: Optional[Tuple[float, float]],
+        points: Tuple[float, ...],
+        ceilings: Tuple[float, ...],
+    ) -> Dict[float, List[Tuple[float, float]]]:
+        """
+        Measures F1 and F2 at the given relative points for every ceiling.
+        """
+        if segment is None:
+            return {c: [(float(np.nan), float(np.nan))] * len(points) for c in ceilings}
+
+        t0, t1 = segment
+        dur = t1 - t0
+        part = self._nucleus_part(sound, segment)
+
+        by_ceiling: Dict[float, List[Tuple[float, float]]] = {}
+        for ceiling in ceilings:
+            with metrics.stage("burg"):
+                formant = part.to_formant_burg(
+                    time_step=FORMANT_TIME_STEP,
+                    max_number_of_formants=MAX_FORMANTS,
+                    maximum_formant=ceiling,
+                )
+
+            results: List[Tuple[float, float]] = []
+            for p in points:
+                t = t0 + (dur * p)
+                f1 = cast(float, formant.get_value_at_time(1, t))
+                f2 = cast(float, formant.get_value_at_time(2, t))
+
+                # Robust filtering
+                if np.isnan(f1) or f1 < 50 or f1 > 1200:
+                    f1 = float(np.nan)
+                if np.isnan(f2) or f2 < 200 or f2 > 4000:
+                    f2 = float(np.nan)
+
+                results.append((f1, f2))
+            by_ceiling[ceiling] = results
+        return by_ceiling
+
+    def analyze_sound(
+        self, sound: Any, target_vowel: str, is_reference: bool = False
+    ) -> Tuple[List[Tuple[float, float]], bool]:
+        """
+        Returns (F1, F2) per measurement point and whether the deep voice
+        ceiling was used.
+        """
+        points = self.points_for(target_vowel)
+        with metrics.measuring("reference" if is_reference else "student"):
+            with metrics.stage("nucleus"):
+                seg = find_syllable_nucleus(sound)
+
+            # Back vowels get every candidate ceiling in the same pass
+            ceilings = (
+                self.ceilings if target_vowel in BACK_VOWELS else self.ceilings[:1]
+            )
+            by_ceiling = self.measure_ceilings(sound, seg, points, ceilings)
+
+        # 1. Standard Ceiling (5500 Hz)
+        meas = by_ceiling[ceilings[0]]
+        primary_f2 = meas[0][1]
+
+        # 2. Use the deep voice ceiling if the back vowel F2 is missing/too high
+        threshold = REFERENCE_F2_THRESHOLD if is_reference else STUDENT_F2_THRESHOLD
+        if len(ceilings) > 1 and (np.isnan(primary_f2) or primary_f2 > threshold):
+            return by_ceiling[ceilings[1]], True
+        return meas, False
+
+    def analyze_samples(
+        self,
+        y: np.ndarray[Any, Any],
+        sr: int,
+        target_vowel: str,
+        is_reference: bool = False,
+    ) -> Tuple[List[Tuple[float, float]], bool]:
+        """Analyzes already-decoded mono samples."""
+        if len(y) == 0:
+            points = self.points_for(target_vowel)
+            return [(float(np.nan), float(np.nan))] * len(points), False
+
+        snd: Any = parselmouth.Sound(y, sampling_frequency=sr)  # type: ignore
+        return self.analyze_sound(snd, target_vowel, is_reference)
+
+    def analyze_path(
+        self, filepath: Path | str, target_vowel: str, is_reference: bool = False
+    ) -> Tuple[List[Tuple[float, float]], bool]:
+        """Loads an audio file and analyzes it."""
+        with metrics.measuring("reference" if is_reference else "student"):
+            with metrics.stage("load"):
+                y, sr = load_audio_mono(filepath)
+        return self.analyze_samples(y, sr, target_vowel, is_reference)
+
+
+# Shared instance (worker, CLI and warmup)
+formant_analyzer = FormantAnalyzer()
+
+
 def measure_formants(
     sound: Any,
     segment: Optional[Tuple[float, float]],
     points: Tuple[float, ...] = (0.5,),
-    ceiling: float = 5500.0,
+    ceiling: float = STANDARD_CEILING,
 ) -> List[Tuple[float, float]]:
     """
     Measures F1 and F2 at specified time points within the segment.
     """
-    if segment is None:
-        return [(float(np.nan), float(np.nan))] * len(points)
+    return formant_analyzer.measure_ceilings(sound, segment, points, (ceiling,))[
+        ceiling
+    ]
+
 
-    t0, t1 = segment
-    dur = t1 - t0
+def analyze_formants_from_path(
+    filepath: Path | str, target_vowel: str, is_reference: bool = False
+) -> Tuple[List[Tuple[float, float]], bool]:
+    """
+    Analyzes an audio file and returns a list of (F1, F2) tuples and a boolean
+    indicating if deep voice correction (4000Hz ceiling) was applied.
+    """
+    return formant_analyzer.analyze_path(filepath, target_vowel, is_reference)
 
-    formant = sound.to_formant_burg(
-        time_step=0.01, max_number_of_formants=5, maximum_formant=ceiling
+
+def reference_audio_path(word_text: str) -> Path:
+    """Location of a Word's reference recording (static/audio/<word>.mp3)."""
+    from flask import current_app
+
+    return Path(str(cast(str, current_app.config["AUDIO_FOLDER"]))) / (
+        f"{word_text.lower()}.mp3"
     )
 
-    results: List[Tuple[float, float]] = []
 
-    for p in points:
-        t = t0 + (dur * p)
-        f1 = cast(float, formant.get_value_at_time(1, t))
-        f2 = cast(float, formant.get_value_at_time(2, t))
+def get_reference_formants(
+    word_text: str, target_vowel: str
+) -> Tuple[List[Tuple[float, float]], bool]:
+    """Reference measurements for a word (see reference_measurement)."""
+    meas, is_corrected, _ = reference_measurement(word_text, target_vowel)
+    return meas, is_corrected
 
-        # Robust filtering
-        if np.isnan(f1) or f1 < 50 or f1 > 1200:
-            f1 = float(np.nan)
-        if np.isnan(f2) or f2 < 200 or f2 > 4000:
-            f2 = float(np.nan)
 
-        results.append((f1, f2))
-    return results
+def reference_measurement(
+    word_text: str, target_vowel: str
+) -> Tuple[List[Tuple[float, float]], bool, Optional[str]]:
+    """
+    Returns (measurements, is_deep_voice_corrected, audio hash) for a word's
+    reference, reusing the persisted ReferenceMeasurement when the MP3 content
+    and engine parameters are unchanged.
+    On a miss the reference is analyzed once and stored (caller commits).
+    """
+    from sqlalchemy.exc import IntegrityError
 
+    from models import ReferenceMeasurement, db
 
-def analyze_formants_from_path(
-    filepath: Path | str, target_vowel: str, is_reference: bool = False
-) -> Tuple[List[Tuple[float, float]], bool]:
+    word_key = word_text.lower()
+    ref_path = reference_audio_path(word_key)
+    audio_hash = file_content_hash(ref_path)
+    if audio_hash is None:
+        logger.warning("Reference file missing: %s", ref_path)
+        meas, is_corrected = formant_analyzer.analyze_path(
+            ref_path, target_vowel, is_reference=True
+        )
+        return meas, is_corrected, None
+
+    params_hash = engine_params_hash()
+    cached = cast(
+        ReferenceMeasurement | None,
+        ReferenceMeasurement.query.filter_by(
+            word_text=word_key,
+            audio_hash=audio_hash,
+            vowel=target_vowel,
+            params_hash=params_hash,
+        ).first(),
+    )
+    if cached:
+        return (
+            cached.as_measurements(),
+            bool(cached.is_deep_voice_corrected),
+            audio_hash,
+        )
+
+    meas, is_corrected = formant_analyzer.analyze_path(
+        ref_path, target_vowel, is_reference=True
+    )
+
+    # Drop entries for a previous version of this word's audio
+    ReferenceMeasurement.query.filter(
+        ReferenceMeasurement.word_text == word_key,
+        db.or_(
+            ReferenceMeasurement.audio_hash != audio_hash,
+            ReferenceMeasurement.params_hash != params_hash,
+        ),
+    ).delete(synchronize_session=False)
+
+    entry = ReferenceMeasurement(
+        word_text=word_key,
+        audio_hash=audio_hash,
+        vowel=target_vowel,
+        params_hash=params_hash,
+        measurements=meas,
+        is_deep_voice_corrected=is_corrected,
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(entry)
+    except IntegrityError:
+        # Another worker cached the same reference concurrently
+        pass
+
+    return meas, is_corrected, audio_hash
+
+
+def refresh_reference_measurement(word_text: str, target_vowel: str | None) -> bool:
     """
-    Analyzes an audio file and returns a list of (F1, F2) tuples and a boolean
-    indicating if deep voice correction (4000Hz ceiling) was applied.
+    (Re)builds the cached reference measurement after a Word's audio was
+    created or replaced. Commits its own transaction.
     """
-    v_type = get_vowel_type(target_vowel)
-    points = (0.2, 0.8) if v_type == "diphthong" else (0.5,)
+    from models import db
+
+    if not target_vowel:
+        # Nothing to measure until the stressed vowel is known
+        return False
+
+    try:
+        get_reference_formants(word_text, target_vowel)
+        db.session.commit()
+        return True
+    except Exception:
+        logger.exception("Reference cache refresh failed for '%s'", word_text)
+        db.session.rollback()
+        return False
 
-    y, sr = load_audio_mono(filepath)
-    if len(y) == 0:
-        return [(float(np.nan), float(np.nan))] * len(points), False
 
-    snd: Any = parselmouth.Sound(y, sampling_frequency=sr)  # type: ignore
-    seg = find_syllable_nucleus(snd)
+def prime_reference_cache() -> int:
+    """
+    Makes sure every Word with a reference recording has a persisted
+    ReferenceMeasurement for the current engine parameters, so the first
+    submission for a word never pays for analyzing its reference.
+    Commits; returns the number of references checked.
+    """
+    from models import Word, db
+
+    words = cast(
+        List[Word],
+        Word.query.filter(
+            Word.audio_path.isnot(None),  # type: ignore
+            Word.stressed_vowel.isnot(None),  # type: ignore
+        ).all(),
+    )
+    for word in words:
+        try:
+            reference_measurement(cast(str, word.text), cast(str, word.stressed_vowel))
+        except Exception:
+            logger.exception("Reference priming failed for '%s'", word.text)
+    db.session.commit()
+    return len(words)
 
-    # 1. Try Standard Ceiling (5500 Hz)
-    meas = measure_formants(snd, seg, points, ceiling=5500.0)
-    primary_f2 = meas[0][1]
 
-    # 2. Retry if Deep Back Vowel detected
-    # Thresholds: Student > 1500, Reference > 1600 (from original thesis logic)
-    threshold = 1600 if is_reference else 1500
+def warm_up() -> float:
+    """
+    Pays the one-off costs of the analysis path in the current process:
+    numba JIT for the librosa kernels (resampling, RMS/ZCR trimming), the
+    MP3 encoder used for uploads, and the parselmouth pitch/intensity/Burg
+    chain. Returns the seconds spent.
+    """
+    import time
 
-    is_corrected = False
+    from scripts.audio_processing import warm_up_preprocessing
 
-    if target_vowel in BACK_VOWELS:
-        if np.isnan(primary_f2) or primary_f2 > threshold:
-            meas = measure_formants(snd, seg, points, ceiling=4000.0)
-            is_corrected = True
+    started = time.perf_counter()
+    warm_up_preprocessing(TARGET_SR)
 
-    return meas, is_corrected
+    # A voiced tone, so the nucleus search finds a segment and Burg runs
+    t = np.arange(TARGET_SR // 2, dtype=np.float32) / TARGET_SR
+    y = (0.1 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+    with metrics.measuring(None):
+        formant_analyzer.analyze_samples(y, TARGET_SR, "a")
+        formant_analyzer.analyze_samples(y, TARGET_SR, "a", is_reference=True)
+
+    return time.perf_counter() - started
 
 
 def get_articulatory_feedback(
@@ -261,135 +649,238 @@ def calculate_distance(
     return avg_hz, avg_bark
 
 
-def process_submission(submission_id: int) -> bool:
+def score_measurements(
+    meas_s: List[Tuple[float, float]],
+    meas_r: List[Tuple[float, float]],
+    alpha: float,
+    is_deep_corrected: bool,
+) -> Dict[str, Any]:
+    """
+    AnalysisResult field values for one student/reference measurement pair
+    at the given VTLN alpha. Shared by process_submission and batch re-analysis.
+    """
+    f1s_raw, f2s_raw = meas_s[0]
+    f1r, f2r = meas_r[0]
+
+    # Re-calc distance with this alpha
+    dist_hz, dist_bark = calculate_distance(meas_s, meas_r, alpha)
+
+    return {
+        "f1_raw": f1s_raw,
+        "f2_raw": f2s_raw,
+        "f1_ref": f1r,
+        "f2_ref": f2r,
+        "scaling_factor": alpha,
+        # Specific normalized formants for storage
+        "f1_norm": f1s_raw / alpha if not np.isnan(f1s_raw) else float(np.nan),
+        "f2_norm": f2s_raw / alpha if not np.isnan(f2s_raw) else float(np.nan),
+        "distance_hz": dist_hz,
+        "distance_bark": dist_bark,
+        # Diagnostic flags
+        "is_deep_voice_corrected": is_deep_corrected,
+        "is_outlier": (
+            dist_bark > OUTLIER_THRESHOLD_BARK if not np.isnan(dist_bark) else False
+        ),
+    }
+
+
+def score_from_distance(dist_bark: float) -> int:
+    """Simplified 0-100 score shown to students (and stored on Submission)."""
+    return max(0, min(100, int(100 - (dist_bark * 20))))
+
+
+# Reference lookups shared across a batch: (word, vowel) -> (measurements, hash)
+ReferenceMemo = Dict[Tuple[str, str], Tuple[List[Tuple[float, float]], Optional[str]]]
+
+
+def process_submission(
+    submission_id: int,
+    samples: Optional[np.ndarray[Any, Any]] = None,
+    stage_timings: Optional[Callable[[], Dict[str, float]]] = None,
+) -> bool:
     """
     Performs full acoustic analysis on a submission and saves the result to DB.
     Uses Cumulative VTLN (Median of all past + current ratios).
+    `samples` (mono, TARGET_SR) skips loading the student file when the
+    caller already has the processed audio in memory. `stage_timings` is
+    called just before the commit; its result is stored on the
+    AnalysisResult in that same commit.
     """
-    from flask import current_app
-
-    from models import AnalysisResult, Submission, db
+    from models import Submission, db
 
     try:
         # 1. Load Data
         sub = Submission.query.get(submission_id)
         if not sub:
-            print(f"Submission {submission_id} not found.")
+            logger.warning("Submission %s not found.", submission_id)
             return False
 
-        user_id: int = sub.user_id
-        word_text: str = sub.target_word.text.lower()
-        target_vowel: str = sub.target_word.stressed_vowel
-
-        # Resolve Paths
-        # sub.file_path is relative (e.g., "1/uuid.mp3")
-        # word.audio_path is relative (e.g., "word.mp3") - Check Model!
-        # Actually Word model stores "static/audio/word.mp3" usually?
-        # Let's assume standard location based on config if Word.audio_path is missing/unreliable
-        student_path = Path(str(cast(str, current_app.config["UPLOAD_FOLDER"]))) / str(
-            sub.file_path
+        result = analyze_submission(sub, samples=samples)
+        if result is None:
+            return False
+        if stage_timings is not None:
+            result.stage_timings = stage_timings()
+
+        with metrics.stage("commit"):
+            db.session.commit()
+        logger.info(
+            "Analysis saved for Sub %s. Alpha=%.3f, Dist=%.2f Bark",
+            submission_id,
+            result.scaling_factor,
+            result.distance_bark,
         )
+        return True
 
-        # Robust Reference Path Logic
-        ref_filename = f"{word_text}.mp3"
-        ref_path = (
-            Path(str(cast(str, current_app.config["AUDIO_FOLDER"]))) / ref_filename
-        )
+    except Exception:
+        logger.exception("Analysis failed for Sub %s", submission_id)
+        db.session.rollback()
+        return False
 
-        if not student_path.exists():
-            print(f"Student file missing: {student_path}")
-            return False
-        if not ref_path.exists():
-            print(f"Reference file missing: {ref_path}")
-            # Ensure we don't crash, maybe log error?
-            pass
 
-        # 2. Analyze Current
-        meas_s, is_deep_corrected = analyze_formants_from_path(
-            student_path, target_vowel, is_reference=False
+def process_submissions(submission_ids: List[int]) -> Dict[int, bool]:
+    """
+    Batch form of process_submission: submissions are grouped by word so each
+    reference is looked up once, each one runs in its own savepoint (a failure
+    only drops that submission) and the batch is committed once.
+    """
+    from models import Submission, db
+
+    outcome = {sid: False for sid in submission_ids}
+    subs = cast(
+        List[Any],
+        Submission.query.options(db.joinedload(Submission.target_word))  # type: ignore
+        .filter(Submission.id.in_(submission_ids))  # type: ignore
+        .all(),
+    )
+    subs.sort(key=lambda sub: (sub.word_id, sub.id))
+
+    references: ReferenceMemo = {}
+    for sub in subs:
+        try:
+            with db.session.begin_nested(), metrics.collect_stages() as timings:
+                result = analyze_submission(sub, references=references)
+                outcome[sub.id] = result is not None
+                if result is not None:
+                    # The batch commit is shared, so it is not part of these
+                    result.stage_timings = metrics.rounded(timings)
+        except Exception:
+            logger.exception("Analysis failed for Sub %s", sub.id)
+
+    try:
+        db.session.commit()
+    except Exception:
+        logger.exception("Batch commit failed")
+        db.session.rollback()
+        return {sid: False for sid in submission_ids}
+    return outcome
+
+
+def analyze_submission(
+    sub: Any,
+    samples: Optional[np.ndarray[Any, Any]] = None,
+    references: Optional[ReferenceMemo] = None,
+) -> Any:
+    """
+    Analyzes one Submission and stages its AnalysisResult, VTLN state and
+    progress summary in the session (caller commits). Returns the
+    AnalysisResult, or None if the student audio is missing.
+    """
+    from flask import current_app
+
+    from models import AnalysisResult, StudentProgress, VtlnState, db
+
+    submission_id: int = sub.id
+    user_id: int = sub.user_id
+    word_text: str = sub.target_word.text.lower()
+    target_vowel: str = sub.target_word.stressed_vowel
+
+    # Resolve Paths
+    # sub.file_path is relative (e.g., "1/uuid.mp3")
+    # The reference lives at AUDIO_FOLDER/<word>.mp3 (see reference_audio_path)
+    student_path = Path(str(cast(str, current_app.config["UPLOAD_FOLDER"]))) / str(
+        sub.file_path
+    )
+
+    if samples is None and not student_path.exists():
+        logger.warning("Student file missing: %s", student_path)
+        return None
+
+    # 2. Analyze Current (reference comes from the persisted cache)
+    if samples is not None:
+        meas_s, is_deep_corrected = formant_analyzer.analyze_samples(
+            _peak_normalize(samples), TARGET_SR, target_vowel, is_reference=False
         )
-        meas_r, _ = analyze_formants_from_path(
-            ref_path, target_vowel, is_reference=True
+    else:
+        meas_s, is_deep_corrected = formant_analyzer.analyze_path(
+            student_path, target_vowel, is_reference=False
         )
 
-        f1s_raw, f2s_raw = meas_s[0]
-        f1r, f2r = meas_r[0]
+    ref_key = (word_text, target_vowel)
+    if references is not None and ref_key in references:
+        meas_r, ref_audio_hash = references[ref_key]
+    else:
+        with metrics.stage("reference"):
+            meas_r, _, ref_audio_hash = reference_measurement(word_text, target_vowel)
+        if references is not None:
+            references[ref_key] = (meas_r, ref_audio_hash)
 
-        # 3. Calculate Cumulative Alpha
-        all_ratios: List[float] = []
+    f1s_raw, f2s_raw = meas_s[0]
+    f1r, f2r = meas_r[0]
 
-        # A) Get historical ratios from DB
-        # Join Submission to filter by user_id
-        history = (
-            cast(Any, AnalysisResult.query.join(Submission))
-            .filter(Submission.user_id == user_id)
-            .all()
-        )
+    # 3. Calculate Cumulative Alpha
+    # The user's running VTLN state holds every past ratio in sorted order
+    # (row-locked, so concurrent submissions of one user serialize here).
+    with metrics.stage("vtln"):
+        state = VtlnState.for_user(user_id)
 
-        for h in history:
-            h = cast(AnalysisResult, h)
-            if h.f1_raw and h.f1_ref and h.f1_ref > 0:
-                all_ratios.append(h.f1_raw / h.f1_ref)
-            if h.f2_raw and h.f2_ref and h.f2_ref > 0:
-                all_ratios.append(h.f2_raw / h.f2_ref)
-
-        # B) Add current ratios
-        if not np.isnan(f1s_raw) and not np.isnan(f1r) and f1r > 0:
-            all_ratios.append(f1s_raw / f1r)
-        if not np.isnan(f2s_raw) and not np.isnan(f2r) and f2r > 0:
-            all_ratios.append(f2s_raw / f2r)
-
-        # C) Compute Median
-        if all_ratios:
-            alpha = float(np.median(all_ratios))
-        else:
-            alpha = 1.0
-
-        # 4. Normalize & Score
-        # Re-calc distance with this alpha
-        dist_hz, dist_bark = calculate_distance(meas_s, meas_r, alpha)
-
-        # Calculate specific normalized formants for storage
-        f1_norm = f1s_raw / alpha if not np.isnan(f1s_raw) else float(np.nan)
-        f2_norm = f2s_raw / alpha if not np.isnan(f2s_raw) else float(np.nan)
-
-        # 5. Save Logic
-        # Check if exists (idempotency)
         existing_result = cast(
             AnalysisResult | None,
             AnalysisResult.query.filter_by(submission_id=submission_id).first(),
         )
         if existing_result:
-            result = existing_result
-        else:
-            result = AnalysisResult(submission_id=submission_id)
-
-        result.f1_raw = f1s_raw
-        result.f2_raw = f2s_raw
-        result.f1_ref = f1r
-        result.f2_ref = f2r
-        result.scaling_factor = alpha
-        result.f1_norm = f1_norm
-        result.f2_norm = f2_norm
-        result.distance_hz = dist_hz
-        result.distance_bark = dist_bark
-
-        # Diagnostic flags
-        result.is_deep_voice_corrected = is_deep_corrected
-
-        # Outlier Logic: Threshold > 5.0 Bark
-        result.is_outlier = dist_bark > 5.0 if not np.isnan(dist_bark) else False
-
-        if not existing_result:
-            db.session.add(result)
-
-        db.session.commit()
-        print(
-            f"Analysis saved for Sub {submission_id}. Alpha={alpha:.3f}, Dist={dist_bark:.2f} Bark"
-        )
-        return True
-
-    except Exception as e:
-        print(f"Analysis Failed: {e}")
-        db.session.rollback()
-        return False
+            # Re-analysis: replace this submission's previous contribution
+            state.remove_ratios(
+                VtlnState.ratios_for(
+                    existing_result.f1_raw,
+                    existing_result.f2_raw,
+                    existing_result.f1_ref,
+                    existing_result.f2_ref,
+                )
+            )
+        state.add_ratios(VtlnState.ratios_for(f1s_raw, f2s_raw, f1r, f2r))
+        alpha = state.median()
+
+    # 4. Normalize & Score
+    fields = score_measurements(meas_s, meas_r, alpha, is_deep_corrected)
+    if is_deep_corrected:
+        metrics.DEEP_VOICE_CORRECTIONS.inc()
+    if fields["is_outlier"]:
+        metrics.OUTLIERS.inc()
+
+    # 5. Save Logic
+    if existing_result:
+        result = existing_result
+    else:
+        result = AnalysisResult(submission_id=submission_id)
+
+    for name, value in fields.items():
+        setattr(result, name, value)
+
+    # Provenance
+    result.engine_hash = result_params_hash()
+    # Sidecar when present (the fused path saves it from `samples` first)
+    result.audio_hash = analysis_input_hash(student_path)
+    result.ref_audio_hash = ref_audio_hash
+
+    if not existing_result:
+        db.session.add(result)
+
+    # Simplified score shown to the student, committed together with the
+    # result (same rule as tasks.build_result_payload)
+    dist = cast(float, result.distance_bark) or 0.0
+    if not math.isnan(dist):
+        sub.score = score_from_distance(dist)
+
+    # Dashboard flags live in the summary row; same transaction
+    StudentProgress.refresh(user_id)
+    return result
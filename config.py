@@ -36,8 +36,75 @@ class Config:
     AUDIO_FOLDER = os.path.join(basedir, "static", "audio")
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload
 
+    # Audio Preprocessing (trim/normalize/encode of /api/process_audio uploads)
+    # "sync": inside the gunicorn request thread
+    # "async": raw upload is saved to disk and a Celery task does the work
+    AUDIO_PREPROCESS_MODE = os.environ.get("AUDIO_PREPROCESS_MODE", "sync").lower()
+    # One worker task trims, encodes and scores the upload (/api/submit_audio)
+    FUSED_SUBMIT_PIPELINE = os.environ.get(
+        "FUSED_SUBMIT_PIPELINE", "false"
+    ).lower() in ["true", "on", "1"]
+
+    # Longest /api/status/<task_id>?wait=N long-poll (holds one gunicorn thread)
+    STATUS_MAX_WAIT = float(os.environ.get("STATUS_MAX_WAIT", "25"))
+    # Long-polls held at once per gunicorn worker; keep below its thread count
+    # (gunicorn_config.threads) so uploads and pages always find a free thread
+    STATUS_MAX_WAITERS = int(os.environ.get("STATUS_MAX_WAITERS", "16"))
+
+    # Submissions analyzed per worker invocation (1 = one task, one submission)
+    SUBMISSION_BATCH_SIZE = int(os.environ.get("SUBMISSION_BATCH_SIZE", "1"))
+    # How long a batch waits for a burst to accumulate before it starts
+    SUBMISSION_BATCH_WAIT_MS = int(os.environ.get("SUBMISSION_BATCH_WAIT_MS", "50"))
+
+    # Request profiling (scripts/profiler.py): per-request SQL stats in a
+    # Server-Timing header, slow-request logs, and sampled cProfile captures
+    # while the `enable_profiling` SystemConfig toggle is on
+    REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING", "true").lower() in [
+        "true",
+        "on",
+        "1",
+    ]
+    SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "1000"))
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.05"))
+    PROFILER = os.environ.get("PROFILER", "cprofile").lower()  # or "pyinstrument"
+    PROFILE_FOLDER = os.path.join(basedir, "logs", "profiles")
+
     # Celery / Redis
     CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND = os.environ.get(
         "CELERY_RESULT_BACKEND", "redis://localhost:6379/0"
     )
+
+    # Queues: "interactive" is what students wait on; "bulk" (reference
+    # regeneration) and "mail" must never sit in front of it. Run separate
+    # workers, e.g. `celery -A flask_app.celery worker -Q interactive`.
+    CELERY_QUEUES = ["interactive", "bulk", "mail"]
+    CELERY_CONFIG = {
+        "broker_url": CELERY_BROKER_URL,
+        "result_backend": CELERY_RESULT_BACKEND,
+        "task_default_queue": "bulk",
+        "task_routes": {
+            "tasks.async_process_submission": {"queue": "interactive"},
+            "tasks.async_process_upload": {"queue": "interactive"},
+            "tasks.async_process_audio": {"queue": "interactive"},
+            "tasks.recover_claimed_submission": {"queue": "interactive"},
+            "tasks.refresh_reference": {"queue": "bulk"},
+            "tasks.send_email": {"queue": "mail"},
+        },
+        # Ack after the task body so a restarted worker doesn't drop a scoring job
+        "task_acks_late": True,
+        "worker_prefetch_multiplier": 1,
+    }
+    # Applied by the worker for the queue it consumes (first -Q entry);
+    # explicit --concurrency on the command line still wins
+    CELERY_QUEUE_PROFILES = {
+        "interactive": {
+            "concurrency": int(os.environ.get("CELERY_INTERACTIVE_CONCURRENCY", "4")),
+            "prefetch_multiplier": 1,
+        },
+        "bulk": {
+            "concurrency": int(os.environ.get("CELERY_BULK_CONCURRENCY", "1")),
+            "prefetch_multiplier": 1,
+        },
+        "mail": {"concurrency": 2, "prefetch_multiplier": 4},
+    }
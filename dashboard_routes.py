@@ -1,29 +1,42 @@
 # pyright: strict
+import math
 import os
 import shutil
 import uuid
 from typing import Any, Dict, List, cast, Tuple
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 import psutil
 from flask import (
     Blueprint,
+    Response,
     current_app,
     flash,
     jsonify,
     redirect,
     render_template,
     request,
+    send_file,
     send_from_directory,
     url_for,
     session,
+    stream_with_context,
 )
 from flask_login import current_user, login_required  # type: ignore
 from werkzeug.utils import secure_filename
 
-from models import Submission, SystemConfig, User, Word, InviteCode, db
-from scripts import parser as word_parser
-from scripts.audio_processing import process_audio_data
+from models import (
+    AnalysisResult,
+    InviteCode,
+    ReferenceMeasurement,
+    StudentProgress,
+    Submission,
+    SystemConfig,
+    User,
+    VtlnState,
+    Word,
+    db,
+)
 from scripts.mailer import send_admin_change_password_notification
 
 
@@ -151,6 +164,7 @@ def admin_dashboard():
         "registration_open": SystemConfig.get_bool("registration_open", True),
         "maintenance_mode": SystemConfig.get_bool("maintenance_mode", False),
         "enable_logging": SystemConfig.get_bool("enable_logging", False),
+        "enable_profiling": SystemConfig.get_bool("enable_profiling", False),
     }
     # If the keys don't exist, set them to their default values
     if SystemConfig.get("registration_open") is None:
@@ -159,6 +173,8 @@ def admin_dashboard():
         SystemConfig.set("maintenance_mode", False)
     if SystemConfig.get("enable_logging") is None:
         SystemConfig.set("enable_logging", False)
+    if SystemConfig.get("enable_profiling") is None:
+        SystemConfig.set("enable_profiling", False)
     db.session.commit()
 
     # --- Invite Codes ---
@@ -178,6 +194,18 @@ def admin_dashboard():
     )
 
 
+# Words per test; progress percent is min(100, distinct words * 100 / 20)
+WORDS_PER_TEST = 20
+
+
+def _progress_percent(count: Any) -> Any:
+    """SQL form of min(100, int(count / WORDS_PER_TEST * 100))."""
+    count = db.func.coalesce(count, 0)
+    return db.case(
+        (count >= WORDS_PER_TEST, 100), else_=count * 100 / WORDS_PER_TEST
+    )
+
+
 @dashboards.route("/teacher")
 @login_required
 def teacher_dashboard():
@@ -185,73 +213,54 @@ def teacher_dashboard():
         flash("Access denied. Instructor privileges required.", "danger")
         return redirect(url_for("index"))
 
-    # --- 1. Class Stats Calculation (All Students) ---
-    all_students = cast(
-        List[User],
-        User.query.filter(db.or_(User.role == "student", User.is_guest == True)).all(),
-    )
+    student_filter = db.or_(User.role == "student", User.is_guest == True)
 
-    total_pre_progress = 0
-    total_post_progress = 0
-    deep_voice_count = 0
-    outlier_count = 0
-    missing_count = 0
-    active_today = 0
-    today_date = datetime.now(timezone.utc).date()
-
-    for s in all_students:
-        subs = cast(List[Submission], s.submissions.all())
-        # Progress Calculation
-        pre_subs = [cast(Any, sub) for sub in subs if sub.test_type == "pre"]
-        post_subs = [cast(Any, sub) for sub in subs if sub.test_type == "post"]
-
-        pre_count = len({sub.word_id for sub in pre_subs})
-        post_count = len({sub.word_id for sub in post_subs})
-
-        pre_pct = min(100, int((pre_count / 20) * 100))
-        post_pct = min(100, int((post_count / 20) * 100))
-
-        total_pre_progress += pre_pct
-        total_post_progress += post_pct
-
-        if subs:
-            # Sort by timestamp descending to get latest
-            subs.sort(key=lambda x: cast(Any, x).timestamp, reverse=True)
-            last_sub = cast(Any, subs[0])
-            if last_sub.timestamp.date() == today_date:
-                active_today += 1
-
-            # Count distinct students with flags
-            has_deep_voice = any(
-                cast(Any, sub).analysis
-                and cast(Any, sub).analysis.is_deep_voice_corrected
-                for sub in subs
-            )
-            has_outlier = any(
-                cast(Any, sub).analysis and cast(Any, sub).analysis.is_outlier
-                for sub in subs
-            )
-            has_missing = any(
-                cast(Any, sub).analysis
-                and cast(Any, sub).analysis.distance_bark is None
-                for sub in subs
+    # --- 1. Class Stats Calculation (All Students, from the summary table) ---
+    activity = StudentProgress.__table__
+    today_start = datetime.combine(
+        datetime.now(timezone.utc).date(), datetime.min.time()
+    )
+    today_end = today_start + timedelta(days=1)
+
+    stats_row = cast(
+        Any,
+        db.session.query(
+            db.func.count(User.id).label("num_students"),
+            db.func.coalesce(
+                db.func.sum(_progress_percent(activity.c.pre_count)), 0
+            ).label("pre_total"),
+            db.func.coalesce(
+                db.func.sum(_progress_percent(activity.c.post_count)), 0
+            ).label("post_total"),
+            db.func.count(activity.c.user_id)
+            .filter(activity.c.has_deep_voice == True)
+            .label("deep_voice"),
+            db.func.count(activity.c.user_id)
+            .filter(activity.c.has_outlier == True)
+            .label("outlier"),
+            db.func.count(activity.c.user_id)
+            .filter(activity.c.has_missing == True)
+            .label("missing"),
+            db.func.count(activity.c.user_id)
+            .filter(
+                activity.c.last_active >= today_start,
+                activity.c.last_active < today_end,
             )
+            .label("active_today"),
+        )
+        .outerjoin(activity, activity.c.user_id == User.id)
+        .filter(student_filter)
+        .one(),
+    )
 
-            if has_deep_voice:
-                deep_voice_count += 1
-            if has_outlier:
-                outlier_count += 1
-            if has_missing:
-                missing_count += 1
-
-    num_students = len(all_students) if all_students else 1
+    num_students = stats_row.num_students or 1
     class_stats = {
-        "avg_pre_completion": int(total_pre_progress / num_students),
-        "avg_post_completion": int(total_post_progress / num_students),
-        "deep_voice_count": deep_voice_count,
-        "outlier_count": outlier_count,
-        "missing_count": missing_count,
-        "active_today": active_today,
+        "avg_pre_completion": int(stats_row.pre_total / num_students),
+        "avg_post_completion": int(stats_row.post_total / num_students),
+        "deep_voice_count": int(stats_row.deep_voice),
+        "outlier_count": int(stats_row.outlier),
+        "missing_count": int(stats_row.missing),
+        "active_today": int(stats_row.active_today),
     }
 
     # --- 2. Table Data (Paginated & Searched) ---
@@ -259,7 +268,7 @@ def teacher_dashboard():
     search_query = request.args.get("search", "")
     per_page = 10
 
-    query = User.query.filter(db.or_(User.role == "student", User.is_guest == True))
+    query = User.query.filter(student_filter)
 
     if search_query:
         search_term = f"%{search_query}%"
@@ -272,37 +281,21 @@ def teacher_dashboard():
             )
         )
 
-    pagination = query.order_by(User.first_name.asc()).paginate(  # type: ignore
-        page=page, per_page=per_page, error_out=False
+    pagination = (
+        query.options(db.joinedload(User.progress))  # type: ignore
+        .order_by(User.first_name.asc())
+        .paginate(page=page, per_page=per_page, error_out=False)
     )
 
     student_data: List[Dict[str, Any]] = []
 
     for s in pagination.items:
-        user_s = cast(User, s)
-        subs = cast(List[Submission], user_s.submissions.all())
-        # Quick re-calc for table view only
-        pre_count = len({sub.word_id for sub in subs if sub.test_type == "pre"})
-        post_count = len({sub.word_id for sub in subs if sub.test_type == "post"})
-
-        pre_pct = min(100, int((pre_count / 20) * 100))
-        post_pct = min(100, int((post_count / 20) * 100))
-
-        last_active_str = "Never"
-        has_deep_voice = False
-        has_outlier = False
-        has_missing = False
-
-        if subs:
-            subs.sort(key=lambda x: x.timestamp, reverse=True)
-            last_active_str = subs[0].timestamp.strftime("%Y-%m-%d %H:%M")
-            has_deep_voice = any(
-                sub.analysis and sub.analysis.is_deep_voice_corrected for sub in subs
-            )
-            has_outlier = any(sub.analysis and sub.analysis.is_outlier for sub in subs)
-            has_missing = any(
-                sub.analysis and sub.analysis.distance_bark is None for sub in subs
-            )
+        row = cast(StudentProgress | None, s.progress)
+        pre_count = row.pre_count if row else 0
+        post_count = row.post_count if row else 0
+
+        pre_pct = min(100, int((pre_count / WORDS_PER_TEST) * 100))
+        post_pct = min(100, int((post_count / WORDS_PER_TEST) * 100))
 
         student_data.append(
             {
@@ -316,10 +309,14 @@ def teacher_dashboard():
                 "post_completed_count": post_count,
                 "pre_progress_percent": pre_pct,
                 "post_progress_percent": post_pct,
-                "last_active_str": last_active_str,
-                "has_deep_voice": has_deep_voice,
-                "has_outlier": has_outlier,
-                "has_missing": has_missing,
+                "last_active_str": (
+                    row.last_active.strftime("%Y-%m-%d %H:%M")
+                    if row and row.last_active
+                    else "Never"
+                ),
+                "has_deep_voice": bool(row and row.has_deep_voice),
+                "has_outlier": bool(row and row.has_outlier),
+                "has_missing": bool(row and row.has_missing),
             }
         )
 
@@ -349,7 +346,9 @@ def student_detail(user_id: int):
     page = request.args.get("page", 1, type=int)
     per_page = 10
 
-    query = student.submissions.order_by(Submission.timestamp.desc())
+    query = Submission.with_details(student.submissions).order_by(
+        Submission.timestamp.desc()
+    )
 
     if test_type_filter in ["pre", "post"]:
         query = query.filter(Submission.test_type == test_type_filter)
@@ -373,48 +372,87 @@ def research_dashboard():
         flash("Access denied.", "danger")
         return redirect(url_for("index"))
 
-    from models import AnalysisResult
+    from scripts.research_data import FILTER_KEYS, research_query
+
+    # Rows are loaded by the page from /teacher/research/data
+    has_data = cast(Any, research_query().limit(1)).first() is not None
 
-    # Fetch all analysis results with related data
-    results = (
-        db.session.query(AnalysisResult, Submission, User, Word)
-        .join(Submission, AnalysisResult.submission_id == Submission.id)
-        .join(User, Submission.user_id == User.id)
-        .join(Word, Submission.word_id == Word.id)
-        .filter(User.role == "student")  # type: ignore # Only analyze students
-        .all()
+    # The filter form submits back here; the page passes the same args on to
+    # the data API and the export links
+    filters = {key: request.args.get(key, "") for key in FILTER_KEYS}
+    words = cast(
+        List[Any],
+        db.session.query(Word.text, Word.stressed_vowel)
+        .order_by(Word.sequence_order)
+        .all(),
     )
+    vowels = sorted({cast(str, vowel) for _, vowel in words if vowel})
 
-    data: List[Any] = []
-    for res, sub, user, word in results:  # type: ignore
-        # Flatten data for easier JS consumption
-        data.append(
-            {
-                "username": user.username,
-                "student_id": user.student_id,
-                "word": word.text,
-                "vowel": word.stressed_vowel,
-                "f1_s": (
-                    res.f1_norm if res.f1_norm == res.f1_norm else None
-                ),  # Check for NaN
-                "f2_s": res.f2_norm if res.f2_norm == res.f2_norm else None,
-                "f1_r": res.f1_ref if res.f1_ref == res.f1_ref else None,
-                "f2_r": res.f2_ref if res.f2_ref == res.f2_ref else None,
-                "dist_bark": (
-                    res.distance_bark
-                    if res.distance_bark == res.distance_bark
-                    else None
-                ),
-                "alpha": (
-                    res.scaling_factor
-                    if res.scaling_factor == res.scaling_factor
-                    else 1.0
-                ),
-                "is_outlier": res.is_outlier,
-            }
-        )
+    return render_template(
+        "dashboards/research_view.html",
+        has_data=has_data,
+        filters=filters,
+        active_filters={k: v for k, v in filters.items() if v},
+        words=[cast(str, text) for text, _ in words],
+        vowels=vowels,
+    )
+
+
+@dashboards.route("/teacher/research/data")
+@login_required
+def research_data():
+    """
+    Keyset-paginated research rows.
+    Query: after=<last id>, limit, vowel, word, test_type, date_from, date_to.
+    """
+    if current_user.role not in ["teacher", "admin"]:
+        return jsonify({"error": "Access denied"}), 403
+
+    from scripts.research_data import PAGE_SIZE, fetch_page, parse_filters
+
+    try:
+        filters = parse_filters(request.args)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    rows, next_cursor = fetch_page(
+        filters,
+        after_id=request.args.get("after", 0, type=int),
+        limit=request.args.get("limit", PAGE_SIZE, type=int),
+    )
+    return jsonify({"rows": rows, "next_cursor": next_cursor})
+
+
+@dashboards.route("/teacher/research/export.<fmt>")
+@login_required
+def research_export(fmt: str):
+    """Streams the (filtered) research dataset as NDJSON or CSV."""
+    if current_user.role not in ["teacher", "admin"]:
+        return jsonify({"error": "Access denied"}), 403
 
-    return render_template("dashboards/research_view.html", analysis_data=data)
+    from scripts.research_data import iter_csv, iter_ndjson, parse_filters
+
+    writers = {
+        "ndjson": (iter_ndjson, "application/x-ndjson"),
+        "csv": (iter_csv, "text/csv"),
+    }
+    if fmt not in writers:
+        return jsonify({"error": "Unsupported format"}), 404
+
+    try:
+        filters = parse_filters(request.args)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    writer, mimetype = writers[fmt]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return Response(
+        stream_with_context(writer(filters)),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=research_{timestamp}.{fmt}"
+        },
+    )
 
 
 @dashboards.route("/admin/user/<int:user_id>/edit", methods=["GET", "POST"])
@@ -639,7 +677,12 @@ def update_config():
     key = data.get("key")
     value = data.get("value")
 
-    if key not in ["registration_open", "maintenance_mode", "enable_logging"]:
+    if key not in [
+        "registration_open",
+        "maintenance_mode",
+        "enable_logging",
+        "enable_profiling",
+    ]:
         return jsonify({"success": False, "error": "Invalid configuration key"}), 400
 
     try:
@@ -651,6 +694,7 @@ def update_config():
         return jsonify({"success": True, "key": key, "value": value})
     except Exception as e:
         db.session.rollback()
+        SystemConfig.invalidate_cache()
         current_app.logger.error(f"Error updating system config: {e}")
         return (
             jsonify({"success": False, "error": "Database error occurred"}),
@@ -658,6 +702,116 @@ def update_config():
         )
 
 
+@dashboards.route("/admin/queues")
+@login_required
+def queue_status():
+    """Celery queue depths, so admins can see a backfill piling up."""
+    if current_user.role != "admin":
+        return jsonify({"error": "Access denied"}), 403
+
+    from scripts.task_status import queue_depths
+
+    queues = cast(List[str], current_app.config["CELERY_QUEUES"])
+    try:
+        depths = queue_depths(current_app.extensions["celery"], queues)
+    except Exception as e:
+        current_app.logger.error(f"Could not read queue depths: {e}")
+        return jsonify({"error": "Broker unavailable"}), 503
+    return jsonify({"queues": depths})
+
+
+# Stored stage timings in pipeline order (see tasks._stage_timings); they are
+# saved in the result's own commit, so "commit" only appears on older rows.
+# Stages not listed here are shown after these
+STAGE_ORDER = [
+    "queue_wait",
+    "preprocess",
+    "load",
+    "nucleus",
+    "burg",
+    "reference",
+    "vtln",
+    "commit",
+    "total",
+]
+STAGE_PERCENTILES = (50, 90, 99)
+# Newest timed results summarized per page load
+STAGE_TIMING_LIMIT = 5000
+
+
+def _percentile(sorted_values: List[float], p: int) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dashboards.route("/admin/stage-timings")
+@login_required
+def stage_timings():
+    """Scoring latency percentiles per pipeline stage, overall and per word."""
+    if current_user.role != "admin":
+        flash("Access denied.", "danger")
+        return redirect(url_for("index"))
+
+    days = max(1, request.args.get("days", 7, type=int))
+    percentile = request.args.get("p", 90, type=int)
+    if percentile not in STAGE_PERCENTILES:
+        percentile = 90
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = AnalysisResult.recent_stage_timings(since, STAGE_TIMING_LIMIT)
+
+    by_stage: Dict[str, List[float]] = {}
+    by_word: Dict[str, Dict[str, List[float]]] = {}
+    word_counts: Dict[str, int] = {}
+    for word_text, timings in rows:
+        word_counts[word_text] = word_counts.get(word_text, 0) + 1
+        word_stages = by_word.setdefault(word_text, {})
+        for name, ms in timings.items():
+            by_stage.setdefault(name, []).append(ms)
+            word_stages.setdefault(name, []).append(ms)
+
+    stages = [name for name in STAGE_ORDER if name in by_stage] + sorted(
+        set(by_stage) - set(STAGE_ORDER)
+    )
+
+    overall: List[Dict[str, Any]] = []
+    for name in stages:
+        values = sorted(by_stage[name])
+        overall.append(
+            {
+                "stage": name,
+                "count": len(values),
+                "percentiles": [_percentile(values, p) for p in STAGE_PERCENTILES],
+                "max": values[-1],
+            }
+        )
+
+    per_word: List[Dict[str, Any]] = []
+    for word_text, word_stages in by_word.items():
+        cells: Dict[str, float | None] = {}
+        for name in stages:
+            values = sorted(word_stages.get(name, []))
+            cells[name] = _percentile(values, percentile) if values else None
+        per_word.append(
+            {"word": word_text, "count": word_counts[word_text], "stages": cells}
+        )
+    # Slowest words first
+    per_word.sort(key=lambda w: -(w["stages"].get("total") or 0.0))
+
+    return render_template(
+        "dashboards/stage_timings.html",
+        days=days,
+        percentile=percentile,
+        percentiles=STAGE_PERCENTILES,
+        sample_count=len(rows),
+        sample_limit=STAGE_TIMING_LIMIT,
+        stages=stages,
+        overall=overall,
+        per_word=per_word,
+    )
+
+
 @dashboards.route("/admin/logs/download")
 @login_required
 def download_logs():
@@ -677,6 +831,75 @@ def download_logs():
     return send_from_directory(directory=log_dir, path=log_filename, as_attachment=True)
 
 
+@dashboards.route("/admin/research/export.<fmt>")
+@login_required
+def download_research_columnar(fmt: str):
+    """Admin download of the research dataset as Parquet or Arrow IPC."""
+    if current_user.role != "admin":
+        flash("Access denied.", "danger")
+        return redirect(url_for("index"))
+
+    import tempfile
+
+    from scripts.research_data import COLUMNAR_FORMATS, export_columnar
+
+    if fmt not in COLUMNAR_FORMATS:
+        flash("Unsupported export format.", "warning")
+        return redirect(url_for("dashboards.admin_dashboard"))
+
+    # ?since=<ISO date/time> exports only results scored or re-analyzed later
+    filters: Dict[str, Any] = {}
+    since = request.args.get("since")
+    if since:
+        try:
+            filters["updated_after"] = datetime.fromisoformat(since)
+        except ValueError:
+            flash("Invalid 'since' timestamp.", "warning")
+            return redirect(url_for("dashboards.admin_dashboard"))
+
+    fd, tmp_path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        rows = export_columnar(tmp_path, fmt, filters)
+    except RuntimeError as e:
+        os.remove(tmp_path)
+        flash(str(e), "danger")
+        return redirect(url_for("dashboards.admin_dashboard"))
+
+    current_app.logger.info(
+        f"Admin '{current_user.username}' exported {rows} research rows ({fmt})."
+    )
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    response = send_file(
+        tmp_path,
+        as_attachment=True,
+        download_name=f"research_{timestamp}.{fmt}",
+    )
+    response.call_on_close(lambda: os.remove(tmp_path))
+    return response
+
+
+def _queue_reference_refresh(word: Word) -> None:
+    """
+    Queues re-measuring a saved word's reference recording (bulk queue).
+    A broker outage only costs the precomputation: the reference is then
+    measured by the first submission for the word.
+    """
+    try:
+        current_app.extensions["celery"].send_task(
+            "tasks.refresh_reference", args=[word.text, word.stressed_vowel]
+        )
+    except Exception as e:
+        current_app.logger.error(
+            f"Could not queue reference refresh for '{word.text}': {e}"
+        )
+        flash(
+            "The word was saved, but its reference recording could not be queued "
+            "for measuring; the first submission for it will measure it instead.",
+            "warning",
+        )
+
+
 @dashboards.route("/admin/generate-pronunciation")
 @login_required
 def generate_pronunciation():
@@ -687,6 +910,9 @@ def generate_pronunciation():
     if not word_text:
         return jsonify({"error": "Word parameter is required"}), 400
 
+    from scripts import parser as word_parser
+    from scripts.audio_processing import process_audio_data
+
     try:
         # Implicitly typed library return
         # We expect tuple(ipa, bytes) or similar.
@@ -718,6 +944,8 @@ def generate_pronunciation():
             db_audio_path = f"audio/{filename}"
             session["generated_audio_path"] = db_audio_path
             response_data["audio_path"] = url_for("static", filename=db_audio_path)
+            # The reference is re-measured once add_word / edit_word commits
+            # the generated audio
 
         return jsonify(response_data)
 
@@ -767,6 +995,9 @@ def add_word():
         db.session.add(new_word)
         db.session.commit()
 
+        if new_word.audio_path:
+            _queue_reference_refresh(new_word)
+
         flash(f"Successfully added the word '{word_text}'.", "success")
         next_url = request.args.get("next")
         if next_url:
@@ -806,6 +1037,7 @@ def edit_word(word_id: int):
         word.ipa = ipa
 
         # Handle audio file update
+        audio_changed = False
         if audio_file and audio_file.filename:
             # If a new file is uploaded, save it and update path
             audio_folder = os.path.join(current_app.static_folder or "static", "audio")
@@ -813,11 +1045,16 @@ def edit_word(word_id: int):
             audio_path = os.path.join(audio_folder, filename)
             audio_file.save(audio_path)
             word.audio_path = f"audio/{filename}"
+            audio_changed = True
         elif session.get("generated_audio_path"):
             # If a file was generated, use that path
             word.audio_path = session.pop("generated_audio_path", None)
+            audio_changed = True
 
         db.session.commit()
+
+        if audio_changed:
+            _queue_reference_refresh(word)
         flash(f"Successfully updated '{word_text}'.", "success")
         next_url = request.args.get("next")
         if next_url:
@@ -836,6 +1073,8 @@ def delete_word(word_id: int):
         flash("Access denied.", "danger")
         return redirect(url_for("index"))
 
+    from scripts.audio_processing import remove_processed_audio
+
     word = Word.query.get_or_404(word_id)
     word_text = word.text
     next_url = request.args.get("next")
@@ -852,7 +1091,8 @@ def delete_word(word_id: int):
         # 1. Delete associated submissions if requested
         if delete_submissions_flag:
             submissions = cast(
-                List[Submission], Submission.query.filter_by(word_id=word_id).all()
+                List[Submission],
+                Submission.with_analysis().filter_by(word_id=word_id).all(),
             )
             for sub in submissions:
                 # Delete associated analysis results (cascade should handle this)
@@ -861,9 +1101,13 @@ def delete_word(word_id: int):
                     full_path = os.path.join(
                         cast(str, current_app.config["UPLOAD_FOLDER"]), sub.file_path
                     )
-                    if os.path.exists(full_path):
-                        os.remove(full_path)
+                    remove_processed_audio(full_path)
+                # Keep the student's running VTLN alpha consistent
+                if sub.analysis:
+                    VtlnState.discard_result(sub.user_id, sub.analysis)
                 db.session.delete(sub)
+            for user_id in {sub.user_id for sub in submissions}:
+                StudentProgress.refresh(user_id)
             flash(f"Deleted all student submissions for '{word_text}'.", "info")
 
         if word.audio_path:
@@ -872,6 +1116,9 @@ def delete_word(word_id: int):
             if os.path.exists(full_audio_path):
                 os.remove(full_audio_path)
 
+        # 2b. Drop cached reference measurements for this word
+        ReferenceMeasurement.query.filter_by(word_text=word_text.lower()).delete()
+
         # 3. Delete the word itself
         db.session.delete(word)
         db.session.commit()
@@ -923,6 +1170,8 @@ def delete_user(user_id: int):
         flash("Access denied.", "danger")
         return redirect(url_for("index"))
 
+    from scripts.audio_processing import remove_processed_audio
+
     user_to_delete = User.query.get_or_404(user_id)
 
     # Safety check: prevent admin from deleting their own account
@@ -973,7 +1222,7 @@ def delete_user(user_id: int):
         # Bulk delete ( .delete() ) would fail due to Postgres FK constraints
         submissions = cast(
             List[Submission],
-            Submission.query.filter_by(user_id=user_to_delete.id).all(),
+            Submission.with_analysis().filter_by(user_id=user_to_delete.id).all(),
         )
         for sub in submissions:
             # Also delete physical file if needed
@@ -981,11 +1230,10 @@ def delete_user(user_id: int):
                 full_path = os.path.join(
                     cast(str, current_app.config["UPLOAD_FOLDER"]), sub.file_path
                 )
-                if os.path.exists(full_path):
-                    try:
-                        os.remove(full_path)
-                    except OSError:
-                        pass  # Warn but continue
+                try:
+                    remove_processed_audio(full_path)
+                except OSError:
+                    pass  # Warn but continue
             db.session.delete(sub)
 
         # 3. Delete the user record from DB
@@ -1018,7 +1266,7 @@ def delete_user(user_id: int):
 def get_analysis_data(submission_id: int):
     """Returns analysis data for a specific submission."""
     # Ensure user has access (Teacher can view all, Student only their own)
-    submission = Submission.query.get_or_404(submission_id)
+    submission = Submission.with_details().get_or_404(submission_id)
     if current_user.role == "student" and submission.user_id != current_user.id:
         return jsonify({"error": "Access denied"}), 403
 
@@ -3,7 +3,7 @@ import logging
 import os
 import uuid
 from logging.handlers import RotatingFileHandler
-from typing import Any, Optional, cast, List
+from typing import Any, Dict, Optional, cast, List, Tuple
 
 import click
 from flask import (
@@ -22,8 +22,9 @@ from flask_migrate import Migrate
 from auth_routes import auth
 from config import Config
 from dashboard_routes import dashboards
-from models import Submission, SystemConfig, User, Word, db, mail
-from scripts.audio_processing import process_audio_data
+from models import StudentProgress, Submission, SystemConfig, User, Word, db, mail
+from scripts import metrics
+from scripts.profiler import init_profiler
 
 # 1. Initialize Flask Application
 # --- Sentry Integration (Production Observability) ---
@@ -37,8 +38,11 @@ if sentry_sdk and os.environ.get("SENTRY_DSN"):
     sentry_sdk.init(  # type: ignore
         dsn=os.environ.get("SENTRY_DSN"),
         integrations=[FlaskIntegration()],  # type: ignore
-        traces_sample_rate=1.0,
-        profiles_sample_rate=1.0,
+        # Tracing every request is costly; sample unless told otherwise
+        traces_sample_rate=float(os.environ.get("SENTRY_TRACES_SAMPLE_RATE", "0.1")),
+        profiles_sample_rate=float(
+            os.environ.get("SENTRY_PROFILES_SAMPLE_RATE", "0.1")
+        ),
     )
 
 app = Flask(__name__)
@@ -46,6 +50,15 @@ app.config.from_object(Config)
 
 # --- Celery Setup ---
 from celery import Celery, Task  # type: ignore
+from celery.signals import (  # type: ignore
+    before_task_publish,
+    celeryd_init,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from kombu import Queue  # type: ignore
 
 
 def celery_init_app(app: Flask) -> Celery:
@@ -58,6 +71,29 @@ def celery_init_app(app: Flask) -> Celery:
     celery_app.config_from_object(  # type: ignore
         app.config["CELERY_CONFIG"] if "CELERY_CONFIG" in app.config else app.config
     )  # type: ignore
+    # A worker started without -Q consumes every queue (dev / single box)
+    celery_app.conf.task_queues = [  # type: ignore
+        Queue(name) for name in app.config.get("CELERY_QUEUES", [])
+    ] or None
+
+    @celeryd_init.connect(weak=False)  # type: ignore
+    def apply_queue_profile(conf: Any = None, options: Any = None, **kwargs: Any):
+        """Per-queue concurrency/prefetch for the queue this worker serves."""
+        queues = (options or {}).get("queues") or []
+        if isinstance(queues, str):
+            queues = queues.split(",")
+        profiles = cast(
+            Dict[str, Dict[str, int]], app.config.get("CELERY_QUEUE_PROFILES", {})
+        )
+        profile = profiles.get(queues[0].strip()) if queues else None
+        if profile:
+            conf.worker_concurrency = profile["concurrency"]
+            conf.worker_prefetch_multiplier = profile["prefetch_multiplier"]
+
+    # Queue wait: publish time rides in a message header (scripts/metrics.py)
+    before_task_publish.connect(metrics.stamp_enqueued_at, weak=False)  # type: ignore
+    task_prerun.connect(metrics.observe_queue_wait, weak=False)  # type: ignore
+
     celery_app.set_default()
     app.extensions["celery"] = celery_app
     return celery_app
@@ -65,6 +101,44 @@ def celery_init_app(app: Flask) -> Celery:
 
 celery = celery_init_app(app)
 
+
+# --- Celery worker warmup ---
+# worker_init runs in the worker's main process before the pool forks, so
+# prefork children (including ones recycled later) start with the modules
+# imported and the numba kernels compiled. worker_process_init re-runs the
+# (by then cheap) warmup in each child and reports it ready.
+@worker_init.connect(weak=False)  # type: ignore
+def warm_celery_worker(**kwargs: Any):
+    from analysis_engine import prime_reference_cache, warm_up
+
+    try:
+        elapsed = warm_up()
+        with app.app_context(), metrics.measuring(None):
+            count = prime_reference_cache()
+            # Children must not inherit the parent's pooled DB connections
+            db.engine.dispose()
+        app.logger.info(
+            f"Celery worker warm: engine {elapsed:.1f}s, {count} references primed"
+        )
+    except Exception as e:
+        app.logger.warning(f"Celery worker warmup failed: {e}")
+
+
+@worker_process_init.connect(weak=False)  # type: ignore
+def warm_celery_process(**kwargs: Any):
+    from analysis_engine import warm_up
+
+    try:
+        elapsed = warm_up()
+        app.logger.info(f"Worker process {os.getpid()} ready ({elapsed:.2f}s)")
+    except Exception as e:
+        app.logger.warning(f"Worker process {os.getpid()} warmup failed: {e}")
+
+
+@worker_process_shutdown.connect(weak=False)  # type: ignore
+def release_celery_process_metrics(**kwargs: Any):
+    metrics.mark_process_dead(os.getpid())
+
 # Import tasks to ensure they are registered with the Celery worker
 import tasks  # noqa: F401  # type: ignore
 
@@ -93,6 +167,7 @@ if not app.debug and not app.testing:
 db.init_app(app)
 migrate = Migrate(app, db)
 mail.init_app(app)
+init_profiler(app)
 
 # 3. Configure Flask-Login
 login_manager = LoginManager()
@@ -162,6 +237,7 @@ def index() -> str | Response:
             "index.html",
             user=current_user,
             enable_logging=SystemConfig.get_bool("enable_logging"),
+            fused_pipeline=app.config["FUSED_SUBMIT_PIPELINE"],
         )
     return render_template("login.html")
 
@@ -178,6 +254,17 @@ def manual() -> str:
     return render_template("manual.html")
 
 
+@app.route("/metrics")
+def prometheus_metrics() -> Response:
+    """
+    Prometheus scrape endpoint (analysis pipeline histograms and counters,
+    summed over gunicorn and Celery processes; see scripts/metrics.py).
+    Not authenticated: nginx only lets local scrapers reach it.
+    """
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
 @app.route("/admin/init")
 def init_metrics() -> Response | tuple[Response, int]:
     """
@@ -242,22 +329,23 @@ def get_word_list() -> Response | tuple[Response, int]:
 @login_required
 def get_progress():
     """Returns user progress for strict stage enforcement."""
-    # Query submissions by test_type (not phase)
-    pre_subs = cast(List[Submission], Submission.query.filter_by(user_id=current_user.id, test_type="pre").all())  # type: ignore
-    post_subs = cast(
-        List[Submission],
-        Submission.query.filter_by(user_id=current_user.id, test_type="post").all(),
-    )
+    progress = StudentProgress.for_user(current_user.id)
+    db.session.commit()
 
-    # Type checker cannot infer 's' type in list comprehension correctly when casting
-    # So we iterate explicitly
-    pre_words: List[str] = []
-    for s in pre_subs:  # type: ignore
-        pre_words.append(cast(Any, s).target_word.text)  # type: ignore
+    # Word ids come from the summary row; only their texts are looked up
+    pre_ids = cast(List[int], progress.pre_word_ids)
+    post_ids = cast(List[int], progress.post_word_ids)
+    word_texts = dict(
+        cast(
+            List[Tuple[int, str]],
+            db.session.query(Word.id, Word.text)
+            .filter(Word.id.in_(pre_ids + post_ids))  # type: ignore
+            .all(),
+        )
+    )
 
-    post_words: List[str] = []
-    for s in post_subs:  # type: ignore
-        post_words.append(cast(Any, s).target_word.text)  # type: ignore
+    pre_words = [word_texts[w] for w in pre_ids if w in word_texts]
+    post_words = [word_texts[w] for w in post_ids if w in word_texts]
 
     # Simple logic: if pre is full, stage is post.
     # We know there are 20 words.
@@ -272,7 +360,8 @@ def api_process_audio() -> Response | tuple[Response, int]:
     """
     Receives raw audio blob, processes it (trim/normalize), and saves it.
     Input: Multipart form data with 'audio' file.
-    Output: JSON with 'url' of processed file.
+    Output: JSON with 'url' of processed file, or (AUDIO_PREPROCESS_MODE=async)
+    202 with a 'task_id' whose result carries the same fields.
     """
     if "audio" not in request.files:
         return jsonify({"error": "No audio file provided"}), 400
@@ -285,14 +374,6 @@ def api_process_audio() -> Response | tuple[Response, int]:
         return jsonify({"error": "No selected file"}), 400
 
     try:
-        # Read raw bytes
-        raw_data = file.read()
-
-        # Process (Trim, Normalize, Convert to MP3)
-        processed_data = process_audio_data(
-            raw_data, noise_floor=noise_floor if noise_floor is not None else 0.0
-        )
-
         # Generate specific filename for this upload
         # Structure: uploads/<user_id>/<uuid>.mp3
         user_upload_dir = os.path.join(
@@ -300,19 +381,49 @@ def api_process_audio() -> Response | tuple[Response, int]:
         )
         os.makedirs(user_upload_dir, exist_ok=True)
 
-        filename = f"{uuid.uuid4().hex}.mp3"
+        file_id = uuid.uuid4().hex
+        filename = f"{file_id}.mp3"
         filepath = os.path.join(user_upload_dir, filename)
 
-        # Save to disk
-        with open(filepath, "wb") as f:
-            f.write(processed_data)
-
         # Return URL accessible via static route (or custom route)
         # We need a route to serve these if they are outside 'static'
         # Assuming UPLOAD_FOLDER is mapped or we serve via endpoint
         # Let's return a relative path that the frontend can use with a serving endpoint
         relative_path = f"{current_user.id}/{filename}"
 
+        if app.config["AUDIO_PREPROCESS_MODE"] == "async":
+            # Stream the raw upload to disk and let a worker trim/encode it.
+            # The client waits on /api/status/<task_id> for the final path/url.
+            raw_relative_path = f"{current_user.id}/{file_id}.upload"
+            file.save(os.path.join(user_upload_dir, f"{file_id}.upload"))
+
+            task = cast(
+                Any,
+                celery.send_task(  # type: ignore
+                    "tasks.async_process_audio",
+                    args=[raw_relative_path, relative_path, noise_floor],
+                ),
+            )
+            return jsonify({"status": "processing", "task_id": task.id}), 202
+
+        # Sync mode is the only web path that needs the DSP stack
+        from scripts.audio_processing import (
+            process_audio_with_samples,
+            save_processed_audio,
+        )
+
+        # Read raw bytes
+        raw_data = file.read()
+
+        # Process (Trim, Normalize, Convert to MP3)
+        # Samples are kept so the worker can skip decoding the MP3 again
+        processed_data, samples = process_audio_with_samples(
+            raw_data, noise_floor=noise_floor if noise_floor is not None else 0.0
+        )
+
+        # Save to disk (MP3 for playback + lossless sidecar for analysis)
+        save_processed_audio(filepath, processed_data, samples)
+
         return jsonify(
             {
                 "status": "success",
@@ -367,29 +478,106 @@ def submit_recording() -> Response | tuple[Response, int]:
         # Score will be updated after analysis
     )
     db.session.add(sub)
+    StudentProgress.refresh(current_user.id)
     db.session.commit()
 
-    # 2. Trigger Analysis Engine (ASYNC)
-    # Use send_task to avoid circular imports and type checker issues
-    task = cast(Any, celery.send_task("tasks.async_process_submission", args=[sub.id]))  # type: ignore
+    # 2. Trigger Analysis Engine (ASYNC, possibly batched with other submissions)
+    task_id = tasks.dispatch_submission(sub.id)
 
-    return jsonify({"status": "processing", "task_id": task.id}), 202
+    return jsonify({"status": "processing", "task_id": task_id}), 202
 
     return jsonify({"status": "error", "message": "Analysis failed"}), 500
 
 
+@app.route("/api/submit_audio", methods=["POST"])
+@login_required
+def submit_audio() -> Response | tuple[Response, int]:
+    """
+    Fused upload + analysis (FUSED_SUBMIT_PIPELINE).
+    Input: Multipart form data with 'audio', 'word_id', 'test_type', 'noiseFloor'.
+    Output: 202 with a 'task_id'; the task result is the submit_recording
+    payload plus the 'path'/'url' of the processed file.
+    """
+    if not app.config["FUSED_SUBMIT_PIPELINE"]:
+        return jsonify({"error": "Not found"}), 404
+
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    file = request.files["audio"]
+    noise_floor: Optional[float] = request.form.get("noiseFloor", type=float)
+    word_id = request.form.get("word_id", type=int)
+    test_type = request.form.get("test_type", "pre")
+
+    if file.filename == "":
+        return jsonify({"error": "No selected file"}), 400
+    if not word_id:
+        return jsonify({"error": "Missing word_id"}), 400
+    if test_type not in ("pre", "post"):
+        return jsonify({"error": "test_type must be 'pre' or 'post'"}), 400
+
+    word = Word.query.get(word_id)
+    if not word:
+        return jsonify({"error": "Word not found"}), 404
+
+    user_upload_dir = os.path.join(
+        cast(str, app.config["UPLOAD_FOLDER"]), str(current_user.id)
+    )
+    os.makedirs(user_upload_dir, exist_ok=True)
+
+    # The raw upload goes straight to disk; the worker writes <uuid>.mp3
+    file_id = uuid.uuid4().hex
+    raw_relative_path = f"{current_user.id}/{file_id}.upload"
+    file.save(os.path.join(user_upload_dir, f"{file_id}.upload"))
+
+    sub = Submission(
+        user_id=current_user.id,
+        word_id=word.id,
+        file_path=f"{current_user.id}/{file_id}.mp3",
+        test_type=test_type,
+    )
+    db.session.add(sub)
+    StudentProgress.refresh(current_user.id)
+    db.session.commit()
+
+    task = cast(
+        Any,
+        celery.send_task(  # type: ignore
+            "tasks.async_process_upload",
+            args=[sub.id, raw_relative_path, noise_floor],
+        ),
+    )
+    return jsonify({"status": "processing", "task_id": task.id}), 202
+
+
 @app.route("/api/status/<task_id>")
 @login_required
 def get_task_status(task_id: str):
     """
     Poll this endpoint to check if the analysis is done.
+    With ?wait=N (seconds, capped by STATUS_MAX_WAIT) the request is held open
+    until the worker publishes the result, so clients need no polling loop.
     """
     from celery.result import AsyncResult  # type: ignore
+    from scripts.task_status import wait_for_result, waiter_slot
 
     task_result = AsyncResult(task_id)  # type: ignore
 
+    wait = min(
+        request.args.get("wait", 0.0, type=float),
+        cast(float, app.config["STATUS_MAX_WAIT"]),
+    )
+    with waiter_slot(cast(int, app.config["STATUS_MAX_WAITERS"])) as granted:
+        if granted:
+            wait_for_result(task_result, wait)
+
+    processing: Dict[str, Any] = {"status": "processing"}
+    if wait > 0 and not granted:
+        # All long-poll slots taken: the client falls back to plain polling
+        processing["retry_after"] = 2
+
     if task_result.state == "PENDING":  # type: ignore
-        return jsonify({"status": "processing"})
+        return jsonify(processing)
     elif task_result.state == "SUCCESS":  # type: ignore
         return jsonify(
             task_result.result  # type: ignore
@@ -397,7 +585,7 @@ def get_task_status(task_id: str):
     elif task_result.state == "FAILURE":  # type: ignore
         return jsonify({"status": "error", "message": str(task_result.result)}), 500  # type: ignore
     else:
-        return jsonify({"status": "processing"})
+        return jsonify(processing)
 
     # Ensure default config exists
     if not SystemConfig.get("maintenance_mode"):
@@ -419,6 +607,149 @@ def process_submission_cmd(submission_id: str):
         print(f"Failed to process submission {submission_id}")
 
 
+@app.cli.command("reanalyze")
+@click.option("--word", default=None, help="Only submissions of this word.")
+@click.option("--user-id", type=int, default=None, help="Only this user.")
+@click.option("--date-from", default=None, help="YYYY-MM-DD (inclusive).")
+@click.option("--date-to", default=None, help="YYYY-MM-DD (inclusive).")
+@click.option("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+@click.option("--batch-size", type=int, default=200, help="Results per commit.")
+@click.option("--checkpoint", default="reanalyze_checkpoint.json")
+@click.option("--restart", is_flag=True, help="Ignore an existing checkpoint.")
+@click.option(
+    "--stale-only",
+    is_flag=True,
+    help="Only missing results or ones from another engine/reference version.",
+)
+@click.option("--plan", is_flag=True, help="Report stale results per word and exit.")
+def reanalyze_cmd(
+    word: Optional[str],
+    user_id: Optional[int],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    workers: int,
+    batch_size: int,
+    checkpoint: str,
+    restart: bool,
+    stale_only: bool,
+    plan: bool,
+):
+    """Re-run the analysis engine over stored submissions in parallel."""
+    from scripts.reanalyze import plan_stale, run_reanalysis
+
+    filters = {
+        "word": word,
+        "user_id": user_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "stale_only": stale_only,
+    }
+
+    if plan:
+        report = plan_stale(filters)
+        print(
+            f"{'Word':<16}{'Total':>8}{'Stale':>8}"
+            f"{'Missing':>9}{'Engine':>8}{'Ref':>6}{'Audio':>7}"
+        )
+        for row in report:
+            print(
+                f"{row['word']:<16}{row['total']:>8}{row['stale']:>8}"
+                f"{row['missing']:>9}{row['engine']:>8}"
+                f"{row['reference']:>6}{row['audio']:>7}"
+            )
+        print(
+            f"{sum(r['stale'] for r in report)} of "
+            f"{sum(r['total'] for r in report)} submission(s) need re-analysis."
+        )
+        return
+
+    written, failed = run_reanalysis(
+        cast(str, app.config["UPLOAD_FOLDER"]),
+        filters,
+        workers=workers,
+        batch_size=batch_size,
+        checkpoint_path=checkpoint,
+        restart=restart,
+    )
+    print(f"Re-analysis finished: {written} written, {failed} failed.")
+
+
+@app.cli.command("rebuild-vtln")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def rebuild_vtln_cmd(user_id: Optional[int]):
+    """Rebuild per-user VTLN state from stored analysis results."""
+    from models import VtlnState
+
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [
+            cast(int, row[0])
+            for row in db.session.query(Submission.user_id).distinct().all()
+        ]
+
+    for uid in user_ids:
+        state = VtlnState.rebuild(uid)
+        print(f"User {uid}: {state.ratio_count} ratios, alpha={state.median():.3f}")
+    db.session.commit()
+    print(f"Rebuilt VTLN state for {len(user_ids)} user(s).")
+
+
+@app.cli.command("rebuild-progress")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def rebuild_progress_cmd(user_id: Optional[int]):
+    """Rebuild the per-student progress summary from submissions."""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [
+            cast(int, row[0])
+            for row in db.session.query(Submission.user_id).distinct().all()
+        ]
+
+    for uid in user_ids:
+        progress = StudentProgress.refresh(uid)
+        print(f"User {uid}: pre={progress.pre_count} post={progress.post_count}")
+    db.session.commit()
+    print(f"Rebuilt progress for {len(user_ids)} user(s).")
+
+
+@app.cli.command("export-research")
+@click.argument("out_path")
+@click.option(
+    "--format", "fmt", type=click.Choice(["parquet", "arrow"]), default="parquet"
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only results scored or re-analyzed since the last incremental export.",
+)
+def export_research_cmd(out_path: str, fmt: str, incremental: bool):
+    """Export analysis results + word/submission metadata to a columnar file."""
+    from scripts.research_data import export_columnar, incremental_filters
+
+    filters: dict[str, Any] = {}
+    watermark = None
+    if incremental:
+        last = SystemConfig.get("research_export_watermark")
+        filters, watermark = incremental_filters(last)
+        print(
+            f"Exporting results updated after {last or 'the beginning'} "
+            f"up to {watermark.isoformat()}..."
+        )
+
+    try:
+        rows = export_columnar(out_path, fmt, filters)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+
+    if watermark is not None:
+        SystemConfig.set("research_export_watermark", watermark.isoformat())
+        db.session.commit()
+    print(f"Wrote {rows} rows to {out_path}.")
+
+
 @app.cli.command("init-words")
 def init_words_command():
     """Populate the database with the thesis word list."""
@@ -435,58 +766,30 @@ def init_words_command():
 # --- JIT WARMUP ---
 def warmup_audio_engine():
     """
-    Executes a dummy analysis on startup to trigger JIT compilation
-    for Librosa and Numba functions. This prevents the request from
-    being slow for the user.
+    Pre-imports the upload preprocessing stack (librosa, soundfile) and runs
+    one synthetic upload through it so numba JIT happens before the first
+    recording. Only web workers that trim uploads themselves need this
+    (AUDIO_PREPROCESS_MODE=sync); formant analysis lives in the Celery
+    workers, which warm themselves (see warm_celery_worker).
+
+    Not run on import: gunicorn calls it from post_worker_init in a
+    background thread, so neither worker boot nor `flask` CLI commands wait.
     """
-    # Only run in production (Gunicorn) or when asked, to avoid slowing down dev reload excessively
-    # But since user complained, we enable it generally, just logging it.
+    if app.config["AUDIO_PREPROCESS_MODE"] != "sync":
+        return
     try:
-        # Check if running in Flask Dev Server (Reloader) or Gunicorn
-        # If not (e.g., CLI script), skip warmup to save time/logs.
-        is_server = os.environ.get("WERKZEUG_RUN_MAIN") == "true" or os.environ.get(
-            "GUNICORN_CMD_ARGS"
-        )
+        import time
+
+        from scripts.audio_processing import warm_up_preprocessing
 
-        if not is_server:
-            return
-
-        app.logger.info("Warming up Audio Engine (JIT Compilation)...")
-        import numpy as np
-        import soundfile as sf  # type: ignore
-        import tempfile
-        from analysis_engine import analyze_formants_from_path
-
-        # Create 0.5s of silence
-        sr = 16000
-        y = np.zeros(int(sr * 0.5), dtype=np.float32)
-
-        # Use temp file (Windows fix: close file before soundfile opens it)
-        tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        tmp_path = tmp.name
-        tmp.close()  # Close handle so soundfile can open it on Windows
-
-        try:
-            sf.write(tmp_path, y, sr)  # type: ignore
-            # Run analysis (Trigger JIT)
-            # We use a dummy target vowel 'a'
-            analyze_formants_from_path(tmp_path, "a")
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-
-        app.logger.info("Audio Engine Ready!")
+        started = time.perf_counter()
+        warm_up_preprocessing()
+        app.logger.info(
+            f"Upload preprocessing warm ({time.perf_counter() - started:.1f}s)"
+        )
     except Exception as e:
         app.logger.warning(f"Audio Engine Warmup failed: {e}")
 
 
-# Execute Warmup (Runs on module import)
-# We wrap it in a try-block at top level just in case
-try:
-    warmup_audio_engine()
-except:
-    pass
-
 if __name__ == "__main__":
     app.run(debug=True)
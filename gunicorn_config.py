@@ -1,11 +1,16 @@
 # pyright: strict
+import os
+from typing import Any
 
 
 # Binding to a unix socket is more performant than TCP
 bind = "unix:pronounce-web.sock"
 # workers = multiprocessing.cpu_count() * 2 + 1
 workers = 3
-threads = 2
+# Status long-polls mostly sleep on Redis, so threads are cheap here. Each
+# worker holds at most STATUS_MAX_WAITERS (16) long-polls; the other threads
+# stay free for uploads and pages. 3 x 24 threads serve 48 waiting students.
+threads = int(os.environ.get("GUNICORN_THREADS", "24"))
 worker_class = "gthread"
 timeout = 120  # Extended timeout for audio processing
 keepalive = 5
@@ -19,3 +24,20 @@ loglevel = "info"
 limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
+
+
+def post_worker_init(worker: Any) -> None:
+    # Warm the upload path off the boot path: the worker starts serving at
+    # once and the first sync upload finds librosa already imported/compiled
+    import threading
+
+    from flask_app import warmup_audio_engine
+
+    threading.Thread(target=warmup_audio_engine, daemon=True).start()
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    # Multiprocess Prometheus metrics: retire the dead worker's live files
+    from scripts.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,38 @@
+"""Add vtln_states table
+
+Revision ID: 006bb7c2924e
+Revises: f209fd53255e
+Create Date: 2026-10-16 10:04:17.552390
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "006bb7c2924e"
+down_revision = "f209fd53255e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing users are seeded lazily on their next submission,
+    # or all at once with `flask rebuild-vtln`.
+    op.create_table(
+        "vtln_states",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("ratio_count", sa.Integer(), nullable=False),
+        sa.Column("ratios", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("vtln_states")
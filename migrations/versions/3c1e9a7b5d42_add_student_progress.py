@@ -0,0 +1,44 @@
+"""Add student_progress summary table
+
+Revision ID: 3c1e9a7b5d42
+Revises: 006bb7c2924e
+Create Date: 2026-10-16 13:21:08.904716
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c1e9a7b5d42"
+down_revision = "006bb7c2924e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fill with `flask rebuild-progress` after upgrading; students without a
+    # row get one built on their next submission or /get_progress call.
+    op.create_table(
+        "student_progress",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("pre_count", sa.Integer(), nullable=False),
+        sa.Column("post_count", sa.Integer(), nullable=False),
+        sa.Column("pre_word_ids", sa.JSON(), nullable=False),
+        sa.Column("post_word_ids", sa.JSON(), nullable=False),
+        sa.Column("last_active", sa.DateTime(), nullable=True),
+        sa.Column("has_deep_voice", sa.Boolean(), nullable=False),
+        sa.Column("has_outlier", sa.Boolean(), nullable=False),
+        sa.Column("has_missing", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("student_progress")
@@ -0,0 +1,34 @@
+"""Add provenance columns to analysis_results
+
+Revision ID: 9d4f2b7e1a36
+Revises: 3c1e9a7b5d42
+Create Date: 2026-10-16 15:02:51.117384
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9d4f2b7e1a36"
+down_revision = "3c1e9a7b5d42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL and are reported as stale by `flask reanalyze --plan`
+    with op.batch_alter_table("analysis_results", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("engine_hash", sa.String(length=40), nullable=True))
+        batch_op.add_column(sa.Column("audio_hash", sa.String(length=64), nullable=True))
+        batch_op.add_column(
+            sa.Column("ref_audio_hash", sa.String(length=64), nullable=True)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("analysis_results", schema=None) as batch_op:
+        batch_op.drop_column("ref_audio_hash")
+        batch_op.drop_column("audio_hash")
+        batch_op.drop_column("engine_hash")
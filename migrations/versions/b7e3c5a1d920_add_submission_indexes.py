@@ -0,0 +1,122 @@
+"""Index hot submission lookups, one analysis result per submission
+
+Revision ID: b7e3c5a1d920
+Revises: 9d4f2b7e1a36
+Create Date: 2026-10-17 10:14:37.402911
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e3c5a1d920"
+down_revision = "9d4f2b7e1a36"
+branch_labels = None
+depends_on = None
+
+
+def _refresh_progress_flags(bind, user_ids):
+    """
+    Recomputes the StudentProgress result flags (see
+    StudentProgress.activity_query) for users whose duplicate results were
+    deleted. Word lists and last activity only depend on submissions.
+    """
+    submissions = sa.table(
+        "submissions", sa.column("id", sa.Integer()), sa.column("user_id", sa.Integer())
+    )
+    results = sa.table(
+        "analysis_results",
+        sa.column("submission_id", sa.Integer()),
+        sa.column("is_deep_voice_corrected", sa.Boolean()),
+        sa.column("is_outlier", sa.Boolean()),
+        sa.column("distance_bark", sa.Float()),
+    )
+    progress = sa.table(
+        "student_progress",
+        sa.column("user_id", sa.Integer()),
+        sa.column("has_deep_voice", sa.Boolean()),
+        sa.column("has_outlier", sa.Boolean()),
+        sa.column("has_missing", sa.Boolean()),
+    )
+
+    def any_of(condition):
+        return sa.func.coalesce(sa.func.max(sa.case((condition, 1), else_=0)), 0)
+
+    for user_id in user_ids:
+        deep, outlier, missing = bind.execute(
+            sa.select(
+                any_of(results.c.is_deep_voice_corrected == sa.true()),
+                any_of(results.c.is_outlier == sa.true()),
+                any_of(results.c.distance_bark.is_(None)),
+            )
+            .select_from(
+                submissions.join(results, results.c.submission_id == submissions.c.id)
+            )
+            .where(submissions.c.user_id == user_id)
+        ).one()
+        bind.execute(
+            progress.update()
+            .where(progress.c.user_id == user_id)
+            .values(
+                has_deep_voice=bool(deep),
+                has_outlier=bool(outlier),
+                has_missing=bool(missing),
+            )
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    affected = [
+        row[0]
+        for row in bind.execute(
+            sa.text(
+                "SELECT DISTINCT user_id FROM submissions WHERE id IN "
+                "(SELECT submission_id FROM analysis_results "
+                "GROUP BY submission_id HAVING COUNT(*) > 1)"
+            )
+        ).fetchall()
+    ]
+
+    # Keep only the newest result of any submission analyzed more than once
+    op.execute(
+        sa.text(
+            "DELETE FROM analysis_results WHERE id NOT IN "
+            "(SELECT MAX(id) FROM analysis_results GROUP BY submission_id)"
+        )
+    )
+    # The summary rows of those students counted the deleted results too.
+    # Their VTLN state did as well: run `flask rebuild-vtln` afterwards
+    # (also `flask rebuild-progress` to rebuild every summary from scratch)
+    _refresh_progress_flags(bind, affected)
+    with op.batch_alter_table("analysis_results", schema=None) as batch_op:
+        batch_op.create_unique_constraint(
+            "uq_analysis_results_submission_id", ["submission_id"]
+        )
+
+    with op.batch_alter_table("submissions", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_submissions_user_test_word",
+            ["user_id", "test_type", "word_id"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "ix_submissions_user_timestamp", ["user_id", "timestamp"], unique=False
+        )
+        batch_op.create_index(
+            "ix_submissions_word_timestamp", ["word_id", "timestamp"], unique=False
+        )
+        batch_op.create_index("ix_submissions_timestamp", ["timestamp"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("submissions", schema=None) as batch_op:
+        batch_op.drop_index("ix_submissions_timestamp")
+        batch_op.drop_index("ix_submissions_word_timestamp")
+        batch_op.drop_index("ix_submissions_user_timestamp")
+        batch_op.drop_index("ix_submissions_user_test_word")
+
+    with op.batch_alter_table("analysis_results", schema=None) as batch_op:
+        batch_op.drop_constraint("uq_analysis_results_submission_id", type_="unique")
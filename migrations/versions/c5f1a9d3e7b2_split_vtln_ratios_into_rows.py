@@ -0,0 +1,118 @@
+"""Store VTLN ratios as rows split into lower/upper halves
+
+Revision ID: c5f1a9d3e7b2
+Revises: e4a8c2f6b173
+Create Date: 2026-10-17 18:12:44.207391
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c5f1a9d3e7b2"
+down_revision = "e4a8c2f6b173"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "vtln_ratios",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("is_upper", sa.Boolean(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["vtln_states.user_id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("vtln_ratios", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_vtln_ratios_user_half_value",
+            ["user_id", "is_upper", "value"],
+            unique=False,
+        )
+    with op.batch_alter_table("vtln_states", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("lower_count", sa.Integer(), nullable=False, server_default="0")
+        )
+
+    # Move each user's sorted JSON list into rows: the first (n + 1) // 2
+    # values form the lower half
+    bind = op.get_bind()
+    states = sa.table(
+        "vtln_states",
+        sa.column("user_id", sa.Integer()),
+        sa.column("ratios", sa.JSON()),
+        sa.column("ratio_count", sa.Integer()),
+        sa.column("lower_count", sa.Integer()),
+    )
+    ratios = sa.table(
+        "vtln_ratios",
+        sa.column("user_id", sa.Integer()),
+        sa.column("is_upper", sa.Boolean()),
+        sa.column("value", sa.Float()),
+    )
+    for user_id, values in bind.execute(
+        sa.select(states.c.user_id, states.c.ratios)
+    ).fetchall():
+        ordered = sorted(values or [])
+        lower_count = (len(ordered) + 1) // 2
+        if ordered:
+            bind.execute(
+                ratios.insert(),
+                [
+                    {"user_id": user_id, "is_upper": i >= lower_count, "value": v}
+                    for i, v in enumerate(ordered)
+                ],
+            )
+        bind.execute(
+            states.update()
+            .where(states.c.user_id == user_id)
+            .values(ratio_count=len(ordered), lower_count=lower_count)
+        )
+
+    with op.batch_alter_table("vtln_states", schema=None) as batch_op:
+        batch_op.drop_column("ratios")
+
+
+def downgrade():
+    with op.batch_alter_table("vtln_states", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("ratios", sa.JSON(), nullable=False, server_default="[]")
+        )
+
+    bind = op.get_bind()
+    states = sa.table(
+        "vtln_states",
+        sa.column("user_id", sa.Integer()),
+        sa.column("ratios", sa.JSON()),
+    )
+    ratios = sa.table(
+        "vtln_ratios",
+        sa.column("user_id", sa.Integer()),
+        sa.column("value", sa.Float()),
+    )
+    by_user = {}
+    for user_id, value in bind.execute(
+        sa.select(ratios.c.user_id, ratios.c.value).order_by(
+            ratios.c.user_id, ratios.c.value
+        )
+    ).fetchall():
+        by_user.setdefault(user_id, []).append(value)
+    for user_id, values in by_user.items():
+        bind.execute(
+            states.update().where(states.c.user_id == user_id).values(ratios=values)
+        )
+
+    with op.batch_alter_table("vtln_states", schema=None) as batch_op:
+        batch_op.drop_column("lower_count")
+
+    with op.batch_alter_table("vtln_ratios", schema=None) as batch_op:
+        batch_op.drop_index("ix_vtln_ratios_user_half_value")
+    op.drop_table("vtln_ratios")
@@ -0,0 +1,28 @@
+"""Add stage_timings to analysis_results
+
+Revision ID: e4a8c2f6b173
+Revises: b7e3c5a1d920
+Create Date: 2026-10-17 16:41:08.529713
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e4a8c2f6b173"
+down_revision = "b7e3c5a1d920"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL; only results scored from now on are timed
+    with op.batch_alter_table("analysis_results", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("stage_timings", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("analysis_results", schema=None) as batch_op:
+        batch_op.drop_column("stage_timings")
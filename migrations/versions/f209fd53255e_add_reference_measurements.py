@@ -0,0 +1,51 @@
+"""Add reference_measurements cache table
+
+Revision ID: f209fd53255e
+Revises: 87c5d6b3f863
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f209fd53255e"
+down_revision = "87c5d6b3f863"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "reference_measurements",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("word_text", sa.String(length=64), nullable=False),
+        sa.Column("audio_hash", sa.String(length=64), nullable=False),
+        sa.Column("vowel", sa.String(length=10), nullable=False),
+        sa.Column("params_hash", sa.String(length=40), nullable=False),
+        sa.Column("measurements", sa.JSON(), nullable=False),
+        sa.Column("is_deep_voice_corrected", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "word_text",
+            "audio_hash",
+            "vowel",
+            "params_hash",
+            name="uq_reference_measurements_key",
+        ),
+    )
+    with op.batch_alter_table("reference_measurements", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_reference_measurements_word_text"),
+            ["word_text"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("reference_measurements", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_reference_measurements_word_text"))
+    op.drop_table("reference_measurements")
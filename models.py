@@ -1,6 +1,9 @@
 # pyright: strict
+import math
+import os
+import time
 from datetime import datetime, timezone
-from typing import cast, Optional
+from typing import Any, Dict, List, Sequence, Tuple, cast, Optional
 
 from flask_login import UserMixin  # type: ignore
 from flask_sqlalchemy import SQLAlchemy
@@ -12,6 +15,14 @@ from flask_mail import Mail  # type: ignore
 db: SQLAlchemy = SQLAlchemy()
 mail: Mail = Mail()
 
+# SystemConfig is read on every request (maintenance check, demo banner), so
+# each process keeps the whole table in memory and reloads it at most every
+# SYSTEM_CONFIG_TTL seconds. That bounds how long other gunicorn/Celery
+# workers take to see a change made through SystemConfig.set.
+SYSTEM_CONFIG_TTL = float(os.environ.get("SYSTEM_CONFIG_TTL", "5"))
+_config_cache: Optional[Dict[str, str]] = None
+_config_loaded_at = 0.0
+
 
 class SystemConfig(db.Model):
     """
@@ -26,13 +37,30 @@ class SystemConfig(db.Model):
         self.key = key
         self.value = value
 
+    @staticmethod
+    def all_values() -> Dict[str, str]:
+        """All config values, served from the per-process cache."""
+        global _config_cache, _config_loaded_at
+        now = time.monotonic()
+        if _config_cache is None or now - _config_loaded_at > SYSTEM_CONFIG_TTL:
+            rows = cast(
+                List[Tuple[str, str]],
+                db.session.query(SystemConfig.key, SystemConfig.value).all(),
+            )
+            _config_cache = {k: v for k, v in rows}
+            _config_loaded_at = now
+        return _config_cache
+
+    @staticmethod
+    def invalidate_cache() -> None:
+        """Forces the next read in this process to reload from the database."""
+        global _config_cache
+        _config_cache = None
+
     @staticmethod
     def get(key: str, default: str | None = None) -> str | None:
         """Helper to get a config value by key."""
-        config = cast(
-            SystemConfig | None, SystemConfig.query.filter_by(key=key).first()
-        )
-        return config.value if config else default
+        return SystemConfig.all_values().get(key, default)
 
     @staticmethod
     def get_bool(key: str, default: bool = False) -> bool:
@@ -53,6 +81,8 @@ class SystemConfig(db.Model):
             db.session.add(config)
         else:
             config.value = str(value)
+        # The caller commits; until then this session reloads the pending value
+        SystemConfig.invalidate_cache()
 
     @staticmethod
     def is_demo_mode() -> bool:
@@ -126,6 +156,12 @@ class User(UserMixin, db.Model):
     password_history = db.relationship(
         "PasswordHistory", backref="user", lazy="dynamic", cascade="all, delete-orphan"
     )
+    vtln_state = db.relationship(
+        "VtlnState", backref="user", uselist=False, cascade="all, delete-orphan"
+    )
+    progress = db.relationship(
+        "StudentProgress", backref="user", uselist=False, cascade="all, delete-orphan"
+    )
 
     def __init__(
         self,
@@ -287,12 +323,84 @@ class Word(db.Model):
         return f"<Word {self.sequence_order}: {self.text}>"
 
 
+class ReferenceMeasurement(db.Model):
+    """
+    Cached formant measurements of a Word's reference recording.
+    Keyed by word, MP3 content hash, vowel and engine parameter hash, so
+    replacing the audio or retuning the engine invalidates the entry.
+    """
+
+    __tablename__ = "reference_measurements"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "word_text",
+            "audio_hash",
+            "vowel",
+            "params_hash",
+            name="uq_reference_measurements_key",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    word_text = db.Column(db.String(64), nullable=False, index=True)
+    audio_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the MP3
+    vowel = db.Column(db.String(10), nullable=False)
+    params_hash = db.Column(db.String(40), nullable=False)
+
+    # [[f1, f2], ...] per measurement point; NaN is stored as null
+    measurements = db.Column(db.JSON, nullable=False)
+    is_deep_voice_corrected = db.Column(db.Boolean, default=False)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __init__(
+        self,
+        word_text: str,
+        audio_hash: str,
+        vowel: str,
+        params_hash: str,
+        measurements: Sequence[Tuple[float, float]],
+        is_deep_voice_corrected: bool = False,
+    ):
+        self.word_text = word_text
+        self.audio_hash = audio_hash
+        self.vowel = vowel
+        self.params_hash = params_hash
+        self.measurements = [
+            [None if math.isnan(v) else float(v) for v in point]
+            for point in measurements
+        ]
+        self.is_deep_voice_corrected = is_deep_voice_corrected
+
+    def as_measurements(self) -> List[Tuple[float, float]]:
+        """Returns the stored points as (F1, F2) tuples with NaN restored."""
+        points = cast(List[List[Any]], self.measurements)
+        return [
+            (
+                float("nan") if f1 is None else float(f1),
+                float("nan") if f2 is None else float(f2),
+            )
+            for f1, f2 in points
+        ]
+
+    def __repr__(self) -> str:
+        return f"<ReferenceMeasurement {self.word_text} /{self.vowel}/>"
+
+
 class Submission(db.Model):
     """
     Represents one audio recording uploaded by a user.
     """
 
     __tablename__ = "submissions"
+    # Matched to the hot access paths: progress/word lists per student,
+    # per-student history newest first, per-word history, date-range filters
+    __table_args__ = (
+        db.Index("ix_submissions_user_test_word", "user_id", "test_type", "word_id"),
+        db.Index("ix_submissions_user_timestamp", "user_id", "timestamp"),
+        db.Index("ix_submissions_word_timestamp", "word_id", "timestamp"),
+        db.Index("ix_submissions_timestamp", "timestamp"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -332,6 +440,29 @@ class Submission(db.Model):
         self.file_path = file_path
         self.file_size_bytes = file_size_bytes
 
+    @staticmethod
+    def with_details(query: Any = None) -> Any:
+        """
+        Eager-loads the word and analysis of every submission a list view
+        renders. Both are to-one, so a single JOINed SELECT covers a page.
+        """
+        if query is None:
+            query = Submission.query
+        return query.options(
+            db.joinedload(Submission.target_word),  # type: ignore
+            db.joinedload(Submission.analysis),  # type: ignore
+        )
+
+    @staticmethod
+    def with_analysis(query: Any = None) -> Any:
+        """
+        Batch-loads analyses for bulk deletes/updates (one extra IN query
+        instead of one per submission during the delete cascade).
+        """
+        if query is None:
+            query = Submission.query
+        return query.options(db.selectinload(Submission.analysis))  # type: ignore
+
     def __repr__(self) -> str:
         return f"<Submission {self.id}: User {self.user_id}>"
 
@@ -342,6 +473,10 @@ class AnalysisResult(db.Model):
     """
 
     __tablename__ = "analysis_results"
+    # One result per submission (also the index behind submission lookups)
+    __table_args__ = (
+        db.UniqueConstraint("submission_id", name="uq_analysis_results_submission_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     submission_id = db.Column(
@@ -371,7 +506,23 @@ class AnalysisResult(db.Model):
     )  # True if 4000Hz ceiling was used
     is_outlier = db.Column(db.Boolean, default=False)  # True if score > threshold
 
-    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # 6. Provenance (what produced this result; drives incremental re-analysis)
+    engine_hash = db.Column(db.String(40), nullable=True)  # result_params_hash()
+    audio_hash = db.Column(
+        db.String(64), nullable=True
+    )  # SHA-256 of the analyzed student file (sidecar .npy, else MP3)
+    ref_audio_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of reference
+
+    # 7. Stage timings of the live scoring run, in ms per stage (set by the
+    # Celery scoring tasks; includes queue_wait and total since enqueue)
+    stage_timings = db.Column(db.JSON, nullable=True)
+
+    # Bumped on re-analysis; incremental research exports are keyed on it
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     def __init__(self, submission_id: int | None = None) -> None:
         self.submission_id = submission_id
@@ -379,6 +530,386 @@ class AnalysisResult(db.Model):
     def __repr__(self) -> str:
         return f"<Analysis Result for Sub #{self.submission_id}>"
 
+    @staticmethod
+    def recent_stage_timings(
+        since: datetime, limit: int
+    ) -> List[Tuple[str, Dict[str, float]]]:
+        """(word text, stage_timings) of the newest timed results since a date."""
+        rows = (
+            db.session.query(Word.text, AnalysisResult.stage_timings)
+            .join(Submission, AnalysisResult.submission_id == Submission.id)
+            .join(Word, Submission.word_id == Word.id)
+            .filter(Submission.timestamp >= since)
+            .filter(AnalysisResult.stage_timings.isnot(None))  # type: ignore
+            .order_by(Submission.timestamp.desc())
+            .limit(limit)
+            .all()
+        )
+        return [(cast(str, text), cast(Dict[str, float], t)) for text, t in rows]
+
+
+class VtlnRatio(db.Model):
+    """
+    One formant ratio (student / reference) in a user's Cumulative-VTLN
+    history. A user's ratios are split into a lower and an upper half, each
+    read through the (user_id, is_upper, value) index like a heap: the median
+    sits at the inner ends of the two halves.
+    """
+
+    __tablename__ = "vtln_ratios"
+    __table_args__ = (
+        db.Index("ix_vtln_ratios_user_half_value", "user_id", "is_upper", "value"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("vtln_states.user_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    is_upper = db.Column(db.Boolean, nullable=False)
+    value = db.Column(db.Float, nullable=False)
+
+    def __init__(self, user_id: int, value: float, is_upper: bool) -> None:
+        self.user_id = user_id
+        self.value = value
+        self.is_upper = is_upper
+
+
+class VtlnState(db.Model):
+    """
+    Running Cumulative-VTLN state for one user.
+    Holds the sizes of the two halves of the user's VtlnRatio rows; adding or
+    removing a ratio touches O(1) rows through O(log n) index lookups, so the
+    median alpha is updated per submission without reloading history.
+    """
+
+    __tablename__ = "vtln_states"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    ratio_count = db.Column(db.Integer, default=0, nullable=False)
+    # Rows with is_upper=False; always ratio_count // 2 or one more
+    lower_count = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    # Deleting the state (user deletion) deletes its ratios on every backend
+    ratio_rows = db.relationship(
+        "VtlnRatio", lazy="dynamic", cascade="all, delete-orphan"
+    )
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id = user_id
+        self.ratio_count = 0
+        self.lower_count = 0
+
+    @staticmethod
+    def ratios_for(
+        f1_raw: float | None,
+        f2_raw: float | None,
+        f1_ref: float | None,
+        f2_ref: float | None,
+    ) -> List[float]:
+        """The (up to two) ratios a single analysis contributes to alpha."""
+
+        def valid(v: float | None) -> bool:
+            return v is not None and not math.isnan(v) and v > 0
+
+        ratios: List[float] = []
+        if valid(f1_raw) and valid(f1_ref):
+            ratios.append(cast(float, f1_raw) / cast(float, f1_ref))
+        if valid(f2_raw) and valid(f2_ref):
+            ratios.append(cast(float, f2_raw) / cast(float, f2_ref))
+        return ratios
+
+    def _edge(self, upper: bool) -> VtlnRatio | None:
+        """Largest ratio of the lower half, or smallest of the upper half."""
+        order = VtlnRatio.value.asc() if upper else VtlnRatio.value.desc()  # type: ignore
+        return cast(
+            VtlnRatio | None,
+            VtlnRatio.query.filter_by(user_id=self.user_id, is_upper=upper)
+            .order_by(order)
+            .first(),
+        )
+
+    def _rebalance(self) -> None:
+        upper_count = self.ratio_count - self.lower_count
+        if self.lower_count > upper_count + 1:
+            row = cast(VtlnRatio, self._edge(upper=False))
+            row.is_upper = True
+            self.lower_count -= 1
+        elif upper_count > self.lower_count:
+            row = cast(VtlnRatio, self._edge(upper=True))
+            row.is_upper = False
+            self.lower_count += 1
+
+    def add_ratios(self, new_ratios: List[float]) -> None:
+        for r in new_ratios:
+            lower_max = self._edge(upper=False)
+            upper = lower_max is not None and r > cast(float, lower_max.value)
+            db.session.add(VtlnRatio(self.user_id, r, upper))
+            self.ratio_count += 1
+            if not upper:
+                self.lower_count += 1
+            self._rebalance()
+
+    def remove_ratios(self, old_ratios: List[float]) -> None:
+        for r in old_ratios:
+            for upper in (False, True):
+                row = cast(
+                    VtlnRatio | None,
+                    VtlnRatio.query.filter_by(
+                        user_id=self.user_id, is_upper=upper, value=r
+                    ).first(),
+                )
+                if row is not None:
+                    db.session.delete(row)
+                    self.ratio_count -= 1
+                    if not upper:
+                        self.lower_count -= 1
+                    self._rebalance()
+                    break
+
+    def replace_ratios(self, ratios: List[float]) -> None:
+        """Swaps the whole history for `ratios` (seeding / rebuild)."""
+        VtlnRatio.query.filter_by(user_id=self.user_id).delete()
+        ordered = sorted(ratios)
+        lower_count = (len(ordered) + 1) // 2
+        db.session.add_all(
+            [
+                VtlnRatio(self.user_id, r, i >= lower_count)
+                for i, r in enumerate(ordered)
+            ]
+        )
+        self.ratio_count = len(ordered)
+        self.lower_count = lower_count
+
+    def median(self) -> float:
+        """Current alpha; 1.0 when there is nothing to normalize against."""
+        if self.ratio_count == 0:
+            return 1.0
+        lower_max = cast(float, cast(VtlnRatio, self._edge(upper=False)).value)
+        if self.lower_count > self.ratio_count - self.lower_count:
+            return lower_max
+        upper_min = cast(float, cast(VtlnRatio, self._edge(upper=True)).value)
+        return (lower_max + upper_min) / 2.0
+
+    @staticmethod
+    def history_ratios(user_id: int) -> List[float]:
+        """All ratios from a user's stored analysis results (column query only)."""
+        rows = cast(
+            List[Any],
+            db.session.query(
+                AnalysisResult.f1_raw,
+                AnalysisResult.f2_raw,
+                AnalysisResult.f1_ref,
+                AnalysisResult.f2_ref,
+            )
+            .join(Submission, AnalysisResult.submission_id == Submission.id)
+            .filter(Submission.user_id == user_id)
+            .all(),
+        )
+        ratios: List[float] = []
+        for f1_raw, f2_raw, f1_ref, f2_ref in rows:
+            ratios.extend(VtlnState.ratios_for(f1_raw, f2_raw, f1_ref, f2_ref))
+        return ratios
+
+    @staticmethod
+    def for_user(user_id: int) -> "VtlnState":
+        """
+        Returns the user's state locked for update. Users without a state row
+        (e.g. before the backfill ran) get one seeded from their history.
+        """
+        from sqlalchemy.exc import IntegrityError
+
+        state = cast(
+            VtlnState | None,
+            VtlnState.query.filter_by(user_id=user_id).with_for_update().first(),
+        )
+        if state:
+            return state
+
+        ratios = VtlnState.history_ratios(user_id)
+        state = VtlnState(user_id=user_id)
+        try:
+            with db.session.begin_nested():
+                db.session.add(state)
+                db.session.flush()
+                state.replace_ratios(ratios)
+        except IntegrityError:
+            # Created concurrently by another worker
+            state = cast(
+                VtlnState,
+                VtlnState.query.filter_by(user_id=user_id).with_for_update().one(),
+            )
+        return state
+
+    @staticmethod
+    def rebuild(user_id: int) -> "VtlnState":
+        """Recomputes a user's state from scratch (backfill / repair)."""
+        state = cast(
+            VtlnState | None,
+            VtlnState.query.filter_by(user_id=user_id).with_for_update().first(),
+        )
+        if not state:
+            state = VtlnState(user_id=user_id)
+            db.session.add(state)
+            db.session.flush()
+        state.replace_ratios(VtlnState.history_ratios(user_id))
+        return state
+
+    @staticmethod
+    def discard_result(user_id: int, result: "AnalysisResult") -> None:
+        """Removes a deleted analysis result's ratios from its user's state."""
+        # Same row lock as the scoring worker's update (VtlnState.for_user)
+        state = cast(
+            VtlnState | None,
+            VtlnState.query.filter_by(user_id=user_id).with_for_update().first(),
+        )
+        if state:
+            state.remove_ratios(
+                VtlnState.ratios_for(
+                    result.f1_raw, result.f2_raw, result.f1_ref, result.f2_ref
+                )
+            )
+
+    def __repr__(self) -> str:
+        return f"<VtlnState User {self.user_id}: {self.ratio_count} ratios>"
+
+
+class StudentProgress(db.Model):
+    """
+    Per-student summary of submissions: distinct words per test type, last
+    activity and the dashboard flags. Refreshed in the same transaction that
+    adds/removes a Submission or stores an AnalysisResult, so dashboards and
+    /get_progress read one row instead of the whole history.
+    """
+
+    __tablename__ = "student_progress"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    pre_count = db.Column(db.Integer, default=0, nullable=False)
+    post_count = db.Column(db.Integer, default=0, nullable=False)
+    pre_word_ids = db.Column(db.JSON, nullable=False)  # Distinct, sorted
+    post_word_ids = db.Column(db.JSON, nullable=False)
+    last_active = db.Column(db.DateTime, nullable=True)
+
+    # Any submission of the student has this flag
+    has_deep_voice = db.Column(db.Boolean, default=False, nullable=False)
+    has_outlier = db.Column(db.Boolean, default=False, nullable=False)
+    has_missing = db.Column(db.Boolean, default=False, nullable=False)
+
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.pre_count = 0
+        self.post_count = 0
+        self.pre_word_ids = []
+        self.post_word_ids = []
+        self.has_deep_voice = False
+        self.has_outlier = False
+        self.has_missing = False
+
+    @staticmethod
+    def activity_query(user_ids: Sequence[int] | None = None) -> Any:
+        """
+        One row per user with submissions, aggregated in SQL: distinct pre/post
+        words, last activity and the any-submission flags.
+        """
+
+        def any_of(condition: Any) -> Any:
+            return db.func.max(db.case((condition, 1), else_=0))
+
+        missing_distance = db.and_(
+            AnalysisResult.id.isnot(None),  # type: ignore
+            AnalysisResult.distance_bark.is_(None),  # type: ignore
+        )
+        query = (
+            db.session.query(
+                Submission.user_id.label("user_id"),
+                db.func.max(Submission.timestamp).label("last_active"),
+                any_of(AnalysisResult.is_deep_voice_corrected == True).label(
+                    "has_deep_voice"
+                ),
+                any_of(AnalysisResult.is_outlier == True).label("has_outlier"),
+                any_of(missing_distance).label("has_missing"),
+            )
+            .outerjoin(AnalysisResult, AnalysisResult.submission_id == Submission.id)
+            .group_by(Submission.user_id)
+        )
+        if user_ids is not None:
+            query = query.filter(Submission.user_id.in_(user_ids))  # type: ignore
+        return query
+
+    @staticmethod
+    def refresh(user_id: int) -> "StudentProgress":
+        """
+        Recomputes one student's summary (caller commits). The row is locked
+        first so concurrent refreshes for the same student serialize.
+        """
+        from sqlalchemy.exc import IntegrityError
+
+        progress = cast(
+            StudentProgress | None,
+            StudentProgress.query.filter_by(user_id=user_id).with_for_update().first(),
+        )
+        if not progress:
+            progress = StudentProgress(user_id=user_id)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(progress)
+            except IntegrityError:
+                # Created concurrently by another worker
+                progress = cast(
+                    StudentProgress,
+                    StudentProgress.query.filter_by(user_id=user_id)
+                    .with_for_update()
+                    .one(),
+                )
+
+        db.session.flush()
+        words = cast(
+            List[Tuple[str, int]],
+            db.session.query(Submission.test_type, Submission.word_id)
+            .filter(Submission.user_id == user_id)
+            .distinct()
+            .all(),
+        )
+        progress.pre_word_ids = sorted(w for t, w in words if t == "pre")
+        progress.post_word_ids = sorted(w for t, w in words if t == "post")
+        progress.pre_count = len(progress.pre_word_ids)
+        progress.post_count = len(progress.post_word_ids)
+
+        row = cast(Any, StudentProgress.activity_query([user_id]).first())
+        progress.last_active = row.last_active if row else None
+        progress.has_deep_voice = bool(row and row.has_deep_voice)
+        progress.has_outlier = bool(row and row.has_outlier)
+        progress.has_missing = bool(row and row.has_missing)
+        return progress
+
+    @staticmethod
+    def for_user(user_id: int) -> "StudentProgress":
+        """Returns the summary, building it on first access (caller commits)."""
+        progress = cast(
+            StudentProgress | None, StudentProgress.query.get(user_id)
+        )
+        return progress or StudentProgress.refresh(user_id)
+
+    def __repr__(self) -> str:
+        return (
+            f"<StudentProgress User {self.user_id}: "
+            f"pre={self.pre_count} post={self.post_count}>"
+        )
+
 
 class InviteCode(db.Model):
     """
@@ -1,15 +1,51 @@
 # pyright: strict
 import io
 import logging
-from typing import Any, cast, Tuple
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional, cast, Tuple
 import numpy as np
-import librosa
-import soundfile as sf  # type: ignore
+
+from scripts import metrics
+
+# soundfile (and librosa, for formats libsndfile cannot read) are imported
+# inside the functions that decode/encode: the web tier imports this module
+# for paths and cleanup only.
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
+def analysis_sidecar_path(path: str | Path, sr: int = 16000) -> Path:
+    """
+    Location of the lossless, analysis-ready samples (mono float32 at `sr`)
+    stored next to a processed MP3, e.g. 1/<uuid>.mp3 -> 1/<uuid>.16000.npy
+    """
+    p = Path(path)
+    return p.with_name(f"{p.stem}.{sr}.npy")
+
+
+def save_processed_audio(
+    filepath: str | Path,
+    mp3_data: bytes,
+    samples: Optional[np.ndarray[Any, Any]],
+    sr: int = 16000,
+) -> None:
+    """Writes the MP3 and, when available, its analysis sidecar."""
+    with open(filepath, "wb") as f:
+        f.write(mp3_data)
+    if samples is not None:
+        np.save(analysis_sidecar_path(filepath, sr), samples.astype(np.float32))
+
+
+def remove_processed_audio(filepath: str | Path, sr: int = 16000) -> None:
+    """Deletes an uploaded MP3 together with its analysis sidecar."""
+    for path in (Path(filepath), analysis_sidecar_path(filepath, sr)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
 def process_audio_data(
     audio_data: bytes, target_sr: int = 16000, noise_floor: float | None = None
 ) -> bytes:
@@ -21,27 +57,180 @@ def process_audio_data(
         target_sr (int): Target sample rate.
         noise_floor (float, optional): Client-measured noise floor (RMS).
     """
+    return process_audio_with_samples(audio_data, target_sr, noise_floor)[0]
+
+
+# Non-overlapping analysis frames for the silence trim (parity with the JS meter)
+TRIM_FRAME_SECONDS = 0.02
+# Same zero threshold librosa.feature.zero_crossing_rate applies
+ZCR_ZERO_THRESHOLD = 1e-10
+
+
+def _resample(
+    y: np.ndarray[Any, Any], orig_sr: int, target_sr: int
+) -> np.ndarray[Any, Any]:
+    """
+    Resamples one channel the way librosa.resample(res_type="soxr_hq") does
+    (same soxr call, same output length), so trimming sees identical samples.
+    Falls back to scipy's polyphase filter if soxr is unavailable.
+    """
+    n_out = int(np.ceil(y.shape[-1] * float(target_sr) / orig_sr))
+    try:
+        import soxr  # type: ignore
+
+        y_hat = cast(
+            np.ndarray[Any, Any],
+            soxr.resample(y, orig_sr, target_sr, quality="HQ"),  # type: ignore
+        )
+    except ImportError:
+        from math import gcd
+
+        from scipy.signal import resample_poly  # type: ignore
+
+        g = gcd(orig_sr, target_sr)
+        y_hat = cast(
+            np.ndarray[Any, Any],
+            resample_poly(y, target_sr // g, orig_sr // g),  # type: ignore
+        )
+
+    if y_hat.shape[-1] > n_out:
+        y_hat = y_hat[:n_out]
+    elif y_hat.shape[-1] < n_out:
+        y_hat = np.pad(y_hat, (0, n_out - y_hat.shape[-1]))
+    return np.asarray(y_hat, dtype=y.dtype)
+
+
+def decode_mono(audio_data: bytes, target_sr: int = 16000) -> np.ndarray[Any, Any]:
+    """
+    Decodes uploaded audio to mono float32 at target_sr.
+    WAV/FLAC/OGG are read straight through libsndfile (channels resampled,
+    then averaged, in the same order as librosa.load(mono=False) +
+    to_mono); anything libsndfile cannot read goes through librosa/audioread.
+    """
+    import soundfile as sf  # type: ignore
+
     try:
-        # Load audio from bytes
-        # librosa.load supports various formats via wrapping soundfile/audioread
-        # mono=True mixes down to mono immediately
-        y_stereo, _ = cast(
+        data, sr = cast(
+            Tuple[np.ndarray[Any, Any], int],
+            sf.read(io.BytesIO(audio_data), dtype="float32", always_2d=True),  # type: ignore
+        )
+    except Exception:
+        import librosa  # type: ignore
+
+        y_any, _ = cast(
             Tuple[Any, float],
             librosa.load(io.BytesIO(audio_data), sr=target_sr, mono=False),  # type: ignore
         )
+        if y_any.ndim > 1:
+            y_any = librosa.to_mono(y_any)  # type: ignore
+        return cast(np.ndarray[Any, Any], y_any)
+
+    channels = data.T  # (channels, samples)
+    if sr != target_sr:
+        channels = np.stack([_resample(c, sr, target_sr) for c in channels])
+    if channels.shape[0] == 1:
+        return channels[0]
+    return np.mean(channels, axis=0)
+
+
+def frame_features(
+    y: np.ndarray[Any, Any], frame_length: int
+) -> Tuple[np.ndarray[Any, Any], np.ndarray[Any, Any]]:
+    """
+    Per-frame RMS and zero-crossing rate over non-overlapping frames.
+    Equivalent to librosa.feature.rms / zero_crossing_rate with
+    hop_length=frame_length and center=False: the frames are a reshaped view
+    transposed to librosa's (frame_length, n_frames) layout, so the float32
+    reductions accumulate in the same order and round identically.
+    """
+    n_frames = len(y) // frame_length
+    frames = y[: n_frames * frame_length].reshape(n_frames, frame_length).T
+
+    rms = np.sqrt(np.mean(np.square(frames), axis=0))
 
-        # Convert to mono if stereo
-        if hasattr(y_stereo, "ndim") and y_stereo.ndim > 1:
-            y = librosa.to_mono(y_stereo)  # type: ignore
-        else:
-            y = y_stereo
+    # Near-zero samples count as positive, crossings are counted within a frame
+    signs = np.signbit(np.where(np.abs(frames) <= ZCR_ZERO_THRESHOLD, 0, frames))
+    crossings = np.count_nonzero(signs[1:] != signs[:-1], axis=0)
+    zcr = crossings / frame_length
 
-        y = cast(Any, y)  # Force Any to avoid ndarray[Unknown] issues
+    return rms, zcr
+
+
+def speech_bounds(
+    rmse: np.ndarray[Any, Any],
+    zcr: np.ndarray[Any, Any],
+    hop_length: int,
+    n_samples: int,
+    target_sr: int,
+    noise_floor: float | None = None,
+) -> Optional[Tuple[int, int]]:
+    """
+    Sample range to keep after the robust silence trim, or None when no
+    speech frame was found.
+    """
+    if len(rmse) == 0:
+        return None
+
+    # 1. Determine Noise Floor
+    if noise_floor is not None and noise_floor > 0.0001:
+        # Use client-provided floor directly (Trust the Meter)
+        local_floor = noise_floor
+    else:
+        # Adaptive Fallback (10th percentile)
+        sorted_rms = np.sort(rmse)
+        floor_idx = int(len(sorted_rms) * 0.1)
+        local_floor = sorted_rms[floor_idx] if floor_idx < len(sorted_rms) else 0.001
+
+    local_floor = max(0.001, local_floor)
+
+    # 2. Thresholds (RELAXED for trailing consonants)
+    # Originally 4.0x/2.5x - reduced even further to 0.010 to catch breathy starts
+    vol_thresh = max(0.010, local_floor * 2.0)
+    sens_thresh = max(0.005, local_floor * 1.5)
+    zcr_thresh = 0.1
+
+    # 3. Identify Speech Frames
+    # Logic: Loud OR (Moderately Loud AND High Frequency)
+    is_speech = (rmse > vol_thresh) | ((rmse > sens_thresh) & (zcr > zcr_thresh))
+
+    # Find start/end
+    speech_indices = np.where(is_speech)[0]
+    if len(speech_indices) == 0:
+        return None
+
+    # Convert to samples
+    start_sample = int(speech_indices[0]) * hop_length
+    end_sample = (int(speech_indices[-1]) + 1) * hop_length
+
+    # Asymmetric Padding:
+    # Start: 10ms (0.01s) - Tight/Snappy
+    # End: 300ms (0.30s) - Allow reverb/tails to fade naturally
+    padding_start = int(target_sr * 0.01)
+    padding_end = int(target_sr * 0.30)
+
+    start = max(0, start_sample - padding_start)
+    end = min(n_samples, end_sample + padding_end)
+    return start, end
+
+
+def process_audio_with_samples(
+    audio_data: bytes, target_sr: int = 16000, noise_floor: float | None = None
+) -> Tuple[bytes, Optional[np.ndarray[Any, Any]]]:
+    """
+    Same as process_audio_data, but also returns the trimmed, normalized
+    mono samples at target_sr so they can be stored losslessly for analysis.
+    Samples are None whenever the original bytes are returned unprocessed.
+    """
+    import soundfile as sf  # type: ignore
+
+    started = time.perf_counter()
+    try:
+        y = cast(Any, decode_mono(audio_data, target_sr))
 
         # Handle silence or empty audio
         if y.size == 0:
             logger.warning("Empty audio data received during processing.")
-            return audio_data
+            return audio_data, None
 
         # --- CLIPPING DETECTION ---
         # Clipping distorts formants significantly (15-20% error on F1).
@@ -51,93 +240,24 @@ def process_audio_data(
         clip_ratio = clipped_samples / len(y)
 
         if clip_ratio > 0.005:  # 0.5%
+            metrics.CLIPPING_REJECTIONS.inc()
             error_msg = f"Audio clipping detected ({clip_ratio*100:.1f}%). Please reduce microphone volume."
             logger.warning(error_msg)
             raise ValueError(error_msg)
 
         # --- ROBUST TRIM SILENCE ---
-        frame_length = int(target_sr * 0.02)  # 20ms
+        frame_length = int(target_sr * TRIM_FRAME_SECONDS)  # 20ms
         hop_length = frame_length  # Non-overlapping for speed/parity with JS
 
-        # Calculate RMS energy per frame
-        rmse = cast(
-            np.ndarray[Any, Any],
-            librosa.feature.rms(  # type: ignore
-                y=y, frame_length=frame_length, hop_length=hop_length, center=False
-            ),
-        )[0]
-
-        # Calculate ZCR per frame
-        zcr = cast(
-            np.ndarray[Any, Any],
-            librosa.feature.zero_crossing_rate(  # type: ignore
-                y=y, frame_length=frame_length, hop_length=hop_length, center=False
-            ),
-        )[0]
-
-        if len(rmse) > 0:
-            # 1. Determine Noise Floor
-            if noise_floor is not None and noise_floor > 0.0001:
-                # Use client-provided floor directly (Trust the Meter)
-                local_floor = noise_floor
-            else:
-                # Adaptive Fallback (10th percentile)
-                sorted_rms = np.sort(rmse)
-                floor_idx = int(len(sorted_rms) * 0.1)
-                local_floor = (
-                    sorted_rms[floor_idx] if floor_idx < len(sorted_rms) else 0.001
-                )
-
-            local_floor = max(0.001, local_floor)
-
-            # 2. Thresholds (RELAXED for trailing consonants)
-            # Originally 4.0x/2.5x - reduced even further to 0.010 to catch breathy starts
-            vol_thresh = max(0.010, local_floor * 2.0)
-            sens_thresh = max(0.005, local_floor * 1.5)
-            zcr_thresh = 0.1
-
-            # 3. Identify Speech Frames
-            # Logic: Loud OR (Moderately Loud AND High Frequency)
-            is_speech = (rmse > vol_thresh) | (
-                (rmse > sens_thresh) & (zcr > zcr_thresh)
-            )
-
-            # Find start/end
-            speech_indices = np.where(is_speech)[0]
-
-            if len(speech_indices) > 0:
-                start_frame = speech_indices[0]
-                end_frame = speech_indices[-1]
-
-                # Convert to samples
-                start_sample = start_frame * hop_length
-                end_sample = (end_frame + 1) * hop_length
-
-                # Asymmetric Padding:
-                # Start: 10ms (0.01s) - Tight/Snappy
-                # End: 300ms (0.30s) - Allow reverb/tails to fade naturally
-                padding_start = int(target_sr * 0.01)
-                padding_end = int(target_sr * 0.30)
-
-                start = max(0, start_sample - padding_start)
-                end = min(len(y), end_sample + padding_end)
+        rmse, zcr = frame_features(y, frame_length)
+        bounds = speech_bounds(rmse, zcr, hop_length, len(y), target_sr, noise_floor)
 
-                y_trimmed = y[start:end]
-
-                if len(y_trimmed) > 1000:  # Min duration check
-                    y = y_trimmed
-            else:
-                logger.warning("No speech detected by robust trim. Returning original.")
-
-        if y.size == 0:
-            logger.warning("Audio checks out empty after trimming.")
-            # Fallback to original loaded if trim kills it (unlikely)
-            y_stereo, _ = librosa.load(io.BytesIO(audio_data), sr=target_sr, mono=False)  # type: ignore[no-untyped-call]
-            if y_stereo.ndim > 1:
-                y = librosa.to_mono(y_stereo)  # type: ignore
-            else:
-                y = y_stereo  # type: ignore
-            y = cast(Any, y)
+        if bounds is not None:
+            y_trimmed = y[bounds[0] : bounds[1]]
+            if len(y_trimmed) > 1000:  # Min duration check
+                y = y_trimmed
+        elif len(rmse) > 0:
+            logger.warning("No speech detected by robust trim. Returning original.")
 
         # Peak Normalization
         # Target peak is 0.95 (~-0.5dB) to prevent clipping while maximizing dynamic range
@@ -150,7 +270,7 @@ def process_audio_data(
             logger.warning(
                 "NaN or Inf encountered during normalization. Returning original."
             )
-            return audio_data
+            return audio_data, None
 
         # Export to MP3 using soundfile
         # Note: soundfile requires 'libsndfile' to be installed.
@@ -159,12 +279,32 @@ def process_audio_data(
         sf.write(output_io, y, target_sr, format="mp3")  # type: ignore[no-untyped-call]
         output_io.seek(0)
 
-        return output_io.getvalue()
-
-        return output_io.getvalue()
+        return output_io.getvalue(), cast(np.ndarray[Any, Any], y)
 
     except Exception as e:
         logger.error(f"Error processing audio data: {e}")
         # Identify if it's a specific known error (e.g. format not supported)
         # Fallback: Return original bytes if processing fails to avoid data loss (though it wont be standardized)
-        return audio_data
+        return audio_data, None
+    finally:
+        if metrics.recording():
+            metrics.AUDIO_PREPROCESS_SECONDS.observe(time.perf_counter() - started)
+
+
+def warm_up_preprocessing(target_sr: int = 16000) -> None:
+    """
+    Runs a short synthetic upload through process_audio_with_samples so the
+    librosa imports, numba JIT and MP3 encoder setup happen before the first
+    real recording does.
+    """
+    import soundfile as sf  # type: ignore
+
+    # 0.5 s of a quiet 220 Hz tone at 44.1 kHz, decoded and resampled like
+    # a browser upload
+    sr_in = 44100
+    t = np.arange(sr_in // 2, dtype=np.float32) / sr_in
+    tone = (0.1 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+    wav = io.BytesIO()
+    sf.write(wav, tone, sr_in, format="WAV")  # type: ignore
+    with metrics.measuring(None):
+        process_audio_with_samples(wav.getvalue(), target_sr=target_sr)
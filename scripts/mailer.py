@@ -22,8 +22,18 @@ def send_email(
     subject: str, sender: str, recipients: list[str], text_body: str, html_body: str
 ):
     """
-    Send an email asynchronously via threading.
+    Send an email asynchronously via the Celery "mail" queue.
+    Falls back to a thread if the broker is unreachable.
     """
+    try:
+        current_app.extensions["celery"].send_task(
+            "tasks.send_email",
+            args=[subject, sender, recipients, text_body, html_body],
+        )
+        return
+    except Exception as e:
+        current_app.logger.warning(f"Mail queue unavailable, sending inline: {e}")
+
     msg = Message(subject, sender=sender, recipients=recipients)  # type: ignore
     msg.body = text_body
     msg.html = html_body
@@ -0,0 +1,230 @@
+# pyright: strict
+"""
+Prometheus metrics for the analysis pipeline, served at /metrics.
+
+Gunicorn workers and Celery worker processes each record their own samples.
+With PROMETHEUS_MULTIPROC_DIR set (one directory shared by the web and
+worker services on a host, existing before they start, emptied on reboot)
+every process writes to memory-mapped files there and /metrics sums them.
+Without it /metrics only reports the gunicorn worker that serves the scrape.
+
+Every metric is a no-op when prometheus_client is not installed.
+
+Scoring tasks also keep the stage durations of each submission
+(collect_stages) and store them on its AnalysisResult.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# prometheus_client picks its (multiprocess) storage when it is imported, so
+# PROMETHEUS_MULTIPROC_DIR from .env has to be in the environment first
+load_dotenv()
+
+try:
+    import prometheus_client  # type: ignore
+    from prometheus_client import multiprocess  # type: ignore
+except ImportError:
+    prometheus_client = None
+    multiprocess = None
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Published with every task message (before_task_publish), read by the worker
+ENQUEUED_AT_HEADER = "enqueued_at"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 60.0)
+
+
+class _NullMetric:
+    """Stands in for every metric when prometheus_client is missing."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NullMetric":
+        return self
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+def _histogram(
+    name: str, documentation: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]
+) -> Any:
+    if prometheus_client is None:
+        return _NullMetric()
+    return prometheus_client.Histogram(name, documentation, labels, buckets=buckets)
+
+
+def _counter(name: str, documentation: str) -> Any:
+    if prometheus_client is None:
+        return _NullMetric()
+    return prometheus_client.Counter(name, documentation)
+
+
+AUDIO_PREPROCESS_SECONDS = _histogram(
+    "pronounce_audio_preprocess_seconds",
+    "Upload decode, trim, normalize and MP3 encode (process_audio_data)",
+    (),
+    STAGE_BUCKETS,
+)
+ANALYSIS_STAGE_SECONDS = _histogram(
+    "pronounce_analysis_stage_seconds",
+    "Scoring time per stage (load, nucleus, pitch, intensity, burg, ...) of "
+    "student and reference recordings",
+    ("stage", "kind"),
+    STAGE_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = _histogram(
+    "pronounce_task_queue_wait_seconds",
+    "Time from publishing a Celery task to a worker starting it",
+    ("task",),
+    LATENCY_BUCKETS,
+)
+SUBMIT_TO_SCORE_SECONDS = _histogram(
+    "pronounce_submit_to_score_seconds",
+    "Time from queuing a submission to its score being committed",
+    ("task",),
+    LATENCY_BUCKETS,
+)
+CLIPPING_REJECTIONS = _counter(
+    "pronounce_clipping_rejections", "Uploads rejected as clipped"
+)
+DEEP_VOICE_CORRECTIONS = _counter(
+    "pronounce_deep_voice_corrections",
+    "Student measurements that fell back to the deep voice ceiling",
+)
+OUTLIERS = _counter(
+    "pronounce_outliers", "Submissions scored further than the outlier threshold"
+)
+
+
+# Stage durations (ms) of the submission being scored in this context
+_collected: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "collected_stages", default=None
+)
+
+
+# What the stages run in this context analyze ("student" / "reference");
+# None while warming up, so JIT runs and cache priming stay out of the histograms
+_kind: ContextVar[Optional[str]] = ContextVar("stage_kind", default="student")
+
+
+@contextmanager
+def measuring(kind: Optional[str]) -> Iterator[None]:
+    """
+    Labels the stages run inside the block with `kind`. None records nothing,
+    and nothing inside such a block is recorded either.
+    """
+    token = _kind.set(kind if _kind.get() is not None else None)
+    try:
+        yield
+    finally:
+        _kind.reset(token)
+
+
+def recording() -> bool:
+    """False inside a measuring(None) block."""
+    return _kind.get() is not None
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """Collects the durations (ms) of the stages run inside the block."""
+    timings: Dict[str, float] = {}
+    token = _collected.set(timings)
+    try:
+        yield timings
+    finally:
+        _collected.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Times one scoring stage. Only the outermost stage is collected (a
+    reference measured inside "reference" does not add to the student's
+    "burg"); repeated stages add up.
+    """
+    timings = _collected.get()
+    token = _collected.set(None)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _collected.reset(token)
+        kind = _kind.get()
+        if kind is not None:
+            ANALYSIS_STAGE_SECONDS.labels(name, kind).observe(elapsed)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000
+
+
+def rounded(timings: Dict[str, float]) -> Dict[str, float]:
+    """Collected durations as stored in AnalysisResult.stage_timings."""
+    return {name: round(ms, 1) for name, ms in timings.items()}
+
+
+# --- Celery ---
+def stamp_enqueued_at(
+    headers: Optional[Dict[str, Any]] = None, **kwargs: Any
+) -> None:
+    """before_task_publish handler: the publish time travels with the message."""
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+def enqueued_at(request: Any) -> Optional[float]:
+    """Publish time of the task being executed, if its message carries one."""
+    value = getattr(request, ENQUEUED_AT_HEADER, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(ENQUEUED_AT_HEADER)
+    return float(value) if value is not None else None
+
+
+def observe_queue_wait(task: Any = None, **kwargs: Any) -> None:
+    """task_prerun handler."""
+    started = enqueued_at(task.request) if task is not None else None
+    if started is not None:
+        QUEUE_WAIT_SECONDS.labels(task.name).observe(max(0.0, time.time() - started))
+
+
+def observe_submit_to_score(task: Any, started: Optional[float] = None) -> None:
+    """
+    Called by a scoring task once a result is committed. `started` is the
+    publish time of a submission the task scored for another (batched) task;
+    by default it is the task's own.
+    """
+    if started is None:
+        started = enqueued_at(task.request)
+    if started is not None:
+        SUBMIT_TO_SCORE_SECONDS.labels(task.name).observe(
+            max(0.0, time.time() - started)
+        )
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drops a finished process's live-gauge files (gunicorn / Celery child exit)."""
+    if MULTIPROC_DIR and multiprocess is not None:
+        multiprocess.mark_process_dead(pid)  # type: ignore
+
+
+def render() -> Tuple[bytes, str]:
+    """(body, content type) of the /metrics exposition."""
+    if prometheus_client is None:
+        return b"# prometheus_client is not installed\n", "text/plain; charset=utf-8"
+
+    registry: Any = prometheus_client.REGISTRY
+    if MULTIPROC_DIR:
+        # A fresh registry per scrape: the collector reads every process's files
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore
+    body = prometheus_client.generate_latest(registry)
+    return body, prometheus_client.CONTENT_TYPE_LATEST
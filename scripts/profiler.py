@@ -0,0 +1,174 @@
+# pyright: strict
+"""
+Request-scoped profiling: SQL statement count/time per request (reported in
+a Server-Timing header), slow-request logging with the top queries, and an
+optional sampled cProfile/pyinstrument capture toggled by the
+`enable_profiling` SystemConfig key.
+
+Cost when nothing is sampled: two perf_counter() calls per statement and a
+cached SystemConfig lookup per request.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, List, Tuple, cast
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Optional: pyinstrument gives readable call trees for sampled requests
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler  # type: ignore
+except ImportError:
+    PyinstrumentProfiler = None
+
+TOP_QUERIES = 5
+# Endpoints that are slow by design (long-polls) and never logged as slow
+SLOW_LOG_EXEMPT = {"get_task_status"}
+
+# One profiler per process at a time (Python 3.12+ allows only one active
+# profiling tool, and a gthread worker serves requests concurrently)
+_profile_lock = threading.Lock()
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if has_request_context() and "sql_stats" in g:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if not (has_request_context() and "sql_stats" in g):
+        return
+    starts = cast(List[float], conn.info.get("query_start") or [])
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = cast(List[Any], g.sql_stats)
+    stats[0] += 1
+    stats[1] += elapsed
+    cast(List[Tuple[float, str]], stats[2]).append((elapsed, statement))
+
+
+def _start_sampled_profile(app: Flask) -> None:
+    from models import SystemConfig
+
+    if not SystemConfig.get_bool("enable_profiling"):
+        return
+    if random.random() >= cast(float, app.config["PROFILE_SAMPLE_RATE"]):
+        return
+    if not _profile_lock.acquire(blocking=False):
+        return
+
+    profiler: Any
+    if app.config["PROFILER"] == "pyinstrument" and PyinstrumentProfiler is not None:
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g.request_profiler = profiler
+
+
+def _finish_sampled_profile(app: Flask, elapsed_ms: float) -> None:
+    profiler = g.pop("request_profiler", None)
+    if profiler is None:
+        return
+    try:
+        folder = cast(str, app.config["PROFILE_FOLDER"])
+        os.makedirs(folder, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        name = f"{stamp}_{request.endpoint or 'unknown'}"
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = os.path.join(folder, f"{name}.prof")
+            profiler.dump_stats(path)
+            summary = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.sort_stats("cumulative").print_stats(15)
+            app.logger.info(
+                f"Profiled {request.method} {request.path} ({elapsed_ms:.0f} ms) "
+                f"-> {path}\n{summary.getvalue()}"
+            )
+        else:
+            profiler.stop()
+            path = os.path.join(folder, f"{name}.html")
+            with open(path, "w") as f:
+                f.write(profiler.output_html())
+            app.logger.info(
+                f"Profiled {request.method} {request.path} ({elapsed_ms:.0f} ms) "
+                f"-> {path}"
+            )
+    except Exception as e:
+        app.logger.warning(f"Request profile failed: {e}")
+    finally:
+        _profile_lock.release()
+
+
+def init_profiler(app: Flask) -> None:
+    """Registers the SQL hooks and the per-request timing/profiling handlers."""
+    if not app.config["REQUEST_PROFILING"]:
+        return
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    slow_ms = cast(float, app.config["SLOW_REQUEST_MS"])
+
+    @app.before_request
+    def start_request_timing() -> None:
+        # [statement count, total seconds, [(seconds, statement), ...]]
+        g.sql_stats = [0, 0.0, []]
+        g.request_started = time.perf_counter()
+        if not request.path.startswith("/static"):
+            _start_sampled_profile(app)
+
+    @app.after_request
+    def add_server_timing(response: Any) -> Any:
+        if "request_started" not in g:
+            return response
+        elapsed_ms = (time.perf_counter() - cast(float, g.request_started)) * 1000
+        count, db_seconds, statements = cast(
+            Tuple[int, float, List[Tuple[float, str]]], tuple(g.sql_stats)
+        )
+        db_ms = db_seconds * 1000
+
+        response.headers.add(
+            "Server-Timing", f'db;dur={db_ms:.1f};desc="{count} queries"'
+        )
+        response.headers.add("Server-Timing", f"app;dur={elapsed_ms:.1f}")
+
+        if elapsed_ms >= slow_ms and request.endpoint not in SLOW_LOG_EXEMPT:
+            top = sorted(statements, key=lambda s: s[0], reverse=True)[:TOP_QUERIES]
+            lines = "\n".join(
+                f"  {seconds * 1000:8.1f} ms  {' '.join(sql.split())[:300]}"
+                for seconds, sql in top
+            )
+            app.logger.warning(
+                f"Slow request {request.method} {request.path}: {elapsed_ms:.0f} ms, "
+                f"{count} queries ({db_ms:.0f} ms in DB)\n{lines}"
+            )
+
+        _finish_sampled_profile(app, elapsed_ms)
+        return response
+
+    @app.teardown_request
+    def release_profiler(exc: BaseException | None) -> None:
+        # after_request is skipped when the view raised: drop the capture
+        profiler = g.pop("request_profiler", None)
+        if profiler is None:
+            return
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+        _profile_lock.release()
@@ -0,0 +1,389 @@
+# pyright: strict
+"""
+Batch re-analysis of stored submissions (`flask reanalyze`).
+
+Formant measurement is the expensive, DB-free part, so it is fanned out over
+a process pool whose workers warm up the engine once. The main process keeps
+the DB work: reference lookups, cumulative VTLN updates (same rules as
+process_submission) and bulk writes of each batch in one transaction.
+A checkpoint file records the last committed submission id so an interrupted
+run resumes where it stopped.
+
+With `stale_only`, only submissions whose result is missing or was produced
+by another engine version / reference recording are selected (see plan_stale).
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, cast
+
+# (submission_id, absolute audio path, stressed vowel)
+Job = Tuple[int, str, str]
+# (submission_id, student measurements or None, is_deep_corrected,
+#  student audio hash, error)
+Measured = Tuple[
+    int, Optional[List[Tuple[float, float]]], bool, Optional[str], Optional[str]
+]
+# Reference per (word, vowel): (measurements, reference audio hash)
+References = Dict[Tuple[str, str], Tuple[List[Tuple[float, float]], Optional[str]]]
+
+
+# --- Worker side (no DB access) ---
+
+
+def _init_worker() -> None:
+    """Runs once per worker process: pays the librosa/Praat warm-up up front."""
+    from analysis_engine import warm_up
+
+    warm_up()
+
+
+def _measure(job: Job) -> Measured:
+    from analysis_engine import analysis_input_hash, formant_analyzer
+
+    submission_id, path, vowel = job
+    if not os.path.exists(path):
+        return submission_id, None, False, None, f"missing file {path}"
+    try:
+        meas_s, is_deep = formant_analyzer.analyze_path(path, vowel, is_reference=False)
+        return submission_id, meas_s, is_deep, analysis_input_hash(path), None
+    except Exception as e:
+        return submission_id, None, False, None, str(e)
+
+
+# --- Main process ---
+
+
+def _apply_filters(query: Any, filters: Dict[str, Any]) -> Any:
+    """word / user_id / date_from / date_to (ISO dates, inclusive)."""
+    from models import Submission, Word, db
+
+    if filters.get("word"):
+        query = query.filter(db.func.lower(Word.text) == filters["word"].lower())
+    if filters.get("user_id") is not None:
+        query = query.filter(Submission.user_id == filters["user_id"])
+    if filters.get("date_from"):
+        query = query.filter(
+            Submission.timestamp >= datetime.fromisoformat(filters["date_from"])
+        )
+    if filters.get("date_to"):
+        query = query.filter(
+            Submission.timestamp
+            < datetime.fromisoformat(filters["date_to"]) + timedelta(days=1)
+        )
+    return query
+
+
+def current_reference_hashes() -> Dict[int, Optional[str]]:
+    """Content hash of every word's reference MP3 as it is on disk now."""
+    from analysis_engine import file_content_hash, reference_audio_path
+    from models import Word, db
+
+    rows = cast(List[Tuple[int, str]], db.session.query(Word.id, Word.text).all())
+    return {
+        word_id: file_content_hash(reference_audio_path(text)) for word_id, text in rows
+    }
+
+
+def stale_reasons(ref_hashes: Dict[int, Optional[str]]) -> Dict[str, Any]:
+    """
+    SQL conditions (on Submission outer-joined to AnalysisResult) for each
+    reason a submission needs re-analysis.
+    """
+    from analysis_engine import result_params_hash
+    from models import AnalysisResult, Submission, db
+
+    ref_changed = [
+        db.and_(
+            Submission.word_id == word_id,
+            AnalysisResult.ref_audio_hash.is_distinct_from(audio_hash),  # type: ignore
+        )
+        for word_id, audio_hash in ref_hashes.items()
+        if audio_hash is not None
+    ]
+    return {
+        "missing": AnalysisResult.id.is_(None),  # type: ignore
+        "engine": AnalysisResult.engine_hash.is_distinct_from(  # type: ignore
+            result_params_hash()
+        ),
+        "reference": db.or_(*ref_changed) if ref_changed else db.false(),
+        # Student uploads are write-once; results from before provenance
+        # was recorded have no audio hash to compare against.
+        "audio": AnalysisResult.audio_hash.is_(None),  # type: ignore
+    }
+
+
+def select_jobs(
+    upload_folder: str, filters: Dict[str, Any], after_id: int = 0
+) -> List[Tuple[int, int, str, str, str]]:
+    """
+    (submission_id, user_id, word text, vowel, absolute path) of the
+    submissions to re-analyze, in id order. Column-only query.
+    """
+    from models import AnalysisResult, Submission, Word, db
+
+    query = (
+        db.session.query(
+            Submission.id,
+            Submission.user_id,
+            Word.text,
+            Word.stressed_vowel,
+            Submission.file_path,
+        )
+        .join(Word, Submission.word_id == Word.id)
+        .filter(Submission.id > after_id)
+    )
+    query = _apply_filters(query, filters)
+    if filters.get("stale_only"):
+        reasons = stale_reasons(current_reference_hashes())
+        query = query.outerjoin(
+            AnalysisResult, AnalysisResult.submission_id == Submission.id
+        ).filter(db.or_(*reasons.values()))
+
+    rows = cast(List[Any], query.order_by(Submission.id).all())
+    return [
+        (sid, uid, text, vowel, os.path.join(upload_folder, path))
+        for sid, uid, text, vowel, path in rows
+    ]
+
+
+def plan_stale(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Per-word count of submissions and of those needing re-analysis, by
+    reason (a submission can have several). One grouped query.
+    """
+    from models import AnalysisResult, Submission, Word, db
+
+    reasons = stale_reasons(current_reference_hashes())
+    query = (
+        db.session.query(
+            Word.text,
+            db.func.count(Submission.id),
+            db.func.count(Submission.id).filter(db.or_(*reasons.values())),
+            *[
+                db.func.count(Submission.id).filter(condition)
+                for condition in reasons.values()
+            ],
+        )
+        .select_from(Submission)
+        .join(Word, Submission.word_id == Word.id)
+        .outerjoin(AnalysisResult, AnalysisResult.submission_id == Submission.id)
+        .group_by(Word.text)
+        .order_by(Word.text)
+    )
+    query = _apply_filters(query, filters)
+
+    report: List[Dict[str, Any]] = []
+    for word_text, total, stale, *counts in cast(List[Any], query.all()):
+        report.append(
+            {
+                "word": word_text,
+                "total": total,
+                "stale": stale,
+                **dict(zip(reasons.keys(), counts)),
+            }
+        )
+    return report
+
+
+def load_checkpoint(path: str, filters: Dict[str, Any]) -> int:
+    """Last committed submission id of a previous run with the same filters."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if data.get("filters") != filters:
+        print(f"Checkpoint {path} is for other filters; starting over.")
+        return 0
+    return int(data.get("last_submission_id", 0))
+
+
+def save_checkpoint(path: str, filters: Dict[str, Any], last_id: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"filters": filters, "last_submission_id": last_id}, f)
+    os.replace(tmp_path, path)
+
+
+def _batched(items: Iterator[Measured], size: int) -> Iterator[List[Measured]]:
+    batch: List[Measured] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_batch(
+    batch: List[Measured],
+    job_meta: Dict[int, Tuple[int, str, str]],
+    references: References,
+) -> int:
+    """
+    Applies one batch of measurements: VTLN update per submission (in id
+    order, as process_submission would), then bulk UPDATE of existing
+    results, bulk INSERT of new ones and bulk score updates. Commits.
+    Returns the number of results written.
+    """
+    from sqlalchemy import insert, update
+
+    from analysis_engine import (
+        result_params_hash,
+        score_from_distance,
+        score_measurements,
+    )
+    from models import AnalysisResult, StudentProgress, Submission, VtlnState, db
+
+    ok = [m for m in batch if m[1] is not None]
+    if not ok:
+        return 0
+
+    existing = {
+        cast(int, row.submission_id): row
+        for row in cast(
+            List[Any],
+            db.session.query(
+                AnalysisResult.id,
+                AnalysisResult.submission_id,
+                AnalysisResult.f1_raw,
+                AnalysisResult.f2_raw,
+                AnalysisResult.f1_ref,
+                AnalysisResult.f2_ref,
+            )
+            .filter(
+                AnalysisResult.submission_id.in_([m[0] for m in ok])  # type: ignore
+            )
+            .all(),
+        )
+    }
+
+    now = datetime.now(timezone.utc)
+    engine_hash = result_params_hash()
+    states: Dict[int, VtlnState] = {}
+    updates: List[Dict[str, Any]] = []
+    inserts: List[Dict[str, Any]] = []
+    scores: List[Dict[str, Any]] = []
+
+    for submission_id, meas_s, is_deep, audio_hash, _ in ok:
+        user_id, word_text, vowel = job_meta[submission_id]
+        meas_s = cast(List[Tuple[float, float]], meas_s)
+        meas_r, ref_audio_hash = references[(word_text, vowel)]
+
+        if user_id not in states:
+            states[user_id] = VtlnState.for_user(user_id)
+        state = states[user_id]
+
+        old = existing.get(submission_id)
+        if old is not None:
+            state.remove_ratios(
+                VtlnState.ratios_for(old.f1_raw, old.f2_raw, old.f1_ref, old.f2_ref)
+            )
+        f1s_raw, f2s_raw = meas_s[0]
+        f1r, f2r = meas_r[0]
+        state.add_ratios(VtlnState.ratios_for(f1s_raw, f2s_raw, f1r, f2r))
+
+        fields = score_measurements(meas_s, meas_r, state.median(), is_deep)
+        fields.update(
+            engine_hash=engine_hash,
+            audio_hash=audio_hash,
+            ref_audio_hash=ref_audio_hash,
+        )
+        if old is not None:
+            updates.append({"id": old.id, "updated_at": now, **fields})
+        else:
+            inserts.append({"submission_id": submission_id, **fields})
+
+        dist_bark = cast(float, fields["distance_bark"])
+        if dist_bark == dist_bark:  # Not NaN
+            scores.append(
+                {"id": submission_id, "score": score_from_distance(dist_bark)}
+            )
+
+    if updates:
+        db.session.execute(update(AnalysisResult), updates)
+    if inserts:
+        db.session.execute(insert(AnalysisResult), inserts)
+    if scores:
+        db.session.execute(update(Submission), scores)
+    for user_id in states:
+        StudentProgress.refresh(user_id)
+    db.session.commit()
+    return len(ok)
+
+
+def run_reanalysis(
+    upload_folder: str,
+    filters: Dict[str, Any],
+    workers: int,
+    batch_size: int,
+    checkpoint_path: str,
+    restart: bool = False,
+) -> Tuple[int, int]:
+    """
+    Re-analyzes the matching submissions. Returns (written, failed).
+    `filters` keys: word, user_id, date_from, date_to (ISO dates), stale_only.
+    """
+    from analysis_engine import reference_measurement
+    from models import db
+
+    after_id = 0 if restart else load_checkpoint(checkpoint_path, filters)
+    if after_id:
+        print(f"Resuming after submission {after_id}.")
+
+    jobs = select_jobs(upload_folder, filters, after_id=after_id)
+    total = len(jobs)
+    if not total:
+        print("Nothing to re-analyze.")
+        return 0, 0
+
+    # References once per word, from the persisted cache
+    references: References = {}
+    for _, _, word_text, vowel, _ in jobs:
+        key = (word_text.lower(), vowel)
+        if key not in references:
+            meas_r, _, ref_audio_hash = reference_measurement(key[0], vowel)
+            references[key] = (meas_r, ref_audio_hash)
+    db.session.commit()
+
+    job_meta = {sid: (uid, text.lower(), vowel) for sid, uid, text, vowel, _ in jobs}
+    work: List[Job] = [(sid, path, vowel) for sid, _, _, vowel, path in jobs]
+
+    # Workers must not inherit open DB connections; spawn also keeps
+    # numba/BLAS thread state out of forked children.
+    db.engine.dispose()
+
+    written = failed = done = 0
+    started = time.monotonic()
+    print(f"Re-analyzing {total} submission(s) with {workers} worker(s)...")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        # map() yields in submission order, so the checkpoint never skips ahead
+        measured = pool.map(_measure, work, chunksize=8)
+        for batch in _batched(measured, batch_size):
+            for submission_id, _, _, _, error in batch:
+                if error:
+                    failed += 1
+                    print(f"  Submission {submission_id}: {error}")
+            written += _write_batch(batch, job_meta, references)
+            done += len(batch)
+            save_checkpoint(checkpoint_path, filters, batch[-1][0])
+
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate if rate else 0.0
+            print(
+                f"  {done}/{total} ({rate:.1f}/s, ETA {eta / 60:.1f} min), "
+                f"{written} written, {failed} failed"
+            )
+
+    return written, failed
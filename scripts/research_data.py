@@ -0,0 +1,302 @@
+# pyright: strict
+"""
+Research dataset: AnalysisResult rows flattened with their Submission, User
+and Word metadata. Shared by the research dashboard API and the exports.
+Rows are fetched with column-only queries and keyset pagination on
+AnalysisResult.id, so no caller has to materialize the whole study.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, cast
+
+from models import AnalysisResult, Submission, User, Word, db
+
+# Optional: columnar (Parquet / Arrow IPC) exports
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:
+    pa = None
+    pq = None
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_SIZE = 1000
+# Incremental exports stop this far before "now": a scoring transaction that
+# stamped updated_at earlier has committed by then, so no result lands
+# behind the watermark
+EXPORT_SETTLE_SECONDS = 300
+
+# Output columns, in export order
+COLUMNS = [
+    "id",
+    "submission_id",
+    "timestamp",
+    "username",
+    "student_id",
+    "word",
+    "vowel",
+    "test_type",
+    "f1_s",
+    "f2_s",
+    "f1_r",
+    "f2_r",
+    "dist_bark",
+    "alpha",
+    "is_outlier",
+    "updated_at",
+]
+
+
+# Request args read by parse_filters
+FILTER_KEYS = ("vowel", "word", "test_type", "date_from", "date_to")
+
+
+def parse_filters(args: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Reads the supported filters from request args:
+    vowel, word, test_type, date_from, date_to (YYYY-MM-DD, inclusive).
+    Raises ValueError on a malformed date.
+    """
+    filters: Dict[str, Any] = {}
+    for key in ("vowel", "word", "test_type"):
+        value = args.get(key)
+        if value:
+            filters[key] = str(value)
+    if args.get("date_from"):
+        filters["date_from"] = datetime.strptime(str(args["date_from"]), "%Y-%m-%d")
+    if args.get("date_to"):
+        filters["date_to"] = datetime.strptime(
+            str(args["date_to"]), "%Y-%m-%d"
+        ) + timedelta(days=1)
+    return filters
+
+
+def research_query(filters: Optional[Dict[str, Any]] = None) -> Any:
+    """Column-only query over student analysis results, ordered by id."""
+    filters = filters or {}
+    query = (
+        db.session.query(
+            AnalysisResult.id,
+            AnalysisResult.submission_id,
+            Submission.timestamp,
+            User.username,
+            User.student_id,
+            Word.text,
+            Word.stressed_vowel,
+            Submission.test_type,
+            AnalysisResult.f1_norm,
+            AnalysisResult.f2_norm,
+            AnalysisResult.f1_ref,
+            AnalysisResult.f2_ref,
+            AnalysisResult.distance_bark,
+            AnalysisResult.scaling_factor,
+            AnalysisResult.is_outlier,
+            AnalysisResult.updated_at,
+        )
+        .join(Submission, AnalysisResult.submission_id == Submission.id)
+        .join(User, Submission.user_id == User.id)
+        .join(Word, Submission.word_id == Word.id)
+        .filter(User.role == "student")  # type: ignore # Only analyze students
+    )
+    if "vowel" in filters:
+        query = query.filter(Word.stressed_vowel == filters["vowel"])
+    if "word" in filters:
+        query = query.filter(Word.text == filters["word"])
+    if "test_type" in filters:
+        query = query.filter(Submission.test_type == filters["test_type"])
+    if "date_from" in filters:
+        query = query.filter(Submission.timestamp >= filters["date_from"])
+    if "date_to" in filters:
+        query = query.filter(Submission.timestamp < filters["date_to"])
+    # Incremental exports: results scored or re-analyzed within a window
+    if "updated_after" in filters:
+        query = query.filter(AnalysisResult.updated_at > filters["updated_after"])
+    if "updated_until" in filters:
+        query = query.filter(AnalysisResult.updated_at <= filters["updated_until"])
+    return query.order_by(AnalysisResult.id)
+
+
+def incremental_filters(watermark: Optional[str]) -> Tuple[Dict[str, Any], datetime]:
+    """
+    Filters for the results updated since the last incremental export
+    (`watermark`, ISO timestamp; None = everything) and the new watermark.
+    Keyed on updated_at rather than ids, so results scored late (async) and
+    re-analyzed results are picked up by the next export; consumers keep the
+    newest row per id.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+    filters: Dict[str, Any] = {"updated_until": cutoff}
+    if watermark:
+        filters["updated_after"] = datetime.fromisoformat(watermark)
+    return filters, cutoff
+
+
+def _clean(value: Optional[float]) -> Optional[float]:
+    return None if value is None or math.isnan(value) else value
+
+
+def row_to_dict(row: Any) -> Dict[str, Any]:
+    """Flattens a research_query row; NaN measurements become None."""
+    (
+        result_id,
+        submission_id,
+        timestamp,
+        username,
+        student_id,
+        word,
+        vowel,
+        test_type,
+        f1_s,
+        f2_s,
+        f1_r,
+        f2_r,
+        dist_bark,
+        alpha,
+        is_outlier,
+        updated_at,
+    ) = cast(Tuple[Any, ...], row)
+    return {
+        "id": result_id,
+        "submission_id": submission_id,
+        "timestamp": timestamp.isoformat() if timestamp else None,
+        "username": username,
+        "student_id": student_id,
+        "word": word,
+        "vowel": vowel,
+        "test_type": test_type,
+        "f1_s": _clean(f1_s),
+        "f2_s": _clean(f2_s),
+        "f1_r": _clean(f1_r),
+        "f2_r": _clean(f2_r),
+        "dist_bark": _clean(dist_bark),
+        "alpha": 1.0 if alpha is not None and math.isnan(alpha) else alpha,
+        "is_outlier": is_outlier,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+    }
+
+
+def fetch_page(
+    filters: Dict[str, Any], after_id: int = 0, limit: int = PAGE_SIZE
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    One keyset page of rows with id > after_id.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = cast(
+        List[Any],
+        research_query(filters)
+        .filter(AnalysisResult.id > after_id)
+        .limit(limit + 1)
+        .all(),
+    )
+    page = [row_to_dict(r) for r in rows[:limit]]
+    next_cursor = page[-1]["id"] if len(rows) > limit else None
+    return page, next_cursor
+
+
+def iter_rows(
+    filters: Dict[str, Any], chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """Streams every matching row from a server-side cursor."""
+    query = research_query(filters).execution_options(yield_per=chunk_size)
+    for row in query:
+        yield row_to_dict(row)
+
+
+def iter_ndjson(filters: Dict[str, Any]) -> Iterator[str]:
+    for row in iter_rows(filters):
+        yield json.dumps(row) + "\n"
+
+
+def iter_csv(filters: Dict[str, Any]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for i, row in enumerate(iter_rows(filters), start=1):
+        writer.writerow(row)
+        # Flush in batches rather than per row
+        if i % STREAM_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+# --- Columnar export ---
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+
+def _arrow_schema() -> Any:
+    return pa.schema(  # type: ignore
+        [
+            ("id", pa.int64()),  # type: ignore
+            ("submission_id", pa.int64()),  # type: ignore
+            ("timestamp", pa.timestamp("us")),  # type: ignore
+            ("username", pa.string()),  # type: ignore
+            ("student_id", pa.string()),  # type: ignore
+            ("word", pa.string()),  # type: ignore
+            ("vowel", pa.string()),  # type: ignore
+            ("test_type", pa.string()),  # type: ignore
+            ("f1_s", pa.float64()),  # type: ignore
+            ("f2_s", pa.float64()),  # type: ignore
+            ("f1_r", pa.float64()),  # type: ignore
+            ("f2_r", pa.float64()),  # type: ignore
+            ("dist_bark", pa.float64()),  # type: ignore
+            ("alpha", pa.float64()),  # type: ignore
+            ("is_outlier", pa.bool_()),  # type: ignore
+            ("updated_at", pa.timestamp("us")),  # type: ignore
+        ]
+    )
+
+
+def export_columnar(
+    path: str,
+    fmt: str = "parquet",
+    filters: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 50_000,
+) -> int:
+    """
+    Writes the research dataset to `path` as Parquet or Arrow IPC, one record
+    batch per `chunk_size` rows read from a server-side cursor. Measurements
+    are kept raw (NaN stays NaN) for analysis in pandas/polars.
+    Returns the number of rows written.
+    """
+    if pa is None or pq is None:
+        raise RuntimeError("pyarrow is not installed (pip install pyarrow)")
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    schema = _arrow_schema()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression="zstd")  # type: ignore
+    else:
+        writer = pa.ipc.new_file(path, schema)  # type: ignore
+
+    result = db.session.execute(
+        research_query(filters).statement,
+        execution_options={"yield_per": chunk_size},
+    )
+    total = 0
+    try:
+        for partition in result.partitions():
+            # Transpose the row tuples into columns
+            columns = list(zip(*partition))
+            batch = pa.RecordBatch.from_arrays(  # type: ignore
+                [
+                    pa.array(col, type=field.type)  # type: ignore
+                    for col, field in zip(columns, schema)
+                ],
+                schema=schema,
+            )
+            writer.write_batch(batch)  # type: ignore
+            total += len(partition)
+    finally:
+        writer.close()  # type: ignore
+
+    return total
@@ -0,0 +1,86 @@
+# pyright: strict
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+# Fallback poll interval for result backends without pub/sub
+POLL_INTERVAL = 0.5
+
+# Long-polls currently held open by this process (see waiter_slot)
+_waiters_lock = threading.Lock()
+_active_waiters = 0
+
+
+@contextmanager
+def waiter_slot(limit: int) -> Iterator[bool]:
+    """
+    Claims one of `limit` long-poll slots in this process. Yields False when
+    all are taken, so the caller answers at once instead of pinning another
+    gunicorn thread (and Redis connection) for the whole wait.
+    """
+    global _active_waiters
+    with _waiters_lock:
+        granted = _active_waiters < limit
+        if granted:
+            _active_waiters += 1
+    try:
+        yield granted
+    finally:
+        if granted:
+            with _waiters_lock:
+                _active_waiters -= 1
+
+
+def wait_for_result(result: Any, timeout: float) -> None:
+    """
+    Blocks until a Celery AsyncResult is ready or `timeout` seconds pass.
+    The Redis result backend PUBLISHes every stored result on the result key,
+    so we subscribe to that channel and block on it; the result is read once,
+    right after subscribing, to catch one stored before the subscription.
+    Uses its own pub/sub connection, which keeps it safe in gthread workers.
+    """
+    if timeout <= 0:
+        return
+
+    deadline = time.monotonic() + timeout
+    backend = result.backend
+    client = getattr(backend, "client", None)
+
+    if client is None or not hasattr(backend, "get_key_for_task"):
+        while not result.ready() and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+        return
+
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(backend.get_key_for_task(result.id))
+        if result.ready():
+            return
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            # The subscribe confirmation comes back as None; anything else
+            # is the stored result
+            if pubsub.get_message(timeout=remaining) is not None:
+                return
+    finally:
+        pubsub.close()
+
+
+def queue_depths(celery_app: Any, queues: List[str]) -> Dict[str, int]:
+    """
+    Messages waiting in each broker queue (not counting tasks a worker has
+    already prefetched). A queue that was never declared reports 0.
+    """
+    depths: Dict[str, int] = {}
+    with celery_app.connection_for_read() as conn:
+        channel = conn.default_channel
+        for name in queues:
+            try:
+                ok = channel.queue_declare(queue=name, passive=True)
+                depths[name] = int(ok.message_count)
+            except Exception:
+                depths[name] = 0
+    return depths
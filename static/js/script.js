@@ -133,6 +133,28 @@ const logEvent = async (event, data = {}) => {
     }
 };
 
+// Waits for a background task (audio preprocessing / analysis) to finish
+// and returns its final payload ({ status: 'success' | 'error', ... }).
+// The server holds each request open until the result is published (long-poll).
+const waitForTask = async (taskId) => {
+    while (true) {
+        let pollData = null;
+        try {
+            const pollRes = await fetch(`/api/status/${taskId}?wait=20`);
+            pollData = await pollRes.json();
+        } catch (e) {
+            console.warn("Status request failed, retrying...", e);
+        }
+
+        if (pollData && (pollData.status === 'success' || pollData.status === 'error')) return pollData;
+        // Still processing (wait expired), server out of long-poll slots
+        // (retry_after) or a network hiccup: pause before re-arming
+        console.log("Waiting for task...");
+        const pause = pollData ? (pollData.retry_after ? pollData.retry_after * 1000 : 100) : 1000;
+        await new Promise(r => setTimeout(r, pause));
+    }
+};
+
 const getAC = async () => {
     if (!audioContext) {
         // Use native sample rate for better compatibility/latency
@@ -1089,7 +1111,17 @@ async function stopRecording() {
         // Pass the continuous noise floor for better trimming
         formData.append('noiseFloor', measuredNoiseFloor);
 
-        const res = await fetch('/api/process_audio', {
+        // Fused pipeline: the upload is trimmed and scored by one worker task
+        const wordId = window.FUSED_PIPELINE ? selectedWordId() : null;
+        if (wordId) {
+            formData.append('word_id', wordId);
+            formData.append('test_type', UI.testTypeInput?.value || 'pre');
+            UI.submitBtn.disabled = true;
+            if (UI.testTypeInput) UI.testTypeInput.disabled = true;
+            if (UI.submitMsg) UI.submitMsg.textContent = 'ANALYSING...';
+        }
+
+        const res = await fetch(wordId ? '/api/submit_audio' : '/api/process_audio', {
             method: 'POST',
             body: formData
         });
@@ -1097,7 +1129,18 @@ async function stopRecording() {
         if (!res.ok) throw new Error('Processing Failed');
 
         // Backend returns JSON with URL, not a blob
-        const data = await res.json();
+        let data = await res.json();
+
+        // Async preprocessing mode: the upload is trimmed by a worker
+        if (res.status === 202 && data.task_id) {
+            data = await waitForTask(data.task_id);
+            // A fused result without a path means the upload itself failed
+            if (data.status !== 'success' && !(wordId && data.path)) {
+                if (wordId && UI.testTypeInput) UI.testTypeInput.disabled = false;
+                if (wordId && UI.submitMsg) UI.submitMsg.textContent = '';
+                throw new Error(data.message || 'Processing Failed');
+            }
+        }
 
         // Store the processed file path for submission
         window.processedFilePath = data.path;
@@ -1112,12 +1155,18 @@ async function stopRecording() {
 
         // Update UI
         say('READY');
-        UI.submitBtn.disabled = false;
         UI.playUserBtn.disabled = false;
         UI.recStartBtn.disabled = false;
 
         renderComparison();
 
+        if (wordId) {
+            // Already submitted; the submit button only re-enables on error
+            await showSubmitResult(data);
+        } else {
+            UI.submitBtn.disabled = false;
+        }
+
     } catch (e) {
         console.error(e);
         say('ERROR');
@@ -1229,6 +1278,60 @@ if (UI.playUserBtn) UI.playUserBtn.onclick = async () => {
     }
 };
 
+// Get word_id from WORDS array
+const selectedWordId = () => {
+    const wordObj = WORDS.find(w => (typeof w === 'object' ? w.word : w) === selectedWord);
+    return wordObj ? (typeof wordObj === 'object' ? wordObj.id : null) : null;
+};
+
+// Renders the final analysis result (shared by the submit button and the fused upload)
+const showSubmitResult = async (data) => {
+    if (data.status === 'success') {
+        let msg = '✅ SAVED';
+        if (data.analysis && data.analysis.distance_bark !== null) {
+            const d = data.analysis.distance_bark;
+            let colorClass = 'text-slate-600'; // Default
+            let verdict = 'OK';
+
+            // Traffic Light Logic
+            if (d < 1.5) {
+                colorClass = 'score-success';
+                verdict = 'Excellent!';
+            } else if (d < 3.0) {
+                colorClass = 'score-warning';
+                verdict = 'Good';
+            } else {
+                colorClass = 'score-danger';
+                verdict = 'Try Again';
+            }
+
+            // Render HTML inside message box (safely)
+            let recHtml = '';
+            if (data.analysis.recommendation) {
+                recHtml = `<div class="text-sm font-medium text-slate-500 normal-case tracking-normal mt-0.5">💡 ${data.analysis.recommendation}</div>`;
+            }
+            UI.submitMsg.innerHTML = `<div>✅ <span class="${colorClass}">Score: ${d} Bark (${verdict})</span></div>${recHtml}`;
+        } else {
+            if (UI.submitMsg) UI.submitMsg.textContent = msg;
+        }
+
+        await fetchUserProgress();
+        if (UI.testTypeInput) UI.testTypeInput.disabled = false;
+
+        // Enable Next Word Button
+        if (UI.nextWordBtn) {
+            UI.nextWordBtn.disabled = false;
+            UI.nextWordBtn.classList.add('animate-pulse-subtle'); // Optional visual cue
+        }
+
+    } else {
+        console.error("Analysis Error:", data.message);
+        if (UI.submitMsg) UI.submitMsg.textContent = '⚠️ ERROR';
+        UI.submitBtn.disabled = false;
+        if (UI.testTypeInput) UI.testTypeInput.disabled = false;
+    }
+};
+
 if (UI.submitBtn) UI.submitBtn.onclick = async (e) => {
     e.preventDefault();
     if (!window.processedFilePath) return;
@@ -1236,9 +1339,7 @@ if (UI.submitBtn) UI.submitBtn.onclick = async (e) => {
     UI.submitBtn.disabled = true;
     if (UI.testTypeInput) UI.testTypeInput.disabled = true;
 
-    // Get word_id from WORDS array
-    const wordObj = WORDS.find(w => (typeof w === 'object' ? w.word : w) === selectedWord);
-    const word_id = wordObj ? (typeof wordObj === 'object' ? wordObj.id : null) : null;
+    const word_id = selectedWordId();
 
     if (!word_id) {
         say('ERROR: Word not found');
@@ -1263,69 +1364,10 @@ if (UI.submitBtn) UI.submitBtn.onclick = async (e) => {
         let data = initialData;
         if (res.status === 202 && data.task_id) {
             UI.submitMsg.textContent = 'ANALYSING...';
-            // Start polling
-            const taskId = data.task_id;
-            let polling = true;
-            while (polling) {
-                await new Promise(r => setTimeout(r, 1000)); // Wait 1s
-                const pollRes = await fetch(`/api/status/${taskId}`);
-                const pollData = await pollRes.json();
-
-                if (pollData.status === 'success' || pollData.status === 'error') {
-                    data = pollData;
-                    polling = false;
-                } else {
-                    // Still processing...
-                    console.log("Waiting for analysis...");
-                }
-            }
+            data = await waitForTask(data.task_id);
         }
 
-        // Handle Final Result (Same as before)
-        if (data.status === 'success') {
-            let msg = '✅ SAVED';
-            if (data.analysis && data.analysis.distance_bark !== null) {
-                const d = data.analysis.distance_bark;
-                let colorClass = 'text-slate-600'; // Default
-                let verdict = 'OK';
-
-                // Traffic Light Logic
-                if (d < 1.5) {
-                    colorClass = 'score-success';
-                    verdict = 'Excellent!';
-                } else if (d < 3.0) {
-                    colorClass = 'score-warning';
-                    verdict = 'Good';
-                } else {
-                    colorClass = 'score-danger';
-                    verdict = 'Try Again';
-                }
-
-                // Render HTML inside message box (safely)
-                let recHtml = '';
-                if (data.analysis.recommendation) {
-                    recHtml = `<div class="text-sm font-medium text-slate-500 normal-case tracking-normal mt-0.5">💡 ${data.analysis.recommendation}</div>`;
-                }
-                UI.submitMsg.innerHTML = `<div>✅ <span class="${colorClass}">Score: ${d} Bark (${verdict})</span></div>${recHtml}`;
-            } else {
-                if (UI.submitMsg) UI.submitMsg.textContent = msg;
-            }
-
-            await fetchUserProgress();
-            if (UI.testTypeInput) UI.testTypeInput.disabled = false;
-
-            // Enable Next Word Button
-            if (UI.nextWordBtn) {
-                UI.nextWordBtn.disabled = false;
-                UI.nextWordBtn.classList.add('animate-pulse-subtle'); // Optional visual cue
-            }
-
-        } else {
-            console.error("Analysis Error:", data.message);
-            if (UI.submitMsg) UI.submitMsg.textContent = '⚠️ ERROR';
-            UI.submitBtn.disabled = false;
-            if (UI.testTypeInput) UI.testTypeInput.disabled = false;
-        }
+        await showSubmitResult(data);
     } catch (e) {
         console.error(e);
         if (UI.submitMsg) UI.submitMsg.textContent = '⚠️ TIMEOUT';
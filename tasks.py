@@ -1,21 +1,324 @@
 # pyright: strict
-from typing import Any, Dict, List, cast
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 from celery import shared_task  # type: ignore
+from celery.exceptions import Ignore  # type: ignore
 from flask import current_app  # type: ignore
-from models import Submission, db, AnalysisResult
-from analysis_engine import process_submission
+from models import StudentProgress, Submission, db, AnalysisResult
+from scripts import metrics
 import logging
 
+# analysis_engine and scripts.audio_processing (numpy/librosa/parselmouth) are
+# imported inside the task bodies: the web process imports this module only
+# to dispatch tasks.
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
+def build_result_payload(sub: Submission) -> Dict[str, Any]:
+    """
+    Scores a processed submission for the frontend. The simplified score
+    itself is stored on the Submission by analyze_submission, in the same
+    commit as its AnalysisResult.
+    """
+    from analysis_engine import score_from_distance
+
+    result = cast(AnalysisResult | None, sub.analysis)
+
+    # Re-implement the scoring logic here or fetch from DB if stored
+    # (Logic copied/adapted from flask_app.py to ensure consistent return data)
+    dist = result.distance_bark if result and result.distance_bark else 0.0
+    score_val = score_from_distance(dist)
+
+    # Simple Category Logic
+    score_cat = "danger"
+    if dist < 1.5:
+        score_cat = "success"
+    elif dist < 3.0:
+        score_cat = "warning"
+
+    # Recommendation Logic
+    recommendation: str | None = None
+    if dist >= 1.5 and result:
+        f1_diff = (
+            (result.f1_norm - result.f1_ref)
+            if (result.f1_norm and result.f1_ref)
+            else 0.0
+        )
+        f2_diff = (
+            (result.f2_norm - result.f2_ref)
+            if (result.f2_norm and result.f2_ref)
+            else 0.0
+        )
+        tips: List[str] = []
+        if abs(f2_diff) > 100:
+            tips.append(
+                "move your tongue slightly back"
+                if f2_diff > 0
+                else "move your tongue slightly forward"
+            )
+        if abs(f1_diff) > 50:
+            tips.append(
+                "raise your tongue slightly"
+                if f1_diff > 0
+                else "lower your tongue slightly"
+            )
+
+        if tips:
+            recommendation = "Try to " + " and ".join(tips) + "."
+        elif dist >= 3.5:
+            recommendation = "Focus on matching the sample pronunciation more closely."
+        else:
+            recommendation = "Good effort! Keep practicing."
+
+    return {
+        "status": "success",
+        "score": score_val,
+        "category": score_cat,
+        "distance": f"{dist:.2f} Bark",
+        "analysis": {
+            "distance_bark": round(dist, 2),
+            "recommendation": recommendation,
+        },
+    }
+
+
+def _stage_timings(
+    task: Any, timings: Dict[str, float], started_at: float
+) -> Callable[[], Dict[str, float]]:
+    """
+    Builds the stage_timings of this scoring run for process_submission,
+    which stores them right before its commit: the stage durations (ms), the
+    queue wait and the total time since submit_recording / submit_audio queued
+    it. The commit itself is only in the stage histogram.
+    """
+
+    def build() -> Dict[str, float]:
+        stored = metrics.rounded(timings)
+        queued_at = metrics.enqueued_at(task.request)
+        if queued_at is not None:
+            stored["queue_wait"] = round(max(0.0, started_at - queued_at) * 1000, 1)
+            stored["total"] = round(max(0.0, time.time() - queued_at) * 1000, 1)
+        return stored
+
+    return build
+
+
+# --- Submission batching (SUBMISSION_BATCH_SIZE > 1) ---
+# Every submission still gets its own task (the id the client waits on), but
+# its "<submission_id>:<task_id>:<publish time>" entry is also pushed to a
+# Redis list (the publish time feeds submit-to-score for batched entries). The
+# first task to run claims its own entry plus up to N-1 pending ones, analyzes
+# them together and stores each claimed task's result directly in the result
+# backend. A claim removes the entry and records its owner in one step, so
+# each entry has exactly one claimer. Tasks whose entry was claimed by someone
+# else finish without writing a result and schedule recover_claimed_submission
+# in case the owner dies before storing it.
+PENDING_SUBMISSIONS_KEY = "pronounce:pending_submissions"
+# A batch must store its results within this long; afterwards the claim
+# expires and recover_claimed_submission scores the submission itself
+CLAIM_TIMEOUT = 120  # seconds
+
+# KEYS: pending list, claim marker; ARGV: entry, owner task id, ttl
+_CLAIM_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+_redis_client: Any = None
+
+
+def _redis() -> Any:
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(
+            cast(str, current_app.config["CELERY_BROKER_URL"])
+        )
+    return _redis_client
+
+
+def dispatch_submission(submission_id: int) -> str:
+    """Queues analysis of a submission; returns the task id the client polls."""
+    task_id = str(uuid.uuid4())
+    # Stamped here rather than on publish, so the pending entry and the
+    # message carry the same publish time
+    enqueued_at = round(time.time(), 3)
+    if cast(int, current_app.config["SUBMISSION_BATCH_SIZE"]) > 1:
+        _redis().rpush(
+            PENDING_SUBMISSIONS_KEY,
+            _pending_entry(submission_id, task_id, enqueued_at),
+        )
+    current_app.extensions["celery"].send_task(
+        "tasks.async_process_submission",
+        args=[submission_id],
+        task_id=task_id,
+        headers={metrics.ENQUEUED_AT_HEADER: enqueued_at},
+    )
+    return task_id
+
+
+def _pending_entry(
+    submission_id: int, task_id: str, enqueued_at: Optional[float]
+) -> str:
+    """'<submission id>:<task id>[:<publish time>]'"""
+    entry = f"{submission_id}:{task_id}"
+    return entry if enqueued_at is None else f"{entry}:{enqueued_at}"
+
+
+def _parse_entry(entry: str) -> Tuple[int, str, Optional[float]]:
+    sid, task_id, *rest = entry.split(":")
+    return int(sid), task_id, float(rest[0]) if rest else None
+
+
+def _claim_marker(task_id: str) -> str:
+    return f"pronounce:claimed:{task_id}"
+
+
+def _claim(entry: str, owner_task_id: str) -> bool:
+    """
+    Takes a pending entry for owner_task_id's batch (LREM plus claim marker,
+    atomically). A failed claim leaves everything as it was.
+    """
+    task_id = _parse_entry(entry)[1]
+    return bool(
+        _redis().eval(
+            _CLAIM_SCRIPT,
+            2,
+            PENDING_SUBMISSIONS_KEY,
+            _claim_marker(task_id),
+            entry,
+            owner_task_id,
+            CLAIM_TIMEOUT,
+        )
+    )
+
+
+def _result_payload(submission_id: int, ok: bool) -> Dict[str, Any]:
+    if not ok:
+        return {"status": "error", "message": "Processing failed in engine"}
+    sub = cast(Submission | None, Submission.query.get(submission_id))
+    if not sub:
+        return {"status": "error", "message": "Submission not found"}
+    db.session.refresh(sub)
+    return build_result_payload(sub)
+
+
+def _process_batch(
+    task: Any, submission_id: int, batch_size: int, started_at: float
+) -> Dict[str, Any]:
+    from analysis_engine import process_submission, process_submissions
+
+    own_task_id = cast(str, task.request.id)
+    own_entry = _pending_entry(
+        submission_id, own_task_id, metrics.enqueued_at(task.request)
+    )
+    if not _claim(own_entry, own_task_id):
+        marker = _claim_marker(own_task_id)
+        owner = cast(Optional[bytes], _redis().get(marker))
+        if owner is not None and owner.decode() != own_task_id:
+            # Another worker's batch owns this submission and stores our
+            # result; check back once its claim has expired
+            countdown = max(1, cast(int, _redis().ttl(marker)))
+            recover_claimed_submission.apply_async(  # type: ignore
+                args=[submission_id, own_task_id], countdown=countdown
+            )
+            raise Ignore()
+        if owner is None and task.app.AsyncResult(own_task_id).ready():
+            # Claimed long ago and already answered by that batch
+            raise Ignore()
+        # Never queued for batching (e.g. dispatched before it was enabled),
+        # or our own batch being redelivered after its worker died
+        with metrics.collect_stages() as timings:
+            ok = process_submission(
+                submission_id, stage_timings=_stage_timings(task, timings, started_at)
+            )
+        payload = _result_payload(submission_id, ok)
+        if ok:
+            metrics.observe_submit_to_score(task)
+        return payload
+
+    # Give a burst a moment to accumulate, then take what is pending
+    wait_ms = cast(int, current_app.config["SUBMISSION_BATCH_WAIT_MS"])
+    if wait_ms > 0:
+        time.sleep(wait_ms / 1000.0)
+    # (submission id, task id, publish time): a submission can be pending
+    # under several tasks
+    claimed: List[Tuple[int, str, Optional[float]]] = []
+    for raw in cast(
+        List[bytes], _redis().lrange(PENDING_SUBMISSIONS_KEY, 0, batch_size * 2)
+    ):
+        if len(claimed) >= batch_size - 1:
+            break
+        entry = raw.decode()
+        if _claim(entry, own_task_id):
+            claimed.append(_parse_entry(entry))
+
+    ids = list(dict.fromkeys([submission_id, *(sid for sid, _, _ in claimed)]))
+    logger.info(f"Batch of {len(ids)} submission(s): {ids}")
+    backend = task.app.backend
+    try:
+        outcome = process_submissions(ids)
+        payloads = {sid: _result_payload(sid, outcome[sid]) for sid in ids}
+        db.session.commit()
+        if outcome[submission_id]:
+            metrics.observe_submit_to_score(task)
+        for sid, _, enqueued_at in claimed:
+            if outcome[sid] and enqueued_at is not None:
+                metrics.observe_submit_to_score(task, enqueued_at)
+    except Exception as e:
+        logger.error(f"Batch failed: {e}")
+        db.session.rollback()
+        payloads = {sid: {"status": "error", "message": str(e)} for sid in ids}
+
+    for sid, task_id, _ in claimed:
+        backend.store_result(task_id, payloads[sid], "SUCCESS")
+    return payloads[submission_id]
+
+
+@shared_task(bind=True, name="tasks.recover_claimed_submission")  # type: ignore
+def recover_claimed_submission(self: Any, submission_id: int, task_id: str) -> None:
+    """
+    Fallback for a task whose entry another worker's batch claimed. Runs once
+    the claim has expired: if the batch never stored a result for task_id
+    (its worker died), scores the submission and stores the result under
+    task_id, so the client waiting on it gets an answer.
+    """
+    from analysis_engine import process_submission
+
+    if self.app.AsyncResult(task_id).ready():
+        return
+
+    logger.warning(
+        f"Batch claim on submission {submission_id} expired without a result; "
+        f"re-scoring for task {task_id}"
+    )
+    ok = process_submission(submission_id)
+    payload = _result_payload(submission_id, ok)
+    db.session.commit()
+    self.app.backend.store_result(task_id, payload, "SUCCESS")
+
+
 @shared_task(bind=True, max_retries=3, name="tasks.async_process_submission")  # type: ignore
 def async_process_submission(self: Any, submission_id: int) -> Dict[str, Any]:
     """
     Background task to process audio submission.
     """
+    from analysis_engine import process_submission
+
     logger.info(f"Task started: Processing submission {submission_id}")
+    started_at = time.time()
+
+    batch_size = cast(int, current_app.config["SUBMISSION_BATCH_SIZE"])
+    if batch_size > 1:
+        return _process_batch(self, submission_id, batch_size, started_at)
 
     try:
         # Re-query submission inside the task/app context
@@ -25,79 +328,179 @@ def async_process_submission(self: Any, submission_id: int) -> Dict[str, Any]:
             return {"status": "error", "message": "Submission not found"}
 
         # Run the existing synchronous analysis logic
-        success = process_submission(submission_id)
+        with metrics.collect_stages() as timings:
+            success = process_submission(
+                submission_id, stage_timings=_stage_timings(self, timings, started_at)
+            )
 
         if success:
             # Refresh to get the analysis results that were saved to DB
             db.session.refresh(sub)
-            result = cast(AnalysisResult | None, sub.analysis)
-
-            # Re-implement the scoring logic here or fetch from DB if stored
-            # (Logic copied/adapted from flask_app.py to ensure consistent return data)
-            dist = result.distance_bark if result and result.distance_bark else 0.0
-            score_val = max(0, min(100, int(100 - (dist * 20))))
-
-            # Simple Category Logic
-            score_cat = "danger"
-            if dist < 1.5:
-                score_cat = "success"
-            elif dist < 3.0:
-                score_cat = "warning"
-
-            # Recommendation Logic
-            recommendation: str | None = None
-            if dist >= 1.5 and result:
-                f1_diff = (
-                    (result.f1_norm - result.f1_ref)
-                    if (result.f1_norm and result.f1_ref)
-                    else 0.0
-                )
-                f2_diff = (
-                    (result.f2_norm - result.f2_ref)
-                    if (result.f2_norm and result.f2_ref)
-                    else 0.0
-                )
-                tips: List[str] = []
-                if abs(f2_diff) > 100:
-                    tips.append(
-                        "move your tongue slightly back"
-                        if f2_diff > 0
-                        else "move your tongue slightly forward"
-                    )
-                if abs(f1_diff) > 50:
-                    tips.append(
-                        "raise your tongue slightly"
-                        if f1_diff > 0
-                        else "lower your tongue slightly"
-                    )
+            payload = build_result_payload(sub)
+            metrics.observe_submit_to_score(self)
+            return payload
+        else:
+            return {"status": "error", "message": "Processing failed in engine"}
+
+    except Exception as e:
+        logger.error(f"Task failed: {e}")
+        # self.retry(exc=e, countdown=5) # Optional retry
+        return {"status": "error", "message": str(e)}
+
+
+@shared_task(bind=True, name="tasks.async_process_audio")  # type: ignore
+def async_process_audio(
+    self: Any, raw_path: str, relative_path: str, noise_floor: Optional[float]
+) -> Dict[str, Any]:
+    """
+    Background preprocessing for /api/process_audio (AUDIO_PREPROCESS_MODE=async).
+    Trims/normalizes the raw upload, writes the MP3 + analysis sidecar and
+    removes the raw file. Paths are relative to UPLOAD_FOLDER.
+    """
+    from scripts.audio_processing import process_audio_with_samples, save_processed_audio
+
+    upload_folder = cast(str, current_app.config["UPLOAD_FOLDER"])
+    raw_full_path = os.path.join(upload_folder, raw_path)
+
+    try:
+        with open(raw_full_path, "rb") as f:
+            raw_data = f.read()
+
+        processed_data, samples = process_audio_with_samples(
+            raw_data, noise_floor=noise_floor if noise_floor is not None else 0.0
+        )
+        save_processed_audio(
+            os.path.join(upload_folder, relative_path), processed_data, samples
+        )
+
+        return {
+            "status": "success",
+            "path": relative_path,
+            "url": f"/uploads/{relative_path}",
+        }
+    except Exception as e:
+        logger.error(f"Audio preprocessing task failed: {e}")
+        return {"status": "error", "message": str(e)}
+    finally:
+        if os.path.exists(raw_full_path):
+            os.remove(raw_full_path)
+
+
+@shared_task(bind=True, name="tasks.async_process_upload")  # type: ignore
+def async_process_upload(
+    self: Any, submission_id: int, raw_path: str, noise_floor: Optional[float]
+) -> Dict[str, Any]:
+    """
+    Fused pipeline for /api/submit_audio: trims/encodes the raw upload and
+    analyzes it in one pass, keeping the samples in memory. Returns the score
+    payload plus the preview 'path'/'url'.
+    """
+    from analysis_engine import process_submission
+    from scripts.audio_processing import process_audio_with_samples, save_processed_audio
+
+    logger.info(f"Task started: Fused processing of submission {submission_id}")
+    started_at = time.time()
+
+    upload_folder = cast(str, current_app.config["UPLOAD_FOLDER"])
+    raw_full_path = os.path.join(upload_folder, raw_path)
 
-                if tips:
-                    recommendation = "Try to " + " and ".join(tips) + "."
-                elif dist >= 3.5:
-                    recommendation = (
-                        "Focus on matching the sample pronunciation more closely."
+    try:
+        sub = cast(Submission | None, Submission.query.get(submission_id))
+        if not sub:
+            logger.error(f"Submission {submission_id} not found.")
+            return {"status": "error", "message": "Submission not found"}
+
+        relative_path = cast(str, sub.file_path)
+        preview = {"path": relative_path, "url": f"/uploads/{relative_path}"}
+
+        with metrics.collect_stages() as timings:
+            # 1. Trim / normalize / encode
+            try:
+                with metrics.stage("preprocess"):
+                    with open(raw_full_path, "rb") as f:
+                        raw_data = f.read()
+                    processed_data, samples = process_audio_with_samples(
+                        raw_data,
+                        noise_floor=noise_floor if noise_floor is not None else 0.0,
+                    )
+                    save_processed_audio(
+                        os.path.join(upload_folder, relative_path),
+                        processed_data,
+                        samples,
                     )
-                else:
-                    recommendation = "Good effort! Keep practicing."
+            except Exception as e:
+                # Without audio the submission is meaningless: drop it
+                logger.error(f"Fused preprocessing failed for {submission_id}: {e}")
+                user_id = cast(int, sub.user_id)
+                db.session.delete(sub)
+                StudentProgress.refresh(user_id)
+                db.session.commit()
+                return {"status": "error", "message": str(e)}
 
-            # Update simplified score on submission if not already done
-            sub.score = score_val
-            db.session.commit()
+            # 2. Analyze straight from memory
+            ok = process_submission(
+                submission_id,
+                samples=samples,
+                stage_timings=_stage_timings(self, timings, started_at),
+            )
 
+        if not ok:
             return {
-                "status": "success",
-                "score": score_val,
-                "category": score_cat,
-                "distance": f"{dist:.2f} Bark",
-                "analysis": {
-                    "distance_bark": round(dist, 2),
-                    "recommendation": recommendation,
-                },
+                "status": "error",
+                "message": "Processing failed in engine",
+                **preview,
             }
-        else:
-            return {"status": "error", "message": "Processing failed in engine"}
+
+        db.session.refresh(sub)
+        payload = build_result_payload(sub)
+        metrics.observe_submit_to_score(self)
+        return {**payload, **preview}
 
     except Exception as e:
-        logger.error(f"Task failed: {e}")
-        # self.retry(exc=e, countdown=5) # Optional retry
+        logger.error(f"Fused task failed: {e}")
+        return {"status": "error", "message": str(e)}
+    finally:
+        if os.path.exists(raw_full_path):
+            os.remove(raw_full_path)
+
+
+@shared_task(bind=True, name="tasks.refresh_reference")  # type: ignore
+def refresh_reference(
+    self: Any, word_text: str, vowel: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Re-measures a reference recording after its MP3 changed (bulk queue).
+    Runs off the request so admin word edits never compete with scoring.
+    """
+    from analysis_engine import refresh_reference_measurement
+
+    try:
+        refresh_reference_measurement(word_text, vowel)
+        return {"status": "success", "word": word_text}
+    except Exception as e:
+        logger.error(f"Reference refresh failed for '{word_text}': {e}")
         return {"status": "error", "message": str(e)}
+
+
+@shared_task(bind=True, max_retries=3, name="tasks.send_email")  # type: ignore
+def send_email(
+    self: Any,
+    subject: str,
+    sender: str,
+    recipients: List[str],
+    text_body: str,
+    html_body: str,
+) -> None:
+    """Delivers a rendered email (mail queue); SMTP errors are retried."""
+    from flask_mail import Message  # type: ignore
+
+    from models import mail
+
+    msg = Message(subject, sender=sender, recipients=recipients)  # type: ignore
+    msg.body = text_body
+    msg.html = html_body
+    try:
+        mail.send(msg)  # type: ignore
+    except Exception as e:
+        logger.error(f"Email task failed: {e}")
+        raise self.retry(exc=e, countdown=30)
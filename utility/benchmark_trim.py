@@ -0,0 +1,139 @@
+# pyright: strict
+"""
+Benchmarks the upload trim front end (decode + frame RMS/ZCR + speech bounds)
+against the previous librosa implementation and checks that both make the
+same trim decision.
+
+Example:
+  python utility/benchmark_trim.py                      # synthetic recordings
+  python utility/benchmark_trim.py uploads/1/*.wav --repeat 20
+"""
+import io
+import os
+import sys
+import time
+from typing import Any, Callable, List, Optional, Tuple, cast
+
+import click
+import numpy as np
+import soundfile as sf  # type: ignore
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.audio_processing import (  # noqa: E402
+    TRIM_FRAME_SECONDS,
+    decode_mono,
+    frame_features,
+    speech_bounds,
+)
+
+TARGET_SR = 16000
+Bounds = Optional[Tuple[int, int]]
+
+
+def legacy_front_end(
+    audio_data: bytes, noise_floor: Optional[float]
+) -> Tuple[Any, Bounds]:
+    """The pre-soundfile path: librosa.load + librosa.feature framing."""
+    import librosa  # type: ignore
+
+    y_stereo: Any
+    y_stereo, _ = librosa.load(  # type: ignore
+        io.BytesIO(audio_data), sr=TARGET_SR, mono=False
+    )
+    y: Any = librosa.to_mono(y_stereo) if y_stereo.ndim > 1 else y_stereo  # type: ignore
+    frame_length = int(TARGET_SR * TRIM_FRAME_SECONDS)
+    rms = librosa.feature.rms(  # type: ignore
+        y=y, frame_length=frame_length, hop_length=frame_length, center=False
+    )[0]
+    zcr = librosa.feature.zero_crossing_rate(  # type: ignore
+        y=y, frame_length=frame_length, hop_length=frame_length, center=False
+    )[0]
+    bounds = speech_bounds(
+        cast(Any, rms), cast(Any, zcr), frame_length, len(y), TARGET_SR, noise_floor
+    )
+    return (y, rms, zcr), bounds
+
+
+def current_front_end(
+    audio_data: bytes, noise_floor: Optional[float]
+) -> Tuple[Any, Bounds]:
+    y = decode_mono(audio_data, TARGET_SR)
+    frame_length = int(TARGET_SR * TRIM_FRAME_SECONDS)
+    rms, zcr = frame_features(y, frame_length)
+    bounds = speech_bounds(rms, zcr, frame_length, len(y), TARGET_SR, noise_floor)
+    return (y, rms, zcr), bounds
+
+
+def synthetic_recordings() -> List[Tuple[str, bytes]]:
+    """Browser-like WAVs: 44.1/48 kHz, silence + voiced tone + noise tail."""
+    rng = np.random.default_rng(0)
+    recordings: List[Tuple[str, bytes]] = []
+    for sr in (16000, 44100, 48000):
+        t = np.arange(int(sr * 0.6)) / sr
+        voiced = 0.3 * np.sin(2 * np.pi * 180 * t) * np.hanning(len(t))
+        y = np.concatenate(
+            [
+                0.002 * rng.standard_normal(int(sr * 0.8)),
+                voiced + 0.002 * rng.standard_normal(len(t)),
+                0.02 * rng.standard_normal(int(sr * 0.1)),  # fricative-like tail
+                0.002 * rng.standard_normal(int(sr * 1.0)),
+            ]
+        ).astype(np.float32)
+        buf = io.BytesIO()
+        sf.write(buf, y, sr, format="WAV", subtype="PCM_16")  # type: ignore
+        recordings.append((f"synthetic@{sr}Hz", buf.getvalue()))
+    return recordings
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+@click.command()
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option("--repeat", default=10, show_default=True)
+@click.option("--noise-floor", default=None, type=float, help="Client noise floor")
+def benchmark(files: Tuple[str, ...], repeat: int, noise_floor: Optional[float]):
+    """Times legacy vs current trimming and compares their decisions."""
+    recordings = [(path, open(path, "rb").read()) for path in files]
+    if not recordings:
+        recordings = synthetic_recordings()
+
+    # First call pays imports / JIT for both paths
+    legacy_front_end(recordings[0][1], noise_floor)
+    current_front_end(recordings[0][1], noise_floor)
+
+    mismatches = 0
+    for name, data in recordings:
+        (y_old, rms_old, zcr_old), bounds_old = legacy_front_end(data, noise_floor)
+        (y_new, rms_new, zcr_new), bounds_new = current_front_end(data, noise_floor)
+        identical = (
+            bounds_old == bounds_new
+            and np.array_equal(cast(Any, y_old), y_new)
+            and np.array_equal(cast(Any, rms_old), rms_new)
+            and np.array_equal(cast(Any, zcr_old), zcr_new)
+        )
+        if bounds_old != bounds_new:
+            mismatches += 1
+
+        legacy_ms = best_of(lambda: legacy_front_end(data, noise_floor), repeat)
+        current_ms = best_of(lambda: current_front_end(data, noise_floor), repeat)
+        click.echo(
+            f"{name}: legacy {legacy_ms:.2f} ms, current {current_ms:.2f} ms "
+            f"({legacy_ms / max(current_ms, 1e-9):.1f}x), bounds {bounds_new}, "
+            f"{'bit-identical' if identical else 'features differ'}"
+        )
+
+    if mismatches:
+        click.echo(f"FAIL: {mismatches} recording(s) trimmed differently", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark()
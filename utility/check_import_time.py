@@ -0,0 +1,86 @@
+# pyright: strict
+"""
+Import-time budget for the web tier.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+fails (exit code 1) when the import takes longer than the budget or pulls in
+any of the analysis-only packages. Gunicorn workers, `flask` CLI commands and
+worker recycling all pay this cost, so keep it in CI / pre-deploy checks.
+
+Example:
+  python utility/check_import_time.py
+  python utility/check_import_time.py --module wsgi --budget-ms 1200 --top 15
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import click
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Only Celery workers (and the sync upload path, lazily) may load these
+FORBIDDEN = ("librosa", "parselmouth", "numba", "soundfile", "scipy", "pyarrow")
+
+
+def measure_imports(module: str) -> Tuple[Dict[str, Tuple[int, int]], str]:
+    """
+    Returns ({module: (self_us, cumulative_us)}, stderr) for a cold import.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            timings[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    if proc.returncode != 0:
+        raise click.ClickException(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return timings, proc.stderr
+
+
+@click.command()
+@click.option("--module", default="flask_app", show_default=True)
+@click.option("--budget-ms", default=1500, show_default=True, type=int)
+@click.option("--top", default=10, show_default=True, help="Slowest imports to list")
+def check(module: str, budget_ms: int, top: int):
+    """Checks the web tier's import time against a budget."""
+    timings, _ = measure_imports(module)
+    if module not in timings:
+        raise click.ClickException(f"No importtime entry for '{module}'")
+
+    total_ms = timings[module][1] / 1000
+    click.echo(f"import {module}: {total_ms:.0f} ms (budget {budget_ms} ms)")
+
+    slowest = sorted(timings.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    for name, (self_us, cumulative_us) in slowest:
+        click.echo(
+            f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms  {name}"
+        )
+
+    failures: List[str] = []
+    loaded = sorted(name for name in timings if name in FORBIDDEN)
+    if loaded:
+        failures.append(f"analysis-only packages imported: {', '.join(loaded)}")
+    if total_ms > budget_ms:
+        failures.append(f"{total_ms:.0f} ms exceeds the {budget_ms} ms budget")
+
+    for failure in failures:
+        click.echo(f"FAIL: {failure}", err=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    check()
@@ -0,0 +1,120 @@
+# pyright: strict
+"""
+Checks that the vectorized find_syllable_nucleus picks the same voiced
+segment as the previous frame-by-frame implementation (Praat queries per
+frame, "Get maximum" for the intensity peak).
+
+Example:
+  python utility/check_nucleus_equivalence.py             # static/audio/*.mp3
+  python utility/check_nucleus_equivalence.py uploads/1/*.mp3
+"""
+import glob
+import os
+import sys
+from typing import Any, List, Optional, Tuple, cast
+
+import click
+import parselmouth  # type: ignore
+from parselmouth.praat import call  # type: ignore
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from analysis_engine import (  # noqa: E402
+    MIN_NUCLEUS_DURATION,
+    PITCH_CEILING,
+    PITCH_FLOOR,
+    find_syllable_nucleus,
+    load_audio_mono,
+)
+
+AUDIO_FOLDER = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "static", "audio")
+)
+Segment = Optional[Tuple[float, float]]
+
+
+def legacy_find_syllable_nucleus(sound: Any) -> Segment:
+    """The implementation before vectorization (debug prints dropped)."""
+    pitch = sound.to_pitch(pitch_floor=PITCH_FLOOR, pitch_ceiling=PITCH_CEILING)
+    intensity = sound.to_intensity()
+
+    n_frames = cast(int, pitch.get_number_of_frames())
+    voiced_intervals: List[Tuple[float, float]] = []
+
+    current_start: Optional[float] = None
+
+    for i in range(1, n_frames + 1):
+        if pitch.get_value_in_frame(i) > 0:
+            if current_start is None:
+                current_start = cast(float, pitch.get_time_from_frame_number(i))
+        else:
+            if current_start is not None:
+                voiced_intervals.append(
+                    (current_start, cast(float, pitch.get_time_from_frame_number(i)))
+                )
+                current_start = None
+    if current_start:
+        voiced_intervals.append(
+            (current_start, cast(float, pitch.get_time_from_frame_number(n_frames)))
+        )
+
+    best_segment = None
+    max_peak = -100.0
+
+    for t0, t1 in voiced_intervals:
+        if t1 - t0 < MIN_NUCLEUS_DURATION:
+            continue
+        try:
+            peak = float(
+                cast(
+                    float,
+                    call(intensity, "Get maximum", float(t0), float(t1), "Parabolic"),
+                )
+            )
+            if peak > max_peak:
+                max_peak = peak
+                best_segment = (t0, t1)
+        except Exception:
+            pass
+
+    return best_segment
+
+
+def same_segment(a: Segment, b: Segment) -> bool:
+    if a is None or b is None:
+        return a is b
+    return abs(a[0] - b[0]) < 1e-9 and abs(a[1] - b[1]) < 1e-9
+
+
+@click.command()
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def check(files: Tuple[str, ...]):
+    """Compares legacy vs current nucleus (start, end) for every recording."""
+    paths = list(files) or sorted(glob.glob(os.path.join(AUDIO_FOLDER, "*.mp3")))
+    if not paths:
+        click.echo(f"No recordings found in {AUDIO_FOLDER}", err=True)
+        sys.exit(1)
+
+    mismatches = 0
+    for path in paths:
+        # Same decoding as the engine (mono, TARGET_SR)
+        y, sr = load_audio_mono(path)
+        sound: Any = parselmouth.Sound(y, sampling_frequency=sr)  # type: ignore
+        legacy = legacy_find_syllable_nucleus(sound)
+        current = find_syllable_nucleus(sound)
+        ok = same_segment(legacy, current)
+        if not ok:
+            mismatches += 1
+        click.echo(
+            f"{os.path.basename(path)}: legacy {legacy}, current {current}"
+            f"{'' if ok else '  <-- MISMATCH'}"
+        )
+
+    if mismatches:
+        click.echo(f"FAIL: {mismatches} of {len(paths)} recording(s) differ", err=True)
+        sys.exit(1)
+    click.echo(f"OK: {len(paths)} recording(s) match")
+
+
+if __name__ == "__main__":
+    check()
@@ -0,0 +1,130 @@
+# pyright: strict
+"""
+SQL statements per request for the list views, so an N+1 (one lazy
+target_word / analysis load per row) cannot creep back in.
+
+Replays each request through the Flask test client against the configured
+database, logged in as an existing student and an admin, and fails (exit
+code 1) when a request issues more statements than its budget. Budgets are
+fixed per request, independent of how many rows a page shows.
+
+Example:
+  python utility/check_query_counts.py
+  python utility/check_query_counts.py --student-id 12 --verbose
+"""
+import os
+import sys
+from typing import Any, List, Optional, Tuple, cast
+
+import click
+from sqlalchemy import event
+
+# Add parent directory to path to import flask_app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import url_for  # noqa: E402
+
+from flask_app import app, db  # noqa: E402
+from models import Submission, User  # noqa: E402
+
+# Includes the per-request overhead (session user load, SystemConfig cache).
+# get_progress assumes the student's StudentProgress row exists (rebuild-progress)
+BUDGETS = {
+    "get_progress": 5,
+    "student_detail": 8,
+    "get_analysis_data": 4,
+}
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    def __call__(self, conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        self.statements.append(statement)
+
+
+def count_request(client: Any, user_id: int, url: str) -> Tuple[int, int, List[str]]:
+    """(status code, statements issued, statements) for one GET as user_id."""
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+
+    counter = StatementCounter()
+    event.listen(db.engine, "before_cursor_execute", counter)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", counter)
+    return response.status_code, len(counter.statements), counter.statements
+
+
+@click.command()
+@click.option("--student-id", type=int, default=None, help="Defaults to the busiest")
+@click.option("--verbose", is_flag=True, help="Print every statement")
+def check(student_id: Optional[int], verbose: bool):
+    """Fails if a list view exceeds its SQL statement budget."""
+    with app.app_context():
+        if student_id is None:
+            row = (
+                db.session.query(Submission.user_id)
+                .join(User, Submission.user_id == User.id)
+                .filter(User.role == "student")  # type: ignore
+                .group_by(Submission.user_id)
+                .order_by(db.func.count(Submission.id).desc())
+                .first()
+            )
+            if row is None:
+                click.echo("No student submissions to replay.", err=True)
+                sys.exit(2)
+            student_id = cast(int, row[0])
+        admin = cast(User | None, User.query.filter_by(role="admin").first())
+        if admin is None:
+            click.echo("No admin account to replay teacher views as.", err=True)
+            sys.exit(2)
+        latest_id = cast(
+            Optional[int],
+            db.session.query(db.func.max(Submission.id))
+            .filter(Submission.user_id == student_id)
+            .scalar(),
+        )
+        admin_id = cast(int, admin.id)
+        db.session.remove()
+
+        with app.test_request_context():
+            requests: List[Tuple[str, int, str]] = [
+                ("get_progress", student_id, url_for("get_progress")),
+                (
+                    "student_detail",
+                    admin_id,
+                    url_for("dashboards.student_detail", user_id=student_id),
+                ),
+            ]
+            if latest_id is not None:
+                analysis_url = url_for(
+                    "dashboards.get_analysis_data", submission_id=latest_id
+                )
+                requests.append(("get_analysis_data", admin_id, analysis_url))
+
+        failures = 0
+        client = app.test_client()
+        for name, user_id, url in requests:
+            status, count, statements = count_request(client, user_id, url)
+            budget = BUDGETS[name]
+            ok = count <= budget
+            failures += 0 if ok else 1
+            click.echo(
+                f"[{'ok' if ok else 'FAIL'}] {name}: {count} statements "
+                f"(budget {budget}, HTTP {status})"
+            )
+            if verbose or not ok:
+                for statement in statements:
+                    click.echo(f"       {' '.join(statement.split())[:160]}")
+
+    if failures:
+        click.echo(f"{failures} request(s) over their statement budget", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    check()
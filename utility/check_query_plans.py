@@ -0,0 +1,144 @@
+# pyright: strict
+"""
+Query-plan regression check for the hot Submission / AnalysisResult lookups.
+
+Runs EXPLAIN (FORMAT JSON) for each query against the configured PostgreSQL
+database (DATABASE_URL, e.g. a seeded local copy) with sequential scans
+disabled for the session. A query the indexes can serve then shows an index
+scan however small the tables are; a sequential scan on a hot table means no
+usable index exists and the check fails (exit code 1).
+
+Example:
+  DATABASE_URL=postgresql://localhost/pronounce_dev python utility/check_query_plans.py
+  python utility/check_query_plans.py --verbose
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple, cast
+
+import click
+
+# Add parent directory to path to import flask_app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask_app import app, db  # noqa: E402
+from models import AnalysisResult, StudentProgress, Submission  # noqa: E402
+from scripts.research_data import research_query  # noqa: E402
+
+# Tables that must never be read with a sequential scan by these queries
+HOT_TABLES = {"submissions", "analysis_results"}
+
+SAMPLE_ID = 1
+
+
+def _since() -> datetime:
+    return datetime.now() - timedelta(days=7)
+
+
+# name -> query factory; mirrors the call sites named in each entry
+HOT_QUERIES: List[Tuple[str, Callable[[], Any]]] = [
+    (
+        "StudentProgress.refresh word lists",
+        lambda: db.session.query(Submission.test_type, Submission.word_id)
+        .filter(Submission.user_id == SAMPLE_ID)
+        .distinct(),
+    ),
+    (
+        "student_detail history",
+        lambda: Submission.query.filter(Submission.user_id == SAMPLE_ID)
+        .filter(Submission.test_type == "pre")
+        .order_by(Submission.timestamp.desc()),
+    ),
+    (
+        "manage_all_words last submission",
+        lambda: Submission.query.filter(Submission.word_id == SAMPLE_ID)
+        .order_by(Submission.timestamp.desc())
+        .limit(1),
+    ),
+    (
+        "analysis result by submission",
+        lambda: AnalysisResult.query.filter_by(submission_id=SAMPLE_ID),
+    ),
+    (
+        "VTLN history join",
+        lambda: db.session.query(AnalysisResult.f1_raw, AnalysisResult.f2_raw)
+        .join(Submission, AnalysisResult.submission_id == Submission.id)
+        .filter(Submission.user_id == SAMPLE_ID),
+    ),
+    (
+        "StudentProgress activity",
+        lambda: StudentProgress.activity_query([SAMPLE_ID]),
+    ),
+    (
+        "research rows by date",
+        lambda: research_query({"date_from": _since()}).limit(500),
+    ),
+]
+
+
+def explain(query: Any) -> Dict[str, Any]:
+    """EXPLAIN (FORMAT JSON) of an ORM query; returns the top plan node."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    result = db.session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    )
+    plan = cast(Any, result.scalar())
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return cast(Dict[str, Any], plan[0]["Plan"])
+
+
+def seq_scans(node: Dict[str, Any]) -> List[str]:
+    """Hot tables read by a Seq Scan anywhere in the plan tree."""
+    found: List[str] = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+        found.append(cast(str, node["Relation Name"]))
+    for child in cast(List[Dict[str, Any]], node.get("Plans", [])):
+        found.extend(seq_scans(child))
+    return found
+
+
+def describe(node: Dict[str, Any], depth: int = 0) -> List[str]:
+    relation = f" on {node['Relation Name']}" if "Relation Name" in node else ""
+    index = f" using {node['Index Name']}" if "Index Name" in node else ""
+    lines = [f"{'  ' * depth}{node['Node Type']}{relation}{index}"]
+    for child in cast(List[Dict[str, Any]], node.get("Plans", [])):
+        lines.extend(describe(child, depth + 1))
+    return lines
+
+
+@click.command()
+@click.option("--verbose", is_flag=True, help="Print every plan tree")
+def check(verbose: bool):
+    """Fails if a hot query can only be answered by a sequential scan."""
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            click.echo("Query plan checks need PostgreSQL (DATABASE_URL)", err=True)
+            sys.exit(2)
+
+        failures = 0
+        # Makes the planner pick any usable index, even on a tiny seeded table
+        db.session.execute(db.text("SET LOCAL enable_seqscan = off"))
+        for name, build in HOT_QUERIES:
+            plan = explain(build())
+            scans = seq_scans(plan)
+            status = "FAIL" if scans else "ok"
+            click.echo(f"[{status}] {name}")
+            if scans:
+                failures += 1
+                tables = ", ".join(sorted(set(scans)))
+                click.echo(f"       sequential scan on: {tables}")
+            if scans or verbose:
+                for line in describe(plan):
+                    click.echo(f"       {line}")
+        db.session.rollback()
+
+    if failures:
+        click.echo(f"{failures} hot query plan(s) regressed", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    check()
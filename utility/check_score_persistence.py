@@ -0,0 +1,73 @@
+# pyright: strict
+"""
+Checks that scoring a submission persists its simplified score.
+
+Re-scores one existing submission through the async_process_submission
+task body (run in-process, unbatched), then reloads the Submission in a
+fresh session and fails (exit code 1) unless Submission.score matches the
+score the task returned to the client.
+
+Re-scoring replaces the submission's AnalysisResult with a fresh analysis
+of the same audio, so point it at a development database.
+
+Example:
+  python utility/check_score_persistence.py                  # newest submission
+  python utility/check_score_persistence.py --submission-id 42
+"""
+import os
+import sys
+from typing import Any, Dict, Optional, cast
+
+import click
+
+# Add parent directory to path to import flask_app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask_app import app, db  # noqa: E402
+from models import Submission  # noqa: E402
+
+
+@click.command()
+@click.option("--submission-id", type=int, default=None, help="Defaults to the newest")
+def check(submission_id: Optional[int]):
+    """Fails if a scored submission's score is not saved."""
+    from tasks import async_process_submission
+
+    with app.app_context():
+        if submission_id is None:
+            submission_id = cast(
+                Optional[int], db.session.query(db.func.max(Submission.id)).scalar()
+            )
+            if submission_id is None:
+                click.echo("No submissions to score.", err=True)
+                sys.exit(2)
+
+        # One submission per task: no Redis batching involved
+        app.config["SUBMISSION_BATCH_SIZE"] = 1
+        payload = cast(
+            Dict[str, Any],
+            async_process_submission(submission_id),  # type: ignore
+        )
+        db.session.remove()
+
+        if payload.get("status") != "success":
+            click.echo(f"Scoring failed: {payload}", err=True)
+            sys.exit(2)
+
+        # New session: only what was committed is visible
+        sub = cast(Submission | None, Submission.query.get(submission_id))
+        stored = sub.score if sub else None
+        db.session.remove()
+
+    if stored != payload["score"]:
+        click.echo(
+            f"[FAIL] submission {submission_id}: returned score {payload['score']}, "
+            f"stored {stored}",
+            err=True,
+        )
+        sys.exit(1)
+    click.echo(f"[ok] submission {submission_id}: score {stored} persisted")
+
+
+if __name__ == "__main__":
+    check()
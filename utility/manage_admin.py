@@ -9,6 +9,7 @@ from typing import cast, List
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from flask_app import app, db, User
+from scripts.audio_processing import remove_processed_audio
 
 
 @click.group()
@@ -141,11 +142,11 @@ def delete_admin(username: str):
                         str, app.config.get("UPLOAD_FOLDER", "uploads")  # type: ignore
                     )  # type: ignore
                     full_path = os.path.join(upload_folder, sub.file_path)
-                    if os.path.exists(full_path):
-                        try:
-                            os.remove(full_path)
-                        except OSError:
-                            pass
+                    try:
+                        # The MP3 and its <uuid>.16000.npy analysis sidecar
+                        remove_processed_audio(full_path)
+                    except OSError:
+                        pass
                 db.session.delete(sub)
 
             # 2. Clean up user directory if exists
@@ -389,11 +390,11 @@ def toggle_demo_mode():
                 for sub in user_subs:
                     if sub.file_path:
                         full_path = os.path.join(upload_folder, sub.file_path)
-                        if os.path.exists(full_path):
-                            try:
-                                os.remove(full_path)
-                            except OSError:
-                                pass
+                        try:
+                            # The MP3 and its <uuid>.16000.npy analysis sidecar
+                            remove_processed_audio(full_path)
+                        except OSError:
+                            pass
                     db.session.delete(sub)
                     submission_count += 1
 